@@ -1,19 +1,25 @@
+import csv
+import io
 import os
 import secrets
 from datetime import datetime, timedelta
 from urllib.parse import urlsplit
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+from flask import (Flask, Response, render_template, request, redirect, url_for, flash, session,
+                   stream_with_context)
 from dotenv import load_dotenv
-from db import init_db, get_db_connection, put_db_connection
+from db import init_db, get_db_connection, put_db_connection, pool_stats
+from rollups import load_user_rollups, refresh_rollups
+from cache import USER_TTL, user_cache
 from psycopg2.extras import RealDictCursor
-from scheduler import start_scheduler
-from roma.workflow import run_root_workflow
 import bcrypt
-import yfinance as yf
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 
 load_dotenv()
 
+# Market-data, analytics and scheduler modules (yfinance, pandas, Prophet,
+# VADER, APScheduler) are imported inside the code paths that use them, so
+# a cold start that only renders a page doesn't pay for them.
+
 app = Flask(__name__, template_folder='templates')
 app.config['DATABASE_URL'] = (
     os.getenv('NEON_DATABASE_URL')
@@ -22,6 +28,7 @@ app.config['DATABASE_URL'] = (
 )
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
 _initialized = False
+ALERTS_PAGE_SIZE = 50
 
 # ================== FLASK-LOGIN SETUP ==================
 
@@ -39,14 +46,37 @@ class User(UserMixin):
         self.email = user_dict['email']
         self.created_at = user_dict.get('created_at')
 
+def _user_cache_key(user_id):
+    return f'user:{int(user_id)}'
+
+def cache_user(row):
+    """Store the fields ``User`` needs (never the password hash)."""
+    user_cache.set(_user_cache_key(row['id']), {
+        'id': row['id'],
+        'username': row['username'],
+        'email': row['email'],
+        'created_at': row.get('created_at'),
+    }, USER_TTL)
+
+def invalidate_user(user_id):
+    """Drop a cached user; call after any change to their ``users`` row."""
+    user_cache.delete(_user_cache_key(user_id))
+
 @login_manager.user_loader
 def load_user(user_id):
+    cached = user_cache.get(_user_cache_key(user_id))
+    if cached is not None:
+        return User(cached)
     conn = get_db_connection()
     try:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute("SELECT * FROM users WHERE id = %s", (int(user_id),))
+            cur.execute(
+                "SELECT id, username, email, created_at FROM users WHERE id = %s",
+                (int(user_id),)
+            )
             row = cur.fetchone()
             if row:
+                cache_user(row)
                 return User(row)
     finally:
         put_db_connection(conn)
@@ -60,6 +90,7 @@ def initialize_app():
     init_db(app.config['DATABASE_URL'])
     # Don't start scheduler on serverless
     if os.getenv('ENVIRONMENT') != 'vercel' and not os.getenv('VERCEL'):
+        from scheduler import start_scheduler
         start_scheduler(app)
     _initialized = True
 
@@ -177,6 +208,7 @@ def login():
         
         if row and bcrypt.checkpw(password.encode('utf-8'), row['password_hash'].encode('utf-8')):
             user = User(row)
+            cache_user(row)
             login_user(user, remember=True)
             flash(f'Welcome back, {user.username}!', 'success')
             next_page = request.args.get('next')
@@ -190,6 +222,7 @@ def login():
 @app.route('/logout')
 @login_required
 def logout():
+    invalidate_user(current_user.id)
     logout_user()
     flash('You have been signed out.', 'success')
     return redirect(url_for('login'))
@@ -209,18 +242,21 @@ def dashboard():
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute("SELECT * FROM portfolios WHERE user_id = %s ORDER BY id", (current_user.id,))
             portfolios = cur.fetchall()
-            
+
+            # One query for every portfolio's holdings, grouped in Python.
+            holdings = []
+            if portfolios:
+                cur.execute(
+                    "SELECT * FROM holdings WHERE portfolio_id = ANY(%s) ORDER BY id",
+                    ([p['id'] for p in portfolios],)
+                )
+                holdings = cur.fetchall()
+            by_portfolio = {p['id']: [] for p in portfolios}
+            for h in holdings:
+                by_portfolio[h['portfolio_id']].append(h)
             for portfolio in portfolios:
-                cur.execute("SELECT * FROM holdings WHERE portfolio_id = %s", (portfolio['id'],))
-                portfolio['holdings'] = cur.fetchall()
-            
-            cur.execute("""
-                SELECT COUNT(*) as count FROM holdings h
-                JOIN portfolios p ON h.portfolio_id = p.id
-                WHERE p.user_id = %s
-            """, (current_user.id,))
-            row = cur.fetchone()
-            total_holdings = row['count'] if row else 0
+                portfolio['holdings'] = by_portfolio[portfolio['id']]
+            total_holdings = len(holdings)
     finally:
         put_db_connection(conn)
         
@@ -273,13 +309,17 @@ def view_portfolio(portfolio_id):
             cur.execute("SELECT * FROM holdings WHERE portfolio_id = %s", (portfolio_id,))
             holdings = cur.fetchall()
 
-            for holding in holdings:
+            history = {h['id']: [] for h in holdings}
+            if holdings:
                 cur.execute("""
                     SELECT * FROM holding_snapshots
-                    WHERE holding_id = %s
-                    ORDER BY created_at ASC
-                """, (holding['id'],))
-                holding['history'] = cur.fetchall()
+                    WHERE holding_id = ANY(%s)
+                    ORDER BY holding_id, created_at ASC
+                """, (list(history),))
+                for snap in cur.fetchall():
+                    history[snap['holding_id']].append(snap)
+            for holding in holdings:
+                holding['history'] = history[holding['id']]
             
             total_shares = sum(h['shares'] for h in holdings)
             unique_tickers = len(set(h['ticker'] for h in holdings))
@@ -317,7 +357,8 @@ def delete_portfolio(portfolio_id):
             
             cur.execute("DELETE FROM holding_snapshots WHERE portfolio_id = %s", (portfolio_id,))
             cur.execute("DELETE FROM alerts WHERE portfolio_id = %s", (portfolio_id,))
-            cur.execute("DELETE FROM holdings WHERE portfolio_id = %s", (portfolio_id,))
+            cur.execute("DELETE FROM holdings WHERE portfolio_id = %s RETURNING ticker", (portfolio_id,))
+            refresh_rollups(cur, portfolio_ids=[portfolio_id], tickers=[r['ticker'] for r in cur.fetchall()])
             cur.execute("DELETE FROM portfolios WHERE id = %s", (portfolio_id,))
             
         conn.commit()
@@ -368,15 +409,9 @@ def create_holding(portfolio_id):
         flash(f'Invalid shares value: {str(e)}', 'error')
         return redirect(url_for('view_portfolio', portfolio_id=portfolio_id))
 
-    snapshot_price = None
-    try:
-        snapshot_price = yf.Ticker(ticker).fast_info.get('lastPrice')
-        if not snapshot_price:
-            snapshot_price = float(
-                yf.download(ticker, period='1d', progress=False, multi_level_index=False)['Close'].iloc[-1]
-            )
-    except Exception:
-        snapshot_price = None
+    from quotes import fetch_last_prices
+    prices, _ = fetch_last_prices([ticker])
+    snapshot_price = prices.get(ticker)
     
     conn = get_db_connection()
     holding_id = None
@@ -451,18 +486,17 @@ def create_holding(portfolio_id):
                     value_before,
                     value_after,
                 ))
-            
-        conn.commit()
 
-        if snapshot_price is not None and holding_id is not None:
-            with conn.cursor() as cur:
+            if snapshot_price is not None:
                 cur.execute(
                     """UPDATE holdings
                        SET last_price = %s, last_price_updated_at = CURRENT_TIMESTAMP
                        WHERE id = %s""",
                     (snapshot_price, holding_id)
                 )
-            conn.commit()
+            refresh_rollups(cur, portfolio_ids=[portfolio_id], tickers=[ticker])
+
+        conn.commit()
 
         price_str = f" @ ${snapshot_price:.2f}" if snapshot_price is not None else ""
         flash(f'Added {shares} shares of {ticker}{price_str} to portfolio', 'success')
@@ -500,34 +534,21 @@ def refresh_prices(portfolio_id):
         flash('No holdings to refresh', 'error')
         return redirect(url_for('view_portfolio', portfolio_id=portfolio_id))
 
-    price_map = {}
-    for row in rows:
-        t = row['ticker']
-        try:
-            yf_price = yf.Ticker(t).fast_info.get('lastPrice')
-            if not yf_price:
-                yf_price = float(
-                    yf.download(t, period='1d', progress=False, multi_level_index=False)['Close'].iloc[-1]
-                )
-            if yf_price:
-                price_map[t] = float(yf_price)
-        except Exception:
-            pass
+    from quotes import fetch_last_prices, update_holding_prices
+    prices, failed = fetch_last_prices(row['ticker'] for row in rows)
 
     conn = get_db_connection()
     try:
         with conn.cursor() as cur:
-            for row in rows:
-                price = price_map.get(row['ticker'])
-                if price is not None:
-                    cur.execute(
-                        """UPDATE holdings
-                           SET last_price = %s, last_price_updated_at = CURRENT_TIMESTAMP
-                           WHERE id = %s""",
-                        (price, row['id'])
-                    )
+            if update_holding_prices(cur, prices, portfolio_id=portfolio_id):
+                refresh_rollups(cur, portfolio_ids=[portfolio_id], tickers=list(prices))
         conn.commit()
-        flash('Prices refreshed successfully', 'success')
+        if not prices:
+            flash('Could not fetch prices for any holdings', 'error')
+        elif failed:
+            flash(f'Refreshed {len(prices)} tickers; no quote for {", ".join(failed)}', 'success')
+        else:
+            flash('Prices refreshed successfully', 'success')
     except Exception as e:
         conn.rollback()
         flash(f'Error refreshing prices: {str(e)}', 'error')
@@ -536,6 +557,80 @@ def refresh_prices(portfolio_id):
 
     return redirect(url_for('view_portfolio', portfolio_id=portfolio_id))
 
+@app.route('/portfolio/<int:portfolio_id>/holdings/import', methods=['POST'])
+@login_required
+def import_holdings_csv(portfolio_id):
+    """Bulk-add holdings from an uploaded CSV; JSON callers get per-row results."""
+    wants_json = request.accept_mimetypes.best == 'application/json'
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id FROM portfolios WHERE id = %s AND user_id = %s", (portfolio_id, current_user.id))
+            found = cur.fetchone()
+    finally:
+        put_db_connection(conn)
+    if not found:
+        if wants_json:
+            return {"error": "Portfolio not found"}, 404
+        flash('Portfolio not found', 'error')
+        return redirect(url_for('dashboard'))
+
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        if wants_json:
+            return {"error": "No file uploaded"}, 400
+        flash('Choose a CSV file to import', 'error')
+        return redirect(url_for('view_portfolio', portfolio_id=portfolio_id))
+
+    from holdings_import import CSVImportError, import_holdings, summarize
+    try:
+        lines = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+        results = import_holdings(portfolio_id, lines)
+    except (CSVImportError, UnicodeDecodeError, csv.Error) as e:
+        if wants_json:
+            return {"error": str(e)}, 400
+        flash(f'Could not import file: {e}', 'error')
+        return redirect(url_for('view_portfolio', portfolio_id=portfolio_id))
+
+    counts = summarize(results)
+    if wants_json:
+        return {"summary": counts, "rows": results}
+
+    problems = [r for r in results if r['status'] != 'imported' or r['message']]
+    flash(', '.join(f'{n} {status}' for status, n in counts.items()) or 'No rows found',
+          'error' if counts.get('failed') else 'success')
+    for r in problems[:10]:
+        flash(f"Line {r['line']} ({r['ticker'] or 'blank'}): {r['message']}", 'error')
+    if len(problems) > 10:
+        flash(f'{len(problems) - 10} more rows need attention', 'error')
+    return redirect(url_for('view_portfolio', portfolio_id=portfolio_id))
+
+@app.route('/portfolio/<int:portfolio_id>/prices/stream')
+@login_required
+def stream_prices(portfolio_id):
+    """Server-sent price updates for the tickers in a portfolio."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT DISTINCT h.ticker FROM holdings h
+                JOIN portfolios p ON h.portfolio_id = p.id
+                WHERE p.id = %s AND p.user_id = %s
+                ORDER BY h.ticker
+            """, (portfolio_id, current_user.id))
+            tickers = [row[0] for row in cur.fetchall()]
+    finally:
+        put_db_connection(conn)
+    if not tickers:
+        return {"error": "No holdings to stream"}, 404
+
+    from price_stream import get_poller, sse_stream
+    return Response(
+        sse_stream(get_poller(), tickers),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
 @app.route('/holding/<int:holding_id>/delete', methods=['POST'])
 @login_required
 def delete_holding(holding_id):
@@ -560,7 +655,8 @@ def delete_holding(holding_id):
             ticker = holding['ticker']
             
             cur.execute("DELETE FROM holdings WHERE id = %s", (holding_id,))
-            
+            refresh_rollups(cur, portfolio_ids=[portfolio_id], tickers=[ticker])
+
         conn.commit()
         flash(f'Removed {ticker} from portfolio', 'success')
     except Exception as e:
@@ -606,29 +702,32 @@ def edit_holding(holding_id):
 @app.route('/alerts')
 @login_required
 def alerts():
-    """Display alerts with filtering options"""
+    """Display alerts with filtering options, newest first, one page at a time.
+
+    Pages are keyset-paginated on (created_at, id): ``before``/``before_id``
+    carry the last row of the previous page, so deep pages cost the same as
+    the first.
+    """
     portfolio_id = request.args.get('portfolio_id', type=int)
     date_from = request.args.get('date_from')
     date_to = request.args.get('date_to')
+    before = request.args.get('before')
+    before_id = request.args.get('before_id', type=int)
     
     conn = get_db_connection()
     try:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            query = """
-                SELECT a.* FROM alerts a
-                JOIN portfolios p ON a.portfolio_id = p.id
-                WHERE p.user_id = %s
-            """
-            params = [current_user.id]
-            
-            if portfolio_id:
-                query += " AND a.portfolio_id = %s"
-                params.append(portfolio_id)
-            
+            # Newest page per portfolio from idx_alerts_portfolio_created,
+            # then merged: cost is bounded by portfolios x page size however
+            # deep the page, where one ORDER BY over the join sorts every
+            # matching alert of the user.
+            conditions = []
+            params = []
+
             if date_from:
                 try:
                     date_from_obj = datetime.strptime(date_from, '%Y-%m-%d')
-                    query += " AND a.created_at >= %s"
+                    conditions.append("a.created_at >= %s")
                     params.append(date_from_obj)
                 except ValueError:
                     pass
@@ -636,24 +735,46 @@ def alerts():
             if date_to:
                 try:
                     date_to_obj = datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1)
-                    query += " AND a.created_at < %s"
+                    conditions.append("a.created_at < %s")
                     params.append(date_to_obj)
                 except ValueError:
                     pass
+
+            if before and before_id:
+                try:
+                    params.extend([datetime.fromisoformat(before), before_id])
+                    conditions.append("(a.created_at, a.id) < (%s, %s)")
+                except ValueError:
+                    pass
+
+            query = f"""
+                SELECT a.*, p.name AS portfolio_name
+                FROM portfolios p
+                CROSS JOIN LATERAL (
+                    SELECT * FROM alerts a
+                    WHERE a.portfolio_id = p.id {''.join(' AND ' + c for c in conditions)}
+                    ORDER BY a.created_at DESC, a.id DESC
+                    LIMIT %s
+                ) a
+                WHERE p.user_id = %s
+            """
+            params.extend([ALERTS_PAGE_SIZE + 1, current_user.id])
+            
+            if portfolio_id:
+                query += " AND p.id = %s"
+                params.append(portfolio_id)
             
-            query += " ORDER BY a.created_at DESC LIMIT 50"
+            query += " ORDER BY a.created_at DESC, a.id DESC LIMIT %s"
+            params.append(ALERTS_PAGE_SIZE + 1)
             
             cur.execute(query, tuple(params))
             alerts_list = cur.fetchall()
-            
-            # Enrich alerts with portfolio names
-            for alert in alerts_list:
-                if alert['portfolio_id']:
-                    cur.execute("SELECT name FROM portfolios WHERE id = %s", (alert['portfolio_id'],))
-                    port = cur.fetchone()
-                    alert['portfolio_name'] = port['name'] if port else 'Unknown'
-                else:
-                    alert['portfolio_name'] = 'Unknown'
+
+            next_cursor = None
+            if len(alerts_list) > ALERTS_PAGE_SIZE:
+                alerts_list = alerts_list[:ALERTS_PAGE_SIZE]
+                last = alerts_list[-1]
+                next_cursor = {'before': last['created_at'].isoformat(), 'before_id': last['id']}
             
             cur.execute("SELECT * FROM portfolios WHERE user_id = %s", (current_user.id,))
             all_portfolios = cur.fetchall()
@@ -666,7 +787,9 @@ def alerts():
                          all_portfolios=all_portfolios,
                          selected_portfolio=portfolio_id,
                          date_from=date_from,
-                         date_to=date_to)
+                         date_to=date_to,
+                         next_cursor=next_cursor,
+                         is_paged=bool(before and before_id))
 
 @app.route('/alert/<int:alert_id>/dismiss', methods=['POST'])
 @login_required
@@ -695,6 +818,35 @@ def dismiss_alert(alert_id):
     
     return redirect(request.referrer or url_for('alerts'))
 
+# ================== EXPORT ROUTES ==================
+
+@app.route('/export/<any(alerts, snapshots):name>.<any(csv, ndjson):fmt>')
+@login_required
+def export_data(name, fmt):
+    """Stream the user's alerts or holding snapshots, oldest first.
+
+    Accepts the same ``portfolio_id`` / ``date_from`` / ``date_to`` filters
+    as the alerts page.
+    """
+    from exports import FORMATS, stream_export
+
+    filters = {'portfolio_id': request.args.get('portfolio_id', type=int)}
+    try:
+        if request.args.get('date_from'):
+            filters['created_from'] = datetime.strptime(request.args['date_from'], '%Y-%m-%d')
+        if request.args.get('date_to'):
+            filters['created_before'] = datetime.strptime(request.args['date_to'], '%Y-%m-%d') + timedelta(days=1)
+    except ValueError:
+        return {"error": "Dates must be YYYY-MM-DD"}, 400
+
+    chunks = stream_export(name, fmt, current_user.id, **filters)
+    filename = f"{name}-{datetime.now().strftime('%Y%m%d')}.{fmt}"
+    return Response(
+        stream_with_context(chunks),
+        mimetype=FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
 # ================== ANALYTICS ROUTES ==================
 
 @app.route('/analytics')
@@ -704,16 +856,21 @@ def analytics():
     conn = get_db_connection()
     try:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            # ── Portfolios ──
-            cur.execute("SELECT id, name FROM portfolios WHERE user_id = %s ORDER BY id", (current_user.id,))
-            portfolios = cur.fetchall()
-            portfolio_ids = [p['id'] for p in portfolios]
-
-            # ── All holdings with prices ──
+            # ── Aggregates, maintained incrementally by rollups.refresh_rollups ──
+            rollup = load_user_rollups(cur, current_user.id)
+            portfolio_stats = rollup['portfolio_stats']
+            portfolio_ids = [p['id'] for p in portfolio_stats]
+            ticker_distribution = rollup['ticker_distribution']
+            total_value = rollup['total_value']
+            total_holdings = rollup['total_holdings']
+            unique_tickers = len(ticker_distribution)
+
+            # ── Top holdings table ──
             holdings = []
-            if portfolio_ids:
+            if total_holdings:
                 cur.execute("""
-                    SELECT h.id, h.ticker, h.shares, h.last_price, h.portfolio_id, p.name as portfolio_name
+                    SELECT h.id, h.ticker, h.shares, h.last_price, h.portfolio_id, p.name as portfolio_name,
+                           ROUND(COALESCE(h.shares * h.last_price, 0)::numeric, 2)::float8 AS market_value
                     FROM holdings h
                     JOIN portfolios p ON h.portfolio_id = p.id
                     WHERE p.user_id = %s
@@ -721,41 +878,6 @@ def analytics():
                 """, (current_user.id,))
                 holdings = cur.fetchall()
 
-            # ── Compute per-holding market value ──
-            for h in holdings:
-                h['market_value'] = round(h['shares'] * h['last_price'], 2) if h['last_price'] else 0.0
-
-            total_value = sum(h['market_value'] for h in holdings)
-            total_holdings = len(holdings)
-            unique_tickers = len(set(h['ticker'] for h in holdings))
-
-            # ── Holdings by portfolio (bar chart data) ──
-            portfolio_stats = []
-            for p in portfolios:
-                count = sum(1 for h in holdings if h['portfolio_id'] == p['id'])
-                value = sum(h['market_value'] for h in holdings if h['portfolio_id'] == p['id'])
-                portfolio_stats.append({
-                    'name': p['name'],
-                    'holdings': count,
-                    'value': round(value, 2)
-                })
-
-            # ── Ticker distribution (donut chart data) ──
-            ticker_map = {}
-            for h in holdings:
-                t = h['ticker']
-                if t in ticker_map:
-                    ticker_map[t]['value'] += h['market_value']
-                    ticker_map[t]['shares'] += h['shares']
-                else:
-                    ticker_map[t] = {
-                        'ticker': t,
-                        'value': h['market_value'],
-                        'shares': h['shares'],
-                        'price': h['last_price'] or 0,
-                    }
-            ticker_distribution = sorted(ticker_map.values(), key=lambda x: x['value'], reverse=True)
-
             # ── Alerts over last 7 days (line chart data) ──
             alert_history = []
             if portfolio_ids:
@@ -780,6 +902,22 @@ def analytics():
                         'count': alert_map.get(day, 0)
                     })
 
+            # ── Portfolio value over the last year (valuations.sync_portfolio_values) ──
+            value_history = []
+            if portfolio_ids:
+                cur.execute("""
+                    SELECT v.day, SUM(v.market_value) AS value
+                    FROM portfolio_values v
+                    WHERE v.portfolio_id = ANY(%s)
+                      AND v.day >= CURRENT_DATE - INTERVAL '1 year'
+                    GROUP BY v.day
+                    ORDER BY v.day
+                """, (portfolio_ids,))
+                value_history = [
+                    {'day': r['day'].isoformat(), 'value': round(r['value'], 2)}
+                    for r in cur.fetchall()
+                ]
+
     finally:
         put_db_connection(conn)
 
@@ -790,6 +928,7 @@ def analytics():
                          portfolio_stats=portfolio_stats,
                          ticker_distribution=ticker_distribution,
                          alert_history=alert_history,
+                         value_history=value_history,
                          holdings=holdings)
 
 @app.route('/settings')
@@ -813,8 +952,8 @@ def internal_error(error):
     flash('An internal error occurred', 'error')
     return redirect(url_for('dashboard'))
 
-@app.route('/api/run-workflow', methods=['POST'])
-def run_workflow_api():
+def check_cron_secret():
+    """Error response unless the request carries ``Bearer $CRON_SECRET``."""
     cron_secret = os.getenv('CRON_SECRET')
     if not cron_secret:
         return {"error": "CRON_SECRET is not configured"}, 503
@@ -823,13 +962,46 @@ def run_workflow_api():
     expected = f"Bearer {cron_secret}"
     if not token or not secrets.compare_digest(token, expected):
         return {"error": "Unauthorized"}, 401
-    
+    return None
+
+@app.route('/api/run-workflow', methods=['POST'])
+def run_workflow_api():
+    denied = check_cron_secret()
+    if denied:
+        return denied
+
+    # Only queue the work here; worker.py runs the per-ticker jobs.
     try:
-        run_root_workflow()
-        return {"status": "success"}
+        from roma.workflow import enqueue_workflow
+        job_ids = enqueue_workflow()
+        return {"status": "queued", "jobs": len(job_ids)}, 202
     except Exception as e:
         return {"error": str(e)}, 500
 
+@app.route('/api/db-pool')
+def db_pool_api():
+    """Connection pool gauges and counters, for sizing the pool."""
+    denied = check_cron_secret()
+    if denied:
+        return denied
+    return pool_stats()
+
+@app.route('/api/workflow-runs')
+def workflow_runs_api():
+    """Recent checkpointed workflow runs with per-stage timings."""
+    denied = check_cron_secret()
+    if denied:
+        return denied
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+    from roma.runs import recent_runs
+    conn = get_db_connection()
+    try:
+        runs = recent_runs(conn, limit)
+        conn.commit()
+    finally:
+        put_db_connection(conn)
+    return {"runs": runs}
+
 if __name__ == '__main__':
     initialize_app()
     app.run(debug=True)
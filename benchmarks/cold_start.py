@@ -0,0 +1,87 @@
+"""Measure web cold-start cost: import time and first-request latency.
+
+    python benchmarks/cold_start.py              # needs NEON_DATABASE_URL / DATABASE_URL
+    python benchmarks/cold_start.py --no-db      # skip init_db to isolate Python costs
+    python benchmarks/cold_start.py --top 25 --runs 5
+
+Each run starts a fresh interpreter with ``python -X importtime``, imports
+``app`` and issues one GET (``/login`` by default) through the Flask test
+client. Reports wall-clock phases plus the slowest imports by cumulative
+time, and lists any heavy analytics modules that were loaded.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules the web process should only load on first use.
+HEAVY_MODULES = ['yfinance', 'pandas', 'numpy', 'prophet', 'cmdstanpy', 'vaderSentiment', 'apscheduler']
+
+_CHILD = r'''
+import json, sys, time
+t0 = time.perf_counter()
+import app as web
+t1 = time.perf_counter()
+if {no_db!r}:
+    web.initialize_app = lambda: None
+client = web.app.test_client()
+response = client.get({path!r})
+t2 = time.perf_counter()
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"import_s": t1 - t0, "first_request_s": t2 - t1,
+                  "status": response.status_code, "heavy": heavy}}))
+'''
+
+
+def parse_importtime(stderr):
+    """``[(cumulative_us, self_us, module), ...]`` from ``-X importtime`` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = (part.strip() for part in line.split(':', 1)[1].split('|'))
+        rows.append((int(cumulative_us), int(self_us), module))
+    return rows
+
+
+def run_once(path, no_db):
+    code = _CHILD.format(no_db=no_db, path=path, heavy=HEAVY_MODULES)
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(proc.stderr.strip().splitlines()[-1] if proc.stderr else 'benchmark child failed')
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result['imports'] = parse_importtime(proc.stderr)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--path', default='/login', help='URL of the first request')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15, help='slowest imports to list')
+    parser.add_argument('--no-db', action='store_true', help='skip database initialisation')
+    args = parser.parse_args()
+
+    runs = [run_once(args.path, args.no_db) for _ in range(args.runs)]
+    imports = [r['import_s'] * 1000 for r in runs]
+    firsts = [r['first_request_s'] * 1000 for r in runs]
+    print(f"runs: {args.runs}  first request: GET {args.path} -> {runs[-1]['status']}")
+    print(f"import app:     median {statistics.median(imports):8.1f} ms  (min {min(imports):.1f})")
+    print(f"first request:  median {statistics.median(firsts):8.1f} ms  (min {min(firsts):.1f})")
+    print(f"heavy modules loaded: {', '.join(runs[-1]['heavy']) or 'none'}")
+
+    print("\nslowest imports (cumulative, last run):")
+    for cumulative_us, self_us, module in sorted(runs[-1]['imports'], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {self_us / 1000:7.1f} ms self  {module}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Measure Neynar search throughput against a local stub server.
+
+    python benchmarks/neynar_throughput.py --queries 200 --latency 0.05 --concurrency 16
+
+Compares one-at-a-time searches with ``NeynarClient.search_many``; no API
+key or network access is needed.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from roma.neynar import NeynarClient  # noqa: E402
+
+
+def make_handler(latency):
+    body = json.dumps({'result': {'casts': [{'text': 'great quarter'}] * 50}}).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.05, help='stub response delay in seconds')
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(args.latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/search'
+    queries = [f'T{i}' for i in range(args.queries)]
+
+    try:
+        serial = NeynarClient(api_key='bench', url=url, concurrency=1)
+        start = time.perf_counter()
+        for q in queries:
+            serial.search(q)
+        serial_s = time.perf_counter() - start
+
+        pooled = NeynarClient(api_key='bench', url=url, concurrency=args.concurrency)
+        start = time.perf_counter()
+        for _ in pooled.search_many(queries):
+            pass
+        pooled_s = time.perf_counter() - start
+    finally:
+        server.shutdown()
+
+    print(f"serial:  {args.queries / serial_s:8.1f} queries/s ({serial_s:.2f}s)")
+    print(f"pooled:  {args.queries / pooled_s:8.1f} queries/s ({pooled_s:.2f}s, concurrency={args.concurrency})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Measure per-request ``users`` queries with and without the user cache.
+
+    python benchmarks/user_loader.py --requests 2000 --threads 8 --latency 0.02
+
+Drives authenticated GETs (``/settings`` by default) through the Flask test
+client from several threads. The database is replaced by an in-memory
+connection that sleeps ``--latency`` seconds per query, standing in for a
+Neon round trip, so no database is needed.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as web  # noqa: E402
+
+USER_ROW = {'id': 1, 'username': 'bench', 'email': 'bench@example.com', 'created_at': None}
+
+
+class LatencyConnection:
+    """Answers every query with ``USER_ROW`` after a simulated round trip."""
+    def __init__(self, latency, counter):
+        self.latency = latency
+        self.counter = counter
+
+    def cursor(self, cursor_factory=None):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        time.sleep(self.latency)
+        self.counter.add(query)
+
+    def fetchone(self):
+        return dict(USER_ROW)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self, query):
+        with self._lock:
+            self.count += 1
+
+
+def run(path, requests, threads, latency, cached):
+    counter = QueryCounter()
+    web.initialize_app = lambda: None
+    web.get_db_connection = lambda timeout=None: LatencyConnection(latency, counter)
+    web.put_db_connection = lambda conn: None
+    web.user_cache.clear()
+
+    def worker(n):
+        client = web.app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(USER_ROW['id'])
+            sess['_fresh'] = True
+        for _ in range(n):
+            if not cached:
+                web.user_cache.clear()
+            response = client.get(path)
+            assert response.status_code == 200, response.status_code
+
+    per_thread = [requests // threads + (1 if i < requests % threads else 0) for i in range(threads)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, per_thread))
+    elapsed = time.perf_counter() - started
+    return {
+        'queries_per_request': counter.count / requests,
+        'requests_per_second': requests / elapsed,
+        'mean_ms': elapsed / requests * threads * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', default='/settings')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds per simulated query')
+    args = parser.parse_args()
+
+    print(f"{args.requests} GET {args.path} from {args.threads} threads, {args.latency * 1000:.0f} ms per query")
+    print(f"{'mode':<10}{'queries/req':>14}{'req/s':>10}{'mean ms':>10}")
+    for label, cached in (('uncached', False), ('cached', True)):
+        result = run(args.path, args.requests, args.threads, args.latency, cached)
+        print(f"{label:<10}{result['queries_per_request']:>14.3f}"
+              f"{result['requests_per_second']:>10.1f}{result['mean_ms']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""Shared quote / price-history cache.
+
+Entries live in a per-process LRU bounded by entry count and approximate
+memory, each with its own TTL. An optional backend (``CACHE_BACKEND`` set
+to ``postgres`` or ``file``) lets gunicorn workers and the scheduler reuse
+each other's results. Shared entries are stored as JSON (DataFrames in
+pandas' ``table`` format), never pickled, and the file backend only uses a
+directory private to the current user.
+"""
+
+import hashlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+QUOTE_TTL = int(os.getenv('QUOTE_CACHE_TTL', '60'))
+HISTORY_TTL = int(os.getenv('HISTORY_CACHE_TTL', '3600'))
+USER_TTL = int(os.getenv('USER_CACHE_TTL', '300'))
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '2048'))
+CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', '').lower()
+CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'stock-monitor-cache'))
+
+_MISSING = object()
+
+
+def private_dir(directory):
+    """Create ``directory`` with mode 0700; refuse one owned by another user."""
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    st = os.stat(directory)
+    if hasattr(os, 'getuid'):
+        if st.st_uid != os.getuid():
+            raise PermissionError(f"{directory} is owned by another user")
+        if st.st_mode & 0o077:
+            os.chmod(directory, 0o700)
+    return directory
+
+
+def _encode(value):
+    if hasattr(value, 'to_json'):
+        value = {'__frame__': value.to_json(orient='table')}
+    return json.dumps(value).encode('utf-8')
+
+
+def _decode(data):
+    value = json.loads(data)
+    if isinstance(value, dict) and '__frame__' in value:
+        import pandas as pd
+        return pd.read_json(io.StringIO(value['__frame__']), orient='table')
+    return value
+
+
+def _sizeof(value):
+    if hasattr(value, 'memory_usage'):
+        try:
+            usage = value.memory_usage(deep=True)
+            return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+        except Exception:
+            pass
+    return sys.getsizeof(value)
+
+
+class FileBackend:
+    """JSON entries in a private directory, one file per key."""
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = private_dir(directory)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def get_many(self, keys):
+        now = time.time()
+        found = {}
+        for key in keys:
+            try:
+                with open(self._path(key), 'rb') as f:
+                    expires_at = float(f.readline())
+                    value = _decode(f.read())
+            except (OSError, ValueError, TypeError):
+                continue
+            if expires_at > now:
+                found[key] = (expires_at, value)
+        return found
+
+    def set_many(self, items, expires_at):
+        for key, value in items.items():
+            fd, tmp = tempfile.mkstemp(dir=self.directory)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(f'{expires_at!r}\n'.encode('ascii') + _encode(value))
+                os.replace(tmp, self._path(key))
+            except OSError:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+
+    def delete(self, key):
+        try:
+            os.unlink(self._path(key))
+        except OSError:
+            pass
+
+
+class PostgresBackend:
+    """Entries in the ``cache_entries`` table (migration 0002)."""
+    def get_many(self, keys):
+        from db import get_db_connection, put_db_connection
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT key, value, EXTRACT(EPOCH FROM expires_at)
+                    FROM cache_entries
+                    WHERE key = ANY(%s) AND expires_at > CURRENT_TIMESTAMP
+                """, (list(keys),))
+                rows = cur.fetchall()
+            conn.commit()
+        finally:
+            put_db_connection(conn)
+        found = {}
+        for key, value, exp in rows:
+            try:
+                found[key] = (float(exp), _decode(bytes(value)))
+            except (ValueError, TypeError):
+                # Written by an older version (pickled) or not ours; treat as a miss.
+                continue
+        return found
+
+    def set_many(self, items, expires_at):
+        from psycopg2 import Binary
+        from psycopg2.extras import execute_values
+        from db import get_db_connection, put_db_connection
+        rows = [
+            (key, Binary(_encode(value)), expires_at)
+            for key, value in items.items()
+        ]
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                execute_values(cur, """
+                    INSERT INTO cache_entries (key, value, expires_at) VALUES %s
+                    ON CONFLICT (key) DO UPDATE
+                    SET value = EXCLUDED.value, expires_at = EXCLUDED.expires_at
+                """, rows, template="(%s, %s, to_timestamp(%s))")
+            conn.commit()
+        finally:
+            put_db_connection(conn)
+
+    def delete(self, key):
+        from db import get_db_connection, put_db_connection
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM cache_entries WHERE key = %s", (key,))
+            conn.commit()
+        finally:
+            put_db_connection(conn)
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry TTLs and hit/miss counters."""
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES, backend=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.backend_hits = 0
+        self.evictions = 0
+
+    def _store(self, key, value, expires_at):
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._entries[key] = (expires_at, size, value)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def _lookup(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        if entry[0] <= now:
+            del self._entries[key]
+            self._bytes -= entry[1]
+            return _MISSING
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def get_many(self, keys):
+        """Return ``{key: value}`` for every key that is cached and fresh."""
+        now = time.time()
+        found = {}
+        with self._lock:
+            for key in keys:
+                value = self._lookup(key, now)
+                if value is not _MISSING:
+                    found[key] = value
+        missing = [k for k in keys if k not in found]
+        if missing and self.backend is not None:
+            try:
+                shared = self.backend.get_many(missing)
+            except Exception as e:
+                print(f"Cache backend read failed: {e}")
+                shared = {}
+            with self._lock:
+                for key, (expires_at, value) in shared.items():
+                    self._store(key, value, expires_at)
+                    found[key] = value
+                self.backend_hits += len(shared)
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def set_many(self, items, ttl):
+        if not items:
+            return
+        expires_at = time.time() + ttl
+        with self._lock:
+            for key, value in items.items():
+                self._store(key, value, expires_at)
+        if self.backend is not None:
+            try:
+                self.backend.set_many(items, expires_at)
+            except Exception as e:
+                print(f"Cache backend write failed: {e}")
+
+    def set(self, key, value, ttl):
+        self.set_many({key: value}, ttl)
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+        if self.backend is not None:
+            try:
+                self.backend.delete(key)
+            except Exception as e:
+                print(f"Cache backend delete failed: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'backend_hits': self.backend_hits,
+                'evictions': self.evictions,
+            }
+
+
+def _make_backend(name):
+    if name == 'postgres':
+        return PostgresBackend()
+    if name == 'file':
+        try:
+            return FileBackend()
+        except OSError as e:
+            print(f"Cache backend disabled: {e}")
+    return None
+
+
+market_cache = TTLCache(backend=_make_backend(CACHE_BACKEND))
+
+# Logged-in user rows for Flask-Login. Per process only: a change made in
+# one worker is invalidated there and reaches the others within USER_TTL.
+user_cache = TTLCache(max_entries=10000)
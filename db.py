@@ -1,10 +1,158 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg2
 from psycopg2 import pool
 from psycopg2.extras import RealDictCursor
 from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from migrations import ensure_schema
+
+# Seconds to wait for a free connection before raising PoolTimeout.
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+# Connections idle longer than this are pinged before being handed out.
+DB_POOL_PING_AFTER = float(os.getenv('DB_POOL_PING_AFTER', '30'))
+# Connections older than this are closed instead of being reused (0: never).
+DB_POOL_MAX_AGE = float(os.getenv('DB_POOL_MAX_AGE', '1800'))
+# Server-side statement_timeout for pooled connections (0: no limit).
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '30000'))
 
 _pool = None
 
+
+class PoolTimeout(pool.PoolError):
+    """No connection became free within the acquire timeout."""
+
+
+class ConnectionPool:
+    """``ThreadedConnectionPool`` that waits for a free connection.
+
+    Callers block (up to ``timeout``) instead of failing when every
+    connection is checked out. Connections that sat idle are pinged before
+    reuse and old ones are recycled, so a connection the server dropped is
+    replaced rather than handed out.
+    """
+    def __init__(self, minconn, maxconn, dsn, timeout=DB_POOL_TIMEOUT,
+                 ping_after=DB_POOL_PING_AFTER, max_age=DB_POOL_MAX_AGE, **kwargs):
+        self._pool = pool.ThreadedConnectionPool(minconn, maxconn, dsn, **kwargs)
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.max_age = max_age
+        self._cond = threading.Condition()
+        self._in_use = 0
+        self._waiting = 0
+        self._born = {}
+        self._released = {}
+        self._leased = {}
+        self._counters = {
+            'acquired': 0, 'timeouts': 0, 'failures': 0, 'discarded': 0,
+            'wait_seconds': 0.0, 'max_wait_seconds': 0.0,
+            'lease_seconds': 0.0, 'max_lease_seconds': 0.0,
+        }
+
+    def getconn(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        with self._cond:
+            self._waiting += 1
+            try:
+                while self._in_use >= self.maxconn:
+                    remaining = started + timeout - time.monotonic()
+                    if remaining <= 0:
+                        self._counters['timeouts'] += 1
+                        self._counters['failures'] += 1
+                        raise PoolTimeout(
+                            f"No database connection free after {timeout:.1f}s "
+                            f"({self.maxconn} in use)"
+                        )
+                    self._cond.wait(remaining)
+                self._in_use += 1
+            finally:
+                self._waiting -= 1
+        try:
+            conn = self._checkout()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._counters['failures'] += 1
+                self._cond.notify()
+            raise
+        now = time.monotonic()
+        waited = now - started
+        with self._cond:
+            self._leased[id(conn)] = now
+            self._counters['acquired'] += 1
+            self._counters['wait_seconds'] += waited
+            self._counters['max_wait_seconds'] = max(self._counters['max_wait_seconds'], waited)
+        return conn
+
+    def _checkout(self):
+        # Bounded: each discard closes a connection, so the pool opens a new
+        # one on the next attempt.
+        for _ in range(self.maxconn + 1):
+            conn = self._pool.getconn()
+            if self._usable(conn):
+                return conn
+            self._discard(conn)
+        raise pool.PoolError("Could not open a working database connection")
+
+    def _usable(self, conn):
+        if conn.closed:
+            return False
+        now = time.monotonic()
+        born = self._born.setdefault(id(conn), now)
+        if self.max_age and now - born > self.max_age:
+            return False
+        if now - self._released.get(id(conn), born) < self.ping_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        self._born.pop(id(conn), None)
+        self._released.pop(id(conn), None)
+        self._counters['discarded'] += 1
+        self._pool.putconn(conn, close=True)
+
+    def putconn(self, conn, close=False):
+        now = time.monotonic()
+        with self._cond:
+            leased_at = self._leased.pop(id(conn), now)
+            lease = now - leased_at
+            self._counters['lease_seconds'] += lease
+            self._counters['max_lease_seconds'] = max(self._counters['max_lease_seconds'], lease)
+        try:
+            born = self._born.get(id(conn), now)
+            if close or conn.closed or (self.max_age and now - born > self.max_age):
+                self._discard(conn)
+            else:
+                self._released[id(conn)] = now
+                self._pool.putconn(conn)
+        finally:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max': self.maxconn,
+                'in_use': self._in_use,
+                'idle': len(self._pool._pool),
+                'waiting': self._waiting,
+                **self._counters,
+            }
+
+    def closeall(self):
+        self._pool.closeall()
+
 def normalize_database_url(database_url: str) -> str:
     if not database_url:
         raise ValueError("DATABASE_URL is required")
@@ -33,101 +181,49 @@ def init_db(database_url: str):
     database_url = normalize_database_url(database_url)
 
     min_connections = 1
-    max_connections = 5 if '-pooler.' in database_url else 10
-    _pool = pool.ThreadedConnectionPool(min_connections, max_connections, database_url)
+    pooled = '-pooler.' in database_url
+    max_connections = 5 if pooled else 10
+    kwargs = {}
+    # Neon's pooler (PgBouncer) rejects startup options; set the timeout on
+    # the role there instead.
+    if DB_STATEMENT_TIMEOUT_MS and not pooled:
+        kwargs['options'] = f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'
+    _pool = ConnectionPool(min_connections, max_connections, database_url, **kwargs)
     
-    # Initialize schema
+    # Bring the schema up to date; a single version read when it already is.
     conn = get_db_connection()
     try:
-        with conn.cursor() as cur:
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    id SERIAL PRIMARY KEY,
-                    username VARCHAR(80) UNIQUE NOT NULL,
-                    email VARCHAR(255) UNIQUE NOT NULL,
-                    password_hash VARCHAR(255) NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-            """)
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS portfolios (
-                    id SERIAL PRIMARY KEY,
-                    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-                    name VARCHAR(255) NOT NULL,
-                    description TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-            """)
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS holdings (
-                    id SERIAL PRIMARY KEY,
-                    portfolio_id INTEGER REFERENCES portfolios(id) ON DELETE CASCADE,
-                    ticker VARCHAR(50) NOT NULL,
-                    shares FLOAT NOT NULL DEFAULT 0.0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-            """)
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS alerts (
-                    id SERIAL PRIMARY KEY,
-                    portfolio_id INTEGER REFERENCES portfolios(id) ON DELETE CASCADE,
-                    message TEXT NOT NULL,
-                    is_read BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-            """)
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS holding_snapshots (
-                    id SERIAL PRIMARY KEY,
-                    holding_id INTEGER REFERENCES holdings(id) ON DELETE CASCADE,
-                    portfolio_id INTEGER REFERENCES portfolios(id) ON DELETE CASCADE,
-                    ticker VARCHAR(50) NOT NULL,
-                    event VARCHAR(20) NOT NULL,
-                    shares_delta FLOAT NOT NULL,
-                    shares_total FLOAT NOT NULL,
-                    price_at_event FLOAT,
-                    value_before FLOAT,
-                    value_after FLOAT,
-                    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-                );
-            """)
-            # Add user_id column to portfolios if it doesn't exist (migration)
-            cur.execute("""
-                DO $$
-                BEGIN
-                    IF NOT EXISTS (
-                        SELECT 1 FROM information_schema.columns
-                        WHERE table_name = 'portfolios' AND column_name = 'user_id'
-                    ) THEN
-                        ALTER TABLE portfolios ADD COLUMN user_id INTEGER REFERENCES users(id) ON DELETE CASCADE;
-                    END IF;
-                END $$;
-            """)
-            cur.execute("""
-                DO $$
-                BEGIN
-                    IF NOT EXISTS (
-                        SELECT 1 FROM information_schema.columns
-                        WHERE table_name = 'holdings' AND column_name = 'last_price'
-                    ) THEN
-                        ALTER TABLE holdings
-                            ADD COLUMN last_price FLOAT,
-                            ADD COLUMN last_price_updated_at TIMESTAMP WITH TIME ZONE;
-                    END IF;
-                END $$;
-            """)
-        conn.commit()
+        ensure_schema(conn)
     finally:
         put_db_connection(conn)
 
-def get_db_connection():
+def get_db_connection(timeout=None):
+    """Check out a connection, waiting up to ``timeout`` (``DB_POOL_TIMEOUT``)."""
     if _pool is None:
         raise RuntimeError("Database not initialized. Call init_db first.")
-    return _pool.getconn()
+    return _pool.getconn(timeout)
 
 def put_db_connection(conn):
     if _pool is not None and conn is not None:
         _pool.putconn(conn)
+
+@contextmanager
+def db_connection(timeout=None):
+    """Lease a connection for a ``with`` block.
+
+    Commits when the block finishes, rolls back if it raises, and always
+    returns the connection to the pool.
+    """
+    conn = get_db_connection(timeout)
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        put_db_connection(conn)
+
+def pool_stats():
+    """Pool gauges and counters (empty before ``init_db``)."""
+    return _pool.stats() if _pool is not None else {}
@@ -0,0 +1,155 @@
+"""Streaming CSV / NDJSON exports of a user's alerts and holding snapshots.
+
+Rows are read in keyset pages of ``EXPORT_ITERSIZE`` on ``(created_at, id)``
+and encoded chunk by chunk, so memory stays flat however much history is
+exported. Each page takes at most a page of rows from every portfolio along
+its ``(portfolio_id, created_at, id)`` index and merges them, so a page
+costs the same however deep into the export it is. Each page leases a pooled connection only for its query; none is
+held while a slow client downloads.
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+
+from db import get_db_connection, put_db_connection
+
+EXPORT_ITERSIZE = int(os.getenv('EXPORT_ITERSIZE', '2000'))
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# name -> (columns, query). ``{conditions}`` and ``{limit}`` go inside the
+# per-portfolio subquery; the query then takes the user id.
+# ``id`` must be the first column and ``created_at`` the last (the page key).
+EXPORTS = {
+    'alerts': (
+        ['id', 'portfolio_id', 'portfolio_name', 'message', 'is_read', 'created_at'],
+        """
+        SELECT r.id, r.portfolio_id, p.name, r.message, r.is_read, r.created_at
+        FROM portfolios p
+        CROSS JOIN LATERAL (
+            SELECT * FROM alerts r
+            WHERE r.portfolio_id = p.id{conditions}
+            ORDER BY r.created_at, r.id{limit}
+        ) r
+        WHERE p.user_id = %s
+        """,
+    ),
+    'snapshots': (
+        ['id', 'holding_id', 'portfolio_id', 'portfolio_name', 'ticker', 'event', 'shares_delta',
+         'shares_total', 'price_at_event', 'value_before', 'value_after', 'created_at'],
+        """
+        SELECT r.id, r.holding_id, r.portfolio_id, p.name, r.ticker, r.event, r.shares_delta,
+               r.shares_total, r.price_at_event, r.value_before, r.value_after, r.created_at
+        FROM portfolios p
+        CROSS JOIN LATERAL (
+            SELECT * FROM holding_snapshots r
+            WHERE r.portfolio_id = p.id{conditions}
+            ORDER BY r.created_at, r.id{limit}
+        ) r
+        WHERE p.user_id = %s
+        """,
+    ),
+}
+
+
+def build_query(name, user_id, portfolio_id=None, created_from=None, created_before=None,
+                after=None, limit=None):
+    """``(columns, sql, params)`` for one export, oldest rows first.
+
+    ``after`` is the ``(created_at, id)`` of the last row already read.
+    """
+    columns, query = EXPORTS[name]
+    conditions = []
+    params = []
+    if created_from:
+        conditions.append("r.created_at >= %s")
+        params.append(created_from)
+    if created_before:
+        conditions.append("r.created_at < %s")
+        params.append(created_before)
+    if after:
+        conditions.append("(r.created_at, r.id) > (%s, %s)")
+        params.extend(after)
+    if limit:
+        params.append(limit)
+    query = query.format(
+        conditions=''.join(' AND ' + c for c in conditions),
+        limit=' LIMIT %s' if limit else '',
+    )
+    params.append(user_id)
+    if portfolio_id:
+        query += " AND p.id = %s"
+        params.append(portfolio_id)
+    query += " ORDER BY r.created_at, r.id"
+    if limit:
+        query += " LIMIT %s"
+        params.append(limit)
+    return columns, query, tuple(params)
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def encode_csv(columns, batches):
+    """Yield a header line, then one CSV chunk per batch of rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            [v.isoformat() if isinstance(v, (datetime, date)) else v for v in row] for row in rows
+        )
+        yield buffer.getvalue()
+
+
+def encode_ndjson(columns, batches):
+    """Yield one chunk of newline-delimited JSON objects per batch of rows."""
+    for rows in batches:
+        yield ''.join(
+            json.dumps({c: _json_value(v) for c, v in zip(columns, row)}) + '\n' for row in rows
+        )
+
+
+ENCODERS = {'csv': encode_csv, 'ndjson': encode_ndjson}
+
+
+def _pages(name, user_id, size, filters):
+    """Yield lists of up to ``size`` rows, one short connection lease per page."""
+    after = None
+    while True:
+        _, query, params = build_query(name, user_id, after=after, limit=size, **filters)
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                rows = cur.fetchall()
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            put_db_connection(conn)
+        if rows:
+            yield rows
+        if len(rows) < size:
+            return
+        after = (rows[-1][-1], rows[-1][0])
+
+
+def stream_export(name, fmt, user_id, itersize=None, **filters):
+    """Generator of encoded chunks for one export."""
+    itersize = itersize or EXPORT_ITERSIZE
+    columns = EXPORTS[name][0]
+    yield from ENCODERS[fmt](columns, _pages(name, user_id, itersize, filters))
@@ -0,0 +1,242 @@
+"""Bulk holdings import from a CSV or broker statement export.
+
+Rows are streamed and validated one at a time; every distinct ticker is
+priced in one batched quote fetch, and the holdings, their snapshots and
+the portfolio rollups are written with set-based statements in a single
+transaction.
+
+    python -m holdings_import PORTFOLIO_ID positions.csv
+"""
+
+import argparse
+import csv
+import math
+import os
+import re
+import sys
+
+from psycopg2.extras import execute_values
+
+from db import get_db_connection, put_db_connection
+from rollups import refresh_rollups
+
+# Upper bound on rows read from one file.
+MAX_IMPORT_ROWS = 5000
+
+# Header names (lower-cased) accepted for each column; broker exports vary.
+TICKER_COLUMNS = ('ticker', 'symbol', 'instrument')
+SHARES_COLUMNS = ('shares', 'quantity', 'qty', 'units', 'position')
+
+_TICKER_RE = re.compile(r'^[A-Z0-9][A-Z0-9.\-=^]{0,14}$')
+
+
+class CSVImportError(ValueError):
+    """The file as a whole cannot be imported (e.g. no usable header)."""
+
+
+def _pick_column(fieldnames, accepted):
+    for name in fieldnames:
+        if (name or '').strip().lower() in accepted:
+            return name
+    return None
+
+
+def parse_rows(lines, max_rows=MAX_IMPORT_ROWS):
+    """Yield one result dict per data row of a CSV.
+
+    Each has ``line``, ``ticker``, ``shares`` and ``status`` ('ok' or
+    'invalid', with a ``message``). Blank rows are skipped.
+    """
+    reader = csv.DictReader(lines)
+    fieldnames = reader.fieldnames or []
+    ticker_col = _pick_column(fieldnames, TICKER_COLUMNS)
+    shares_col = _pick_column(fieldnames, SHARES_COLUMNS)
+    if ticker_col is None or shares_col is None:
+        raise CSVImportError(
+            f"CSV needs a ticker column ({'/'.join(TICKER_COLUMNS)}) "
+            f"and a shares column ({'/'.join(SHARES_COLUMNS)})"
+        )
+    for count, record in enumerate(reader, start=1):
+        if count > max_rows:
+            raise CSVImportError(f"CSV has more than {max_rows} rows")
+        raw_ticker = (record.get(ticker_col) or '').strip()
+        raw_shares = (record.get(shares_col) or '').strip()
+        if not raw_ticker and not raw_shares:
+            continue
+        result = {'line': reader.line_num, 'ticker': raw_ticker.upper(), 'shares': None,
+                  'status': 'ok', 'message': ''}
+        try:
+            shares = float(raw_shares.replace(',', ''))
+        except ValueError:
+            shares = None
+        if not _TICKER_RE.match(result['ticker']):
+            result.update(status='invalid', message=f"Invalid ticker {raw_ticker!r}")
+        elif shares is None or not math.isfinite(shares):
+            result.update(status='invalid', message=f"Invalid shares {raw_shares!r}")
+        elif shares <= 0:
+            result.update(status='invalid', message="Shares must be positive")
+        else:
+            result['shares'] = shares
+        yield result
+
+
+def write_holdings(cur, portfolio_id, deltas, prices):
+    """Add ``deltas`` (ticker -> shares) to a portfolio in the caller's transaction.
+
+    Returns ticker -> ``(holding_id, shares_total)``.
+    """
+    tickers = list(deltas)
+    # Serialise imports into the same portfolio: holdings has no unique
+    # (portfolio_id, ticker) key to upsert against.
+    cur.execute("SELECT id FROM portfolios WHERE id = %s FOR UPDATE", (portfolio_id,))
+    if cur.fetchone() is None:
+        raise ValueError(f"Portfolio {portfolio_id} not found")
+    cur.execute("""
+        SELECT id, ticker, shares FROM holdings
+        WHERE portfolio_id = %s AND ticker = ANY(%s)
+        ORDER BY id
+    """, (portfolio_id, tickers))
+    existing = {}
+    for holding_id, ticker, shares in cur.fetchall():
+        existing.setdefault(ticker, (holding_id, shares))
+
+    written = {}
+    updates = [(existing[t][0], deltas[t], prices.get(t)) for t in tickers if t in existing]
+    if updates:
+        rows = execute_values(cur, """
+            UPDATE holdings AS h
+            SET shares = h.shares + v.delta,
+                last_price = COALESCE(v.price, h.last_price),
+                last_price_updated_at = CASE WHEN v.price IS NULL THEN h.last_price_updated_at
+                                             ELSE CURRENT_TIMESTAMP END,
+                updated_at = CURRENT_TIMESTAMP
+            FROM (VALUES %s) AS v(id, delta, price)
+            WHERE h.id = v.id
+            RETURNING h.id, h.ticker, h.shares
+        """, updates, template='(%s, %s::float8, %s::float8)', page_size=len(updates), fetch=True)
+        written.update({ticker: (holding_id, shares) for holding_id, ticker, shares in rows})
+
+    inserts = [
+        (portfolio_id, t, deltas[t], prices.get(t), prices.get(t))
+        for t in tickers if t not in existing
+    ]
+    if inserts:
+        rows = execute_values(cur, """
+            INSERT INTO holdings (portfolio_id, ticker, shares, last_price, last_price_updated_at)
+            VALUES %s
+            RETURNING id, ticker, shares
+        """, inserts,
+            template="(%s, %s, %s, %s, CASE WHEN %s::float8 IS NULL THEN NULL ELSE CURRENT_TIMESTAMP END)",
+            page_size=len(inserts), fetch=True)
+        written.update({ticker: (holding_id, shares) for holding_id, ticker, shares in rows})
+
+    snapshots = []
+    for t in tickers:
+        holding_id, shares_total = written[t]
+        price = prices.get(t)
+        if t not in existing:
+            value_before = 0.0
+        else:
+            value_before = (shares_total - deltas[t]) * price if price is not None else None
+        value_after = shares_total * price if price is not None else None
+        snapshots.append((
+            holding_id, portfolio_id, t, 'import', deltas[t], shares_total, price,
+            value_before, value_after,
+        ))
+    execute_values(cur, """
+        INSERT INTO holding_snapshots
+            (holding_id, portfolio_id, ticker, event,
+             shares_delta, shares_total, price_at_event, value_before, value_after)
+        VALUES %s
+    """, snapshots, page_size=len(snapshots))
+    refresh_rollups(cur, portfolio_ids=[portfolio_id], tickers=tickers)
+    return written
+
+
+def import_holdings(portfolio_id, lines, fetch_prices=None):
+    """Parse, price and write a holdings CSV; return the per-row results.
+
+    Valid rows get ``status`` 'imported' (``price`` is None when no quote
+    was available). Nothing is written if the transaction fails.
+    """
+    if fetch_prices is None:
+        from quotes import fetch_last_prices as fetch_prices
+
+    results = list(parse_rows(lines))
+    deltas = {}
+    for r in results:
+        if r['status'] == 'ok':
+            deltas[r['ticker']] = deltas.get(r['ticker'], 0.0) + r['shares']
+    if not deltas:
+        return results
+
+    # Price everything before leasing a connection.
+    prices, _ = fetch_prices(list(deltas))
+
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            written = write_holdings(cur, portfolio_id, deltas, prices)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        for r in results:
+            if r['status'] == 'ok':
+                r.update(status='failed', message=str(e))
+        return results
+    finally:
+        put_db_connection(conn)
+
+    for r in results:
+        if r['status'] != 'ok':
+            continue
+        price = prices.get(r['ticker'])
+        r.update(
+            status='imported',
+            holding_id=written[r['ticker']][0],
+            price=price,
+            message='' if price is not None else 'No quote; price left blank',
+        )
+    return results
+
+
+def summarize(results):
+    """Counts by status, e.g. ``{'imported': 12, 'invalid': 1}``."""
+    counts = {}
+    for r in results:
+        counts[r['status']] = counts.get(r['status'], 0) + 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import holdings into a portfolio from a CSV.")
+    parser.add_argument('portfolio_id', type=int)
+    parser.add_argument('csv_path', help="CSV with ticker/symbol and shares/quantity columns ('-' for stdin)")
+    parser.add_argument('--database-url', help="defaults to NEON_DATABASE_URL / DATABASE_URL")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from db import init_db
+
+    load_dotenv()
+    init_db(args.database_url or os.getenv('NEON_DATABASE_URL') or os.getenv('DATABASE_URL'))
+    if args.csv_path == '-':
+        stream = sys.stdin
+    else:
+        stream = open(args.csv_path, newline='', encoding='utf-8-sig')
+    try:
+        results = import_holdings(args.portfolio_id, stream)
+    except CSVImportError as e:
+        parser.exit(1, f"{e}\n")
+    finally:
+        stream.close()
+
+    for r in results:
+        price = f" @ {r['price']:.2f}" if r.get('price') is not None else ''
+        shares = f" {r['shares']:g}" if r['shares'] is not None else ''
+        print(f"line {r['line']:>5}  {r['status']:<8}  {r['ticker']}{shares}{price}  {r['message']}".rstrip())
+    print(', '.join(f"{n} {status}" for status, n in summarize(results).items()) or 'No rows')
+
+
+if __name__ == '__main__':
+    main()
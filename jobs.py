@@ -0,0 +1,115 @@
+"""Durable job queue in Postgres.
+
+Workers claim jobs with ``FOR UPDATE SKIP LOCKED``, so any number of them,
+on any number of hosts, can drain the same queue without handing one job
+to two workers. A claimed job stays invisible until ``locked_until``; if
+its worker dies, the job becomes claimable again after that visibility
+timeout. Failures are retried with exponential backoff up to
+``max_attempts``.
+"""
+
+import os
+
+from psycopg2.extras import Json, execute_values
+
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+JOB_VISIBILITY_TIMEOUT = int(os.getenv('JOB_VISIBILITY_TIMEOUT', '600'))
+JOB_RETRY_DELAY = int(os.getenv('JOB_RETRY_DELAY', '30'))
+
+
+def enqueue_many(cur, kind, payloads, dedupe_keys=None, max_attempts=None):
+    """Queue one job per payload; returns the ids of jobs actually added.
+
+    A job whose ``dedupe_key`` matches an unfinished job is skipped.
+    """
+    if not payloads:
+        return []
+    max_attempts = max_attempts or JOB_MAX_ATTEMPTS
+    dedupe_keys = dedupe_keys or [None] * len(payloads)
+    rows = [(kind, Json(p), key, max_attempts) for p, key in zip(payloads, dedupe_keys)]
+    inserted = execute_values(cur, """
+        INSERT INTO jobs (kind, payload, dedupe_key, max_attempts) VALUES %s
+        ON CONFLICT (dedupe_key) WHERE status IN ('queued', 'running') DO NOTHING
+        RETURNING id
+    """, rows, page_size=len(rows), fetch=True)
+    return [row[0] for row in inserted]
+
+
+def claim(cur, worker_id, limit=1, visibility_timeout=None):
+    """Lock up to ``limit`` ready jobs for ``worker_id``.
+
+    Returns ``[(id, kind, payload, attempts), ...]``. Jobs whose visibility
+    timeout lapsed are reclaimed, or failed if out of attempts.
+    """
+    visibility_timeout = visibility_timeout or JOB_VISIBILITY_TIMEOUT
+    cur.execute("""
+        UPDATE jobs
+        SET status = 'failed', finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP,
+            locked_by = NULL, locked_until = NULL,
+            last_error = COALESCE(last_error, 'visibility timeout expired')
+        WHERE status = 'running' AND locked_until < CURRENT_TIMESTAMP AND attempts >= max_attempts
+    """)
+    cur.execute("""
+        WITH ready AS (
+            SELECT id FROM jobs
+            WHERE (status = 'queued' AND run_after <= CURRENT_TIMESTAMP)
+               OR (status = 'running' AND locked_until < CURRENT_TIMESTAMP)
+            ORDER BY run_after, id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE jobs AS j
+        SET status = 'running', attempts = j.attempts + 1, locked_by = %s,
+            locked_until = CURRENT_TIMESTAMP + make_interval(secs => %s),
+            updated_at = CURRENT_TIMESTAMP
+        FROM ready
+        WHERE j.id = ready.id
+        RETURNING j.id, j.kind, j.payload, j.attempts
+    """, (limit, worker_id, visibility_timeout))
+    return cur.fetchall()
+
+
+def complete(cur, job_id, worker_id):
+    """Mark a job done; False if the worker no longer holds it."""
+    cur.execute("""
+        UPDATE jobs
+        SET status = 'done', finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP,
+            locked_by = NULL, locked_until = NULL
+        WHERE id = %s AND locked_by = %s AND status = 'running'
+    """, (job_id, worker_id))
+    return cur.rowcount == 1
+
+
+def fail(cur, job_id, worker_id, error, retry_delay=None):
+    """Record a failed attempt: requeue with backoff, or fail for good."""
+    retry_delay = JOB_RETRY_DELAY if retry_delay is None else retry_delay
+    cur.execute("""
+        UPDATE jobs
+        SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+            run_after = CURRENT_TIMESTAMP + make_interval(secs => %s * power(2, attempts - 1)),
+            finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE CURRENT_TIMESTAMP END,
+            locked_by = NULL, locked_until = NULL, last_error = %s, updated_at = CURRENT_TIMESTAMP
+        WHERE id = %s AND locked_by = %s AND status = 'running'
+        RETURNING status
+    """, (retry_delay, str(error)[:2000], job_id, worker_id))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def extend(cur, job_id, worker_id, visibility_timeout=None):
+    """Push a running job's visibility timeout out again (a heartbeat)."""
+    visibility_timeout = visibility_timeout or JOB_VISIBILITY_TIMEOUT
+    cur.execute("""
+        UPDATE jobs SET locked_until = CURRENT_TIMESTAMP + make_interval(secs => %s)
+        WHERE id = %s AND locked_by = %s AND status = 'running'
+    """, (visibility_timeout, job_id, worker_id))
+    return cur.rowcount == 1
+
+
+def queue_stats(cur):
+    """``{kind: {status: count}}`` over all jobs."""
+    cur.execute("SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status ORDER BY kind, status")
+    stats = {}
+    for kind, status, count in cur.fetchall():
+        stats.setdefault(kind, {})[status] = count
+    return stats
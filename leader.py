@@ -0,0 +1,154 @@
+"""Leader election for the in-process scheduler.
+
+Every process that starts the scheduler competes for one row in
+``scheduler_leases``. The holder renews it every ``LEADER_LEASE_SECONDS / 3``
+seconds; when the holder stops renewing (crash, deploy, lost network), any
+other process takes the lease once it expires. Scheduled jobs only run in
+the current leader, and each firing is also claimed in ``scheduled_runs``
+so a run is never executed twice, even across a hand-over. A firing whose
+claimant died before finishing it (no live lease, claimed more than a
+lease TTL ago) is claimed and run again by the next leader.
+
+A lease row is used rather than a session advisory lock because the
+lock would pin one pooled connection per process and does not survive
+transaction-mode poolers such as Neon's.
+"""
+
+import os
+import socket
+import threading
+import uuid
+
+from db import db_connection
+
+LEADER_LEASE_SECONDS = int(os.getenv('LEADER_LEASE_SECONDS', '60'))
+SCHEDULER_LEASE = 'scheduler'
+
+
+def acquire(cur, name, holder, ttl=None):
+    """Take or renew a lease; True if ``holder`` owns it afterwards."""
+    ttl = ttl or LEADER_LEASE_SECONDS
+    cur.execute("""
+        INSERT INTO scheduler_leases (name, holder, expires_at)
+        VALUES (%s, %s, CURRENT_TIMESTAMP + make_interval(secs => %s))
+        ON CONFLICT (name) DO UPDATE
+        SET holder = EXCLUDED.holder,
+            expires_at = EXCLUDED.expires_at,
+            acquired_at = CASE WHEN scheduler_leases.holder = EXCLUDED.holder
+                               THEN scheduler_leases.acquired_at ELSE CURRENT_TIMESTAMP END
+        WHERE scheduler_leases.holder = EXCLUDED.holder
+           OR scheduler_leases.expires_at < CURRENT_TIMESTAMP
+        RETURNING holder
+    """, (name, holder, ttl))
+    return cur.fetchone() is not None
+
+
+def release(cur, name, holder):
+    """Give up a lease so another process can take it straight away."""
+    cur.execute("DELETE FROM scheduler_leases WHERE name = %s AND holder = %s", (name, holder))
+    return cur.rowcount == 1
+
+
+def claim_run(cur, job_id, scheduled_for, holder, ttl=None):
+    """Record that ``holder`` runs this firing; False if another process has it.
+
+    An unfinished claim older than ``ttl`` whose holder no longer has a
+    live lease is taken over: that process died mid-run.
+    """
+    ttl = ttl or LEADER_LEASE_SECONDS
+    cur.execute("""
+        INSERT INTO scheduled_runs (job_id, scheduled_for, holder) VALUES (%s, %s, %s)
+        ON CONFLICT (job_id, scheduled_for) DO UPDATE
+        SET holder = EXCLUDED.holder, started_at = CURRENT_TIMESTAMP, error = NULL
+        WHERE scheduled_runs.finished_at IS NULL
+          AND scheduled_runs.started_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+          AND NOT EXISTS (
+              SELECT 1 FROM scheduler_leases l
+              WHERE l.holder = scheduled_runs.holder AND l.expires_at > CURRENT_TIMESTAMP
+          )
+        RETURNING job_id
+    """, (job_id, scheduled_for, holder, ttl))
+    return cur.fetchone() is not None
+
+
+def finish_run(cur, job_id, scheduled_for, holder, error=None):
+    """Close our claim; a claim taken over by another leader is left alone."""
+    cur.execute("""
+        UPDATE scheduled_runs SET finished_at = CURRENT_TIMESTAMP, error = %s
+        WHERE job_id = %s AND scheduled_for = %s AND holder = %s
+    """, (error, job_id, scheduled_for, holder))
+
+
+class LeaderElector:
+    """Keeps competing for a lease from a background thread."""
+
+    def __init__(self, name=SCHEDULER_LEASE, ttl=LEADER_LEASE_SECONDS, holder=None):
+        self.name = name
+        self.ttl = ttl
+        self.holder = holder or f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}'
+        self.is_leader = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def renew(self):
+        """One acquire/renew attempt; returns (and remembers) whether we lead."""
+        try:
+            with db_connection() as conn:
+                with conn.cursor() as cur:
+                    leader = acquire(cur, self.name, self.holder, self.ttl)
+        except Exception as e:
+            # Can't prove we still hold the lease, so stop acting as leader.
+            print(f"[Leader] lease renewal failed: {e}")
+            leader = False
+        if leader != self.is_leader:
+            print(f"[Leader] {self.holder} {'acquired' if leader else 'lost'} lease {self.name!r}")
+        self.is_leader = leader
+        return leader
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.renew()
+            self._stop.wait(self.ttl / 3)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='leader-elector', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self.is_leader:
+            try:
+                with db_connection() as conn:
+                    with conn.cursor() as cur:
+                        release(cur, self.name, self.holder)
+            except Exception as e:
+                print(f"[Leader] lease release failed: {e}")
+            self.is_leader = False
+
+    def run_once(self, job_id, scheduled_for, fn):
+        """Run ``fn()`` for one scheduled firing if we lead and nobody ran it yet.
+
+        Returns True if this process ran it.
+        """
+        if not self.renew():
+            return False
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                if not claim_run(cur, job_id, scheduled_for, self.holder, self.ttl):
+                    return False
+        error = None
+        try:
+            fn()
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            try:
+                with db_connection() as conn:
+                    with conn.cursor() as cur:
+                        finish_run(cur, job_id, scheduled_for, self.holder, error)
+            except Exception as e:
+                print(f"[Leader] could not record {job_id} run: {e}")
+        return True
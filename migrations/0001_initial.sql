@@ -0,0 +1,75 @@
+-- Core schema. Every statement is idempotent so databases created by the
+-- old init_db() can adopt migrations without manual steps.
+
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(80) UNIQUE NOT NULL,
+    email VARCHAR(255) UNIQUE NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS portfolios (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    name VARCHAR(255) NOT NULL,
+    description TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS holdings (
+    id SERIAL PRIMARY KEY,
+    portfolio_id INTEGER REFERENCES portfolios(id) ON DELETE CASCADE,
+    ticker VARCHAR(50) NOT NULL,
+    shares FLOAT NOT NULL DEFAULT 0.0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS alerts (
+    id SERIAL PRIMARY KEY,
+    portfolio_id INTEGER REFERENCES portfolios(id) ON DELETE CASCADE,
+    message TEXT NOT NULL,
+    is_read BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS holding_snapshots (
+    id SERIAL PRIMARY KEY,
+    holding_id INTEGER REFERENCES holdings(id) ON DELETE CASCADE,
+    portfolio_id INTEGER REFERENCES portfolios(id) ON DELETE CASCADE,
+    ticker VARCHAR(50) NOT NULL,
+    event VARCHAR(20) NOT NULL,
+    shares_delta FLOAT NOT NULL,
+    shares_total FLOAT NOT NULL,
+    price_at_event FLOAT,
+    value_before FLOAT,
+    value_after FLOAT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Add user_id column to portfolios if it doesn't exist
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'portfolios' AND column_name = 'user_id'
+    ) THEN
+        ALTER TABLE portfolios ADD COLUMN user_id INTEGER REFERENCES users(id) ON DELETE CASCADE;
+    END IF;
+END $$;
+
+-- Add last_price columns to holdings if they don't exist
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'holdings' AND column_name = 'last_price'
+    ) THEN
+        ALTER TABLE holdings
+            ADD COLUMN last_price FLOAT,
+            ADD COLUMN last_price_updated_at TIMESTAMP WITH TIME ZONE;
+    END IF;
+END $$;
@@ -0,0 +1,7 @@
+-- Shared quote / price-history cache backend (cache.PostgresBackend).
+
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value BYTEA NOT NULL,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
@@ -0,0 +1,19 @@
+-- Local daily OHLCV store (price_store.py).
+
+CREATE TABLE IF NOT EXISTS price_bars (
+    ticker VARCHAR(50) NOT NULL,
+    day DATE NOT NULL,
+    open FLOAT,
+    high FLOAT,
+    low FLOAT,
+    close FLOAT NOT NULL,
+    volume FLOAT,
+    PRIMARY KEY (ticker, day)
+);
+
+CREATE TABLE IF NOT EXISTS price_bar_sync (
+    ticker VARCHAR(50) PRIMARY KEY,
+    covered_from DATE NOT NULL,
+    covered_to DATE NOT NULL,
+    synced_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,18 @@
+-- Incremental sentiment ingestion (roma/sentiment_store.py).
+
+CREATE TABLE IF NOT EXISTS sentiment_state (
+    query VARCHAR(255) PRIMARY KEY,
+    newest_cast_at TIMESTAMP WITH TIME ZONE,
+    cast_count INTEGER NOT NULL DEFAULT 0,
+    score_sum FLOAT NOT NULL DEFAULT 0.0,
+    ewm_score FLOAT,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS sentiment_casts (
+    query VARCHAR(255) NOT NULL,
+    cast_hash VARCHAR(100) NOT NULL,
+    cast_at TIMESTAMP WITH TIME ZONE,
+    score FLOAT NOT NULL,
+    PRIMARY KEY (query, cast_hash)
+);
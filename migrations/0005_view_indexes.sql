@@ -0,0 +1,11 @@
+-- Indexes for set-based dashboard/portfolio loading and the alerts feed.
+
+CREATE INDEX IF NOT EXISTS idx_portfolios_user_id ON portfolios (user_id);
+
+CREATE INDEX IF NOT EXISTS idx_holdings_portfolio_id ON holdings (portfolio_id);
+
+CREATE INDEX IF NOT EXISTS idx_alerts_portfolio_created
+ON alerts (portfolio_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_holding_snapshots_holding_created
+ON holding_snapshots (holding_id, created_at);
@@ -0,0 +1,41 @@
+-- Precomputed per-portfolio and per-user holding aggregates (rollups.py).
+
+CREATE TABLE IF NOT EXISTS portfolio_rollups (
+    portfolio_id INTEGER PRIMARY KEY REFERENCES portfolios(id) ON DELETE CASCADE,
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    holding_count INTEGER NOT NULL DEFAULT 0,
+    total_shares FLOAT NOT NULL DEFAULT 0.0,
+    market_value FLOAT NOT NULL DEFAULT 0.0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_portfolio_rollups_user_id ON portfolio_rollups (user_id);
+
+CREATE TABLE IF NOT EXISTS user_ticker_rollups (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    ticker VARCHAR(50) NOT NULL,
+    shares FLOAT NOT NULL DEFAULT 0.0,
+    market_value FLOAT NOT NULL DEFAULT 0.0,
+    last_price FLOAT,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, ticker)
+);
+
+CREATE INDEX IF NOT EXISTS idx_holdings_ticker ON holdings (ticker);
+
+-- Backfill from existing holdings.
+INSERT INTO portfolio_rollups (portfolio_id, user_id, holding_count, total_shares, market_value)
+SELECT p.id, p.user_id, COUNT(h.id), COALESCE(SUM(h.shares), 0),
+       COALESCE(SUM(h.shares * COALESCE(h.last_price, 0)), 0)
+FROM portfolios p
+LEFT JOIN holdings h ON h.portfolio_id = p.id
+GROUP BY p.id, p.user_id
+ON CONFLICT (portfolio_id) DO NOTHING;
+
+INSERT INTO user_ticker_rollups (user_id, ticker, shares, market_value, last_price)
+SELECT p.user_id, h.ticker, SUM(h.shares), SUM(h.shares * COALESCE(h.last_price, 0)), MAX(h.last_price)
+FROM holdings h
+JOIN portfolios p ON h.portfolio_id = p.id
+WHERE p.user_id IS NOT NULL
+GROUP BY p.user_id, h.ticker
+ON CONFLICT (user_id, ticker) DO NOTHING;
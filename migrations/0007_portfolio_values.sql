@@ -0,0 +1,11 @@
+-- Daily portfolio valuation series (valuations.py).
+
+CREATE TABLE IF NOT EXISTS portfolio_values (
+    portfolio_id INTEGER NOT NULL REFERENCES portfolios(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    market_value FLOAT NOT NULL,
+    PRIMARY KEY (portfolio_id, day)
+);
+
+-- Finds the newest stored day for incremental appends.
+CREATE INDEX IF NOT EXISTS idx_portfolio_values_day ON portfolio_values (day);
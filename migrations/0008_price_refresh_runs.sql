@@ -0,0 +1,17 @@
+-- Timing of each intraday holdings price refresh (price_refresh.py).
+
+CREATE TABLE IF NOT EXISTS price_refresh_runs (
+    id SERIAL PRIMARY KEY,
+    started_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    fetch_ms INTEGER NOT NULL,
+    write_ms INTEGER NOT NULL,
+    tickers INTEGER NOT NULL,
+    batches INTEGER NOT NULL,
+    priced INTEGER NOT NULL,
+    rows_updated INTEGER NOT NULL,
+    failed TEXT[] NOT NULL DEFAULT '{}',
+    error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_price_refresh_runs_started ON price_refresh_runs (started_at DESC);
@@ -0,0 +1,20 @@
+-- Scheduler leader election and per-run dedup (leader.py).
+
+-- One row per lease; the holder renews expires_at while it is alive.
+CREATE TABLE IF NOT EXISTS scheduler_leases (
+    name VARCHAR(100) PRIMARY KEY,
+    holder VARCHAR(255) NOT NULL,
+    acquired_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- One row per scheduled firing; the primary key lets only one process claim it.
+CREATE TABLE IF NOT EXISTS scheduled_runs (
+    job_id VARCHAR(100) NOT NULL,
+    scheduled_for TIMESTAMP WITH TIME ZONE NOT NULL,
+    holder VARCHAR(255) NOT NULL,
+    started_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    error TEXT,
+    PRIMARY KEY (job_id, scheduled_for)
+);
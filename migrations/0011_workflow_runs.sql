@@ -0,0 +1,52 @@
+-- Checkpointed ROMA workflow runs (roma/runs.py).
+
+CREATE TABLE IF NOT EXISTS workflow_runs (
+    id SERIAL PRIMARY KEY,
+    -- Scope and day, e.g. 'all:2026-10-14'; a rerun under the same key resumes.
+    run_key VARCHAR(100) NOT NULL UNIQUE,
+    portfolio_id INTEGER,
+    status VARCHAR(20) NOT NULL DEFAULT 'running',
+    attempts INTEGER NOT NULL DEFAULT 1,
+    started_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    tickers INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    alerts INTEGER NOT NULL DEFAULT 0,
+    prefetch_ms INTEGER,
+    sentiment_ms INTEGER,
+    write_ms INTEGER,
+    duration_ms INTEGER,
+    error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_workflow_runs_started ON workflow_runs (started_at DESC);
+
+CREATE TABLE IF NOT EXISTS workflow_items (
+    run_id INTEGER NOT NULL REFERENCES workflow_runs(id) ON DELETE CASCADE,
+    ticker VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    alerts INTEGER NOT NULL DEFAULT 0,
+    fetch_ms INTEGER,
+    forecast_ms INTEGER,
+    synth_ms INTEGER,
+    error TEXT,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    PRIMARY KEY (run_id, ticker)
+);
+
+-- One row per run with item counts and per-stage time, for operators.
+CREATE OR REPLACE VIEW workflow_run_summary AS
+SELECT r.id, r.run_key, r.portfolio_id, r.status, r.attempts, r.started_at, r.finished_at,
+       r.tickers, r.skipped, r.alerts, r.error,
+       COUNT(i.ticker) FILTER (WHERE i.status = 'done') AS items_done,
+       COUNT(i.ticker) FILTER (WHERE i.status = 'failed') AS items_failed,
+       COUNT(i.ticker) FILTER (WHERE i.status = 'pending') AS items_pending,
+       r.duration_ms, r.prefetch_ms, r.sentiment_ms, r.write_ms,
+       SUM(i.fetch_ms) AS fetch_ms,
+       SUM(i.forecast_ms) AS forecast_ms,
+       SUM(i.synth_ms) AS synth_ms,
+       MAX(COALESCE(i.fetch_ms, 0) + COALESCE(i.forecast_ms, 0) + COALESCE(i.synth_ms, 0)) AS slowest_item_ms
+FROM workflow_runs r
+LEFT JOIN workflow_items i ON i.run_id = r.id
+GROUP BY r.id;
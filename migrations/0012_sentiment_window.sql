@@ -0,0 +1,3 @@
+-- Pruning and window counts of scored casts by age (roma/sentiment_store.py).
+
+CREATE INDEX IF NOT EXISTS idx_sentiment_casts_query_cast_at ON sentiment_casts (query, cast_at);
@@ -0,0 +1,4 @@
+-- Interior price gaps up to this day were downloaded once and had no data
+-- (price_store.py), so they are not retried on every sync.
+
+ALTER TABLE price_bar_sync ADD COLUMN IF NOT EXISTS gaps_checked_to DATE;
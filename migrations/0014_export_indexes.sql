@@ -0,0 +1,5 @@
+-- Keyset pages of snapshot exports walk each portfolio in (created_at, id)
+-- order (exports.py); alerts use idx_alerts_portfolio_created.
+
+CREATE INDEX IF NOT EXISTS idx_holding_snapshots_portfolio_created
+ON holding_snapshots (portfolio_id, created_at, id);
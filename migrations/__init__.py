@@ -0,0 +1,83 @@
+"""Versioned schema migrations.
+
+Each ``NNNN_name.sql`` file in this directory is applied once, in order,
+and recorded in ``schema_migrations``. ``ensure_schema`` costs a single
+query when the database is already current, so it is cheap enough to run
+on every cold start; ``python -m migrations`` applies them out of band.
+"""
+
+import os
+import re
+
+from psycopg2 import errors
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+_FILE_RE = re.compile(r'^(\d+)_([\w-]+)\.sql$')
+# Advisory lock key that serialises processes migrating at the same time.
+_LOCK_KEY = 0x5704C
+
+def available_migrations():
+    """``[(version, name, path), ...]`` sorted by version."""
+    found = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = _FILE_RE.match(filename)
+        if match:
+            found.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    return sorted(found)
+
+LATEST_VERSION = max((v for v, _, _ in available_migrations()), default=0)
+
+def current_version(conn):
+    """Newest applied version, or None if migrations have never run."""
+    autocommit = conn.autocommit
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT version FROM schema_migrations ORDER BY version DESC LIMIT 1")
+            row = cur.fetchone()
+            return row[0] if row else 0
+    except errors.UndefinedTable:
+        return None
+    finally:
+        conn.autocommit = autocommit
+
+def migrate(conn):
+    """Apply every pending migration in one transaction; return those applied."""
+    applied_now = []
+    try:
+        with conn.cursor() as cur:
+            # Backfills, and waiting on the lock while another process runs
+            # them, may legitimately outlast the pool's statement_timeout.
+            cur.execute("SET LOCAL statement_timeout = 0")
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (_LOCK_KEY,))
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name VARCHAR(255) NOT NULL,
+                    applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+            cur.execute("SELECT version FROM schema_migrations")
+            applied = {row[0] for row in cur.fetchall()}
+            for version, name, path in available_migrations():
+                if version in applied:
+                    continue
+                with open(path) as f:
+                    cur.execute(f.read())
+                cur.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                    (version, name)
+                )
+                applied_now.append((version, name))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return applied_now
+
+def ensure_schema(conn):
+    """Fast path for startup: migrate only if the schema is behind."""
+    version = current_version(conn)
+    if version is not None and version >= LATEST_VERSION:
+        return []
+    return migrate(conn)
@@ -0,0 +1,42 @@
+"""Apply schema migrations out of band.
+
+    python -m migrations           apply pending migrations
+    python -m migrations --status  list applied and pending migrations
+"""
+
+import argparse
+import os
+
+import psycopg2
+from dotenv import load_dotenv
+
+from db import normalize_database_url
+from migrations import available_migrations, current_version, migrate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply Stock Sentinel schema migrations.")
+    parser.add_argument('--status', action='store_true', help="show migration status and exit")
+    parser.add_argument('--database-url', help="defaults to NEON_DATABASE_URL / DATABASE_URL")
+    args = parser.parse_args()
+
+    load_dotenv()
+    database_url = args.database_url or os.getenv('NEON_DATABASE_URL') or os.getenv('DATABASE_URL')
+    conn = psycopg2.connect(normalize_database_url(database_url))
+    try:
+        if args.status:
+            version = current_version(conn) or 0
+            for v, name, _ in available_migrations():
+                print(f"{'applied' if v <= version else 'pending'}  {v:04d}_{name}")
+            return
+        applied = migrate(conn)
+        for v, name in applied:
+            print(f"applied  {v:04d}_{name}")
+        if not applied:
+            print("Schema is up to date.")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""Memory-mapped columnar close-price matrix for fast multi-ticker loads.
+
+Layout under ``PRICE_MATRIX_DIR``::
+
+    meta.json            symbols, row count and current data file names
+    closes.<gen>.f8      float64 closes, C-order, shape (n_days, n_symbols)
+    days.<gen>.i8        int64 days since epoch, one per row
+
+Readers map only the ``n_days`` rows named in ``meta.json``. Appends write
+new rows past that point, fsync, then atomically replace ``meta.json``, so
+a reader never sees a torn row. A changed symbol set or a revised close
+writes a new generation.
+"""
+
+import fcntl
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+
+PRICE_MATRIX_DIR = os.getenv(
+    'PRICE_MATRIX_DIR', os.path.join(tempfile.gettempdir(), 'stock-monitor-matrix')
+)
+PRICE_MATRIX_PERIOD = os.getenv('PRICE_MATRIX_PERIOD', '2y')
+# Trailing days re-read from price_bars on every sync; a revised close in
+# them (today's bar re-downloaded, a late fill) triggers a rebuild.
+PRICE_MATRIX_REWRITE_DAYS = int(os.getenv('PRICE_MATRIX_REWRITE_DAYS', '5'))
+# Days the matrix may reach back past PRICE_MATRIX_PERIOD before a rebuild trims it.
+_TRIM_SLACK_DAYS = 31
+
+_DTYPE = np.dtype('<f8')
+_DAY_DTYPE = np.dtype('<i8')
+
+
+class PriceMatrix:
+    """Read-only snapshot of the matrix as of one ``meta.json`` version."""
+    def __init__(self, directory, meta):
+        self.directory = directory
+        self.symbols = meta['symbols']
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        n_days, n_symbols = meta['n_days'], len(self.symbols)
+        if n_days and n_symbols:
+            self.closes = np.memmap(os.path.join(directory, meta['data']), dtype=_DTYPE,
+                                    mode='r', shape=(n_days, n_symbols))
+            raw_days = np.memmap(os.path.join(directory, meta['days']), dtype=_DAY_DTYPE,
+                                 mode='r', shape=(n_days,))
+        else:
+            self.closes = np.empty((n_days, n_symbols), dtype=_DTYPE)
+            raw_days = np.empty((n_days,), dtype=_DAY_DTYPE)
+        self.days = raw_days.view('datetime64[D]')
+
+    def __len__(self):
+        return len(self.days)
+
+    def _rows(self, start=None, end=None):
+        lo = 0 if start is None else int(np.searchsorted(self.days, np.datetime64(start, 'D'), 'left'))
+        hi = len(self.days) if end is None else int(np.searchsorted(self.days, np.datetime64(end, 'D'), 'right'))
+        return slice(lo, hi)
+
+    def series(self, ticker, start=None, end=None):
+        """``(days, closes)`` views for one ticker; nothing is copied."""
+        rows = self._rows(start, end)
+        return self.days[rows], self.closes[rows, self.index[ticker]]
+
+    def slice(self, tickers, start=None, end=None):
+        """``(days, matrix)`` aligned on the shared day axis.
+
+        A run of adjacent symbols comes back as a view; any other set is
+        gathered into one array holding just the requested columns.
+        """
+        rows = self._rows(start, end)
+        cols = [self.index[t] for t in tickers]
+        if cols and cols == list(range(cols[0], cols[0] + len(cols))):
+            return self.days[rows], self.closes[rows, cols[0]:cols[0] + len(cols)]
+        return self.days[rows], self.closes[rows][:, cols]
+
+
+def _meta_path(directory):
+    return os.path.join(directory, 'meta.json')
+
+
+def _read_meta(directory):
+    try:
+        with open(_meta_path(directory)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(directory, meta):
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(meta, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, _meta_path(directory))
+
+
+@contextmanager
+def _writer_lock(directory):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def open_matrix(directory=PRICE_MATRIX_DIR):
+    """Open the current snapshot, or return None if nothing has been written."""
+    for _ in range(3):
+        meta = _read_meta(directory)
+        if meta is None:
+            return None
+        try:
+            return PriceMatrix(directory, meta)
+        except FileNotFoundError:
+            # A rebuild replaced this generation between reading meta and mapping it.
+            continue
+    raise RuntimeError("Price matrix kept changing while opening")
+
+
+def _to_day_numbers(days):
+    return np.asarray(days, dtype='datetime64[D]').astype(_DAY_DTYPE)
+
+
+def _write_rows(path, array, keep_rows, row_bytes):
+    # Drop anything past the committed rows (a crashed append), then append.
+    with open(path, 'ab') as f:
+        f.truncate(keep_rows * row_bytes)
+        f.write(np.ascontiguousarray(array).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def write_matrix(days, symbols, closes, directory=PRICE_MATRIX_DIR):
+    """Write a complete new generation and switch readers over to it."""
+    closes = np.asarray(closes, dtype=_DTYPE).reshape(len(days), len(symbols))
+    with _writer_lock(directory):
+        old = _read_meta(directory)
+        gen = (old['generation'] + 1) if old else 1
+        meta = {
+            'generation': gen,
+            'symbols': list(symbols),
+            'n_days': len(days),
+            'data': f'closes.{gen}.f8',
+            'days': f'days.{gen}.i8',
+        }
+        _write_rows(os.path.join(directory, meta['data']), closes, 0, 0)
+        _write_rows(os.path.join(directory, meta['days']), _to_day_numbers(days), 0, 0)
+        _write_meta(directory, meta)
+        if old:
+            # Readers holding the old maps keep their inodes alive.
+            for name in (old['data'], old['days']):
+                try:
+                    os.unlink(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+
+def append_rows(days, closes, directory=PRICE_MATRIX_DIR):
+    """Append rows (one per day, columns in the matrix's symbol order)."""
+    if not len(days):
+        return
+    with _writer_lock(directory):
+        meta = _read_meta(directory)
+        if meta is None:
+            raise RuntimeError("Price matrix has not been written yet")
+        n_symbols = len(meta['symbols'])
+        closes = np.asarray(closes, dtype=_DTYPE).reshape(len(days), n_symbols)
+        n_days = meta['n_days']
+        _write_rows(os.path.join(directory, meta['data']), closes, n_days, n_symbols * _DTYPE.itemsize)
+        _write_rows(os.path.join(directory, meta['days']), _to_day_numbers(days), n_days, _DAY_DTYPE.itemsize)
+        meta['n_days'] = n_days + len(days)
+        _write_meta(directory, meta)
+
+
+def sync_matrix(tickers=None, directory=PRICE_MATRIX_DIR):
+    """Bring the matrix up to date from the ``price_bars`` store.
+
+    The last ``PRICE_MATRIX_REWRITE_DAYS`` rows are compared with the store
+    and new days are appended in place. A revised row, a change in the
+    symbol set or a head more than a month past ``PRICE_MATRIX_PERIOD``
+    rebuilds a generation trimmed to the period. Returns the rows written.
+    """
+    from datetime import timedelta
+
+    from db import get_db_connection, put_db_connection
+    from price_store import close_matrix, period_start
+
+    current = open_matrix(directory)
+    if tickers is None:
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT ticker FROM price_bar_sync ORDER BY ticker")
+                symbols = sorted(r[0] for r in cur.fetchall())
+            conn.commit()
+        finally:
+            put_db_connection(conn)
+    else:
+        symbols = sorted(set(tickers) | set(current.symbols if current else []))
+    start = period_start(PRICE_MATRIX_PERIOD)
+
+    def rebuild():
+        frame = close_matrix(symbols, start)
+        write_matrix(list(frame.index), symbols, frame.to_numpy(dtype=_DTYPE), directory)
+        return len(frame)
+
+    if current is None or not len(current) or current.symbols != symbols:
+        return rebuild()
+    first_day = current.days[0].astype(object)
+    if first_day < start - timedelta(days=_TRIM_SLACK_DAYS):
+        return rebuild()
+
+    written = current.days[-max(1, PRICE_MATRIX_REWRITE_DAYS):]
+    frame = close_matrix(current.symbols, written[0].astype(object))
+    days = np.array(list(frame.index), dtype='datetime64[D]')
+    overlap = days <= written[-1]
+    stored = frame.to_numpy(dtype=_DTYPE)
+    if (not np.array_equal(days[overlap], written)
+            or not np.array_equal(stored[overlap], current.closes[-len(written):], equal_nan=True)):
+        return rebuild()
+    append_rows(days[~overlap], stored[~overlap], directory)
+    return int((~overlap).sum())
@@ -0,0 +1,100 @@
+"""Background refresh of ``holdings.last_price`` for every distinct ticker.
+
+Tickers are quoted in batches; each batch is written with one set-based
+``UPDATE`` (plus a rollup refresh) in its own short transaction, so no
+connection is held while quotes download. Every run is recorded in
+``price_refresh_runs``.
+"""
+
+import os
+import time
+from datetime import datetime, timezone
+
+from db import get_db_connection, put_db_connection
+from quotes import QUOTE_BATCH_SIZE, _chunks, fetch_last_prices, update_holding_prices
+from rollups import refresh_rollups
+
+INTRADAY_BATCH_SIZE = int(os.getenv('INTRADAY_BATCH_SIZE', str(QUOTE_BATCH_SIZE)))
+
+
+def _distinct_tickers():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT DISTINCT ticker FROM holdings ORDER BY ticker")
+            tickers = [row[0] for row in cur.fetchall()]
+        conn.commit()
+    finally:
+        put_db_connection(conn)
+    return tickers
+
+
+def _write_batch(prices):
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            updated = update_holding_prices(cur, prices)
+            if updated:
+                refresh_rollups(cur, tickers=list(prices))
+        conn.commit()
+        return updated
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        put_db_connection(conn)
+
+
+def _record_run(stats):
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO price_refresh_runs
+                    (started_at, duration_ms, fetch_ms, write_ms, tickers, batches,
+                     priced, rows_updated, failed, error)
+                VALUES (%(started_at)s, %(duration_ms)s, %(fetch_ms)s, %(write_ms)s, %(tickers)s,
+                        %(batches)s, %(priced)s, %(rows_updated)s, %(failed)s, %(error)s)
+            """, stats)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"Could not record price refresh run: {e}")
+    finally:
+        put_db_connection(conn)
+
+
+def refresh_all_prices(batch_size=None):
+    """Quote every held ticker and update all matching holdings; return run stats."""
+    batch_size = batch_size or INTRADAY_BATCH_SIZE
+    started = time.monotonic()
+    stats = {
+        'started_at': datetime.now(timezone.utc), 'tickers': 0, 'batches': 0, 'priced': 0,
+        'rows_updated': 0, 'failed': [], 'error': None, 'fetch_ms': 0, 'write_ms': 0,
+    }
+    fetch_s = write_s = 0.0
+    try:
+        tickers = _distinct_tickers()
+        stats['tickers'] = len(tickers)
+        for batch in _chunks(tickers, batch_size):
+            t0 = time.monotonic()
+            prices, failed = fetch_last_prices(batch, batch_size)
+            t1 = time.monotonic()
+            fetch_s += t1 - t0
+            stats['rows_updated'] += _write_batch(prices)
+            write_s += time.monotonic() - t1
+            stats['batches'] += 1
+            stats['priced'] += len(prices)
+            stats['failed'].extend(failed)
+    except Exception as e:
+        stats['error'] = str(e)
+        print(f"Price refresh failed: {e}")
+    stats['fetch_ms'] = int(fetch_s * 1000)
+    stats['write_ms'] = int(write_s * 1000)
+    stats['duration_ms'] = int((time.monotonic() - started) * 1000)
+    _record_run(stats)
+    print(
+        f"[Price refresh] {stats['priced']}/{stats['tickers']} tickers, {stats['rows_updated']} holdings "
+        f"in {stats['duration_ms']} ms ({stats['batches']} batches)"
+    )
+    return stats
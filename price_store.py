@@ -0,0 +1,236 @@
+"""Local daily OHLCV store in the ``price_bars`` table.
+
+History is read from Postgres; only the missing tail (and any head or
+interior gaps) is downloaded from yfinance, in multi-ticker batches.
+"""
+
+import os
+import re
+from datetime import date, timedelta
+
+import pandas as pd
+import yfinance as yf
+from psycopg2.extras import execute_values
+
+from db import get_db_connection, put_db_connection
+from quotes import QUOTE_BATCH_SIZE, _chunks, normalize_tickers
+
+# Seconds after a sync during which today's bar is not downloaded again.
+SYNC_FRESH_SECONDS = int(os.getenv('PRICE_SYNC_FRESH_SECONDS', '900'))
+
+# Longest run of calendar days without a bar that is still a normal market
+# closure (e.g. Thursday holiday + weekend).
+MAX_CLOSED_DAYS = 4
+
+_PERIOD_RE = re.compile(r'^(\d+)(d|wk|mo|y)$')
+_PERIOD_DAYS = {'d': 1, 'wk': 7, 'mo': 31, 'y': 366}
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def period_start(period, today=None):
+    """Translate a yfinance ``period`` like ``'180d'`` into a start date."""
+    match = _PERIOD_RE.match(period or '')
+    if not match:
+        return None
+    today = today or date.today()
+    return today - timedelta(days=int(match.group(1)) * _PERIOD_DAYS[match.group(2)])
+
+
+def _gaps(days, start, checked_to=None):
+    """Interior runs without bars too long to be a market closure.
+
+    Gaps ending on or before ``checked_to`` were already downloaded once
+    and had no data (a halt, a long closure), so they are not retried.
+    """
+    return [
+        (prev, cur) for prev, cur in zip(days, days[1:])
+        if prev >= start and (cur - prev).days > MAX_CLOSED_DAYS
+        and (checked_to is None or cur > checked_to)
+    ]
+
+
+def _fetch_ranges(coverage, days, start, today):
+    """Date ranges to download for one ticker, as ``[(from, to), ...]``."""
+    if coverage is None:
+        return [(start, today)]
+    covered_from, covered_to, synced_ago, gaps_checked_to = coverage
+    ranges = []
+    if start < covered_from:
+        ranges.append((start, covered_from))
+    # Refetch from the newest stored bar so a partial intraday bar is
+    # replaced, unless that was done moments ago.
+    if covered_to < today or synced_ago > SYNC_FRESH_SECONDS:
+        ranges.append((covered_to, today))
+    ranges.extend(_gaps(days, start, gaps_checked_to))
+    return ranges
+
+
+def _download(tickers, start, end):
+    """``{ticker: bars}`` for the tickers with data; None if the download failed."""
+    try:
+        df = yf.download(
+            tickers, start=start.isoformat(), end=(end + timedelta(days=1)).isoformat(),
+            interval='1d', group_by='column', progress=False, threads=True
+        )
+    except Exception as e:
+        print(f"Price bar download failed for {len(tickers)} tickers: {e}")
+        return None
+    if df is None or df.empty:
+        return {}
+    frames = {}
+    for t in tickers:
+        if isinstance(df.columns, pd.MultiIndex):
+            if t not in df.columns.get_level_values(1):
+                continue
+            bars = df.xs(t, axis=1, level=1)
+        elif len(tickers) == 1:
+            bars = df
+        else:
+            continue
+        bars = bars.reindex(columns=BAR_COLUMNS).dropna(subset=['Close'])
+        if not bars.empty:
+            frames[t] = bars
+    return frames
+
+
+def _save_bars(cur, ticker, bars):
+    rows = [
+        (ticker, ts.date(), *(None if pd.isna(v) else float(v) for v in row))
+        for ts, row in zip(bars.index, bars[BAR_COLUMNS].itertuples(index=False))
+    ]
+    execute_values(cur, """
+        INSERT INTO price_bars (ticker, day, open, high, low, close, volume) VALUES %s
+        ON CONFLICT (ticker, day) DO UPDATE
+        SET open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+            close = EXCLUDED.close, volume = EXCLUDED.volume
+    """, rows)
+
+
+def sync_bars(tickers, start, today=None, batch_size=None):
+    """Bring ``price_bars`` up to date for ``tickers`` from ``start`` onwards.
+
+    Tickers needing the same date range are downloaded together. Returns the
+    number of bars written.
+    """
+    tickers = normalize_tickers(tickers)
+    if not tickers:
+        return 0
+    today = today or date.today()
+    batch_size = batch_size or QUOTE_BATCH_SIZE
+
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT ticker, covered_from, covered_to,
+                       EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - synced_at), gaps_checked_to
+                FROM price_bar_sync
+                WHERE ticker = ANY(%s)
+            """, (tickers,))
+            coverage = {t: (f, to, float(ago), checked) for t, f, to, ago, checked in cur.fetchall()}
+            cur.execute("""
+                SELECT ticker, array_agg(day ORDER BY day) FROM price_bars
+                WHERE ticker = ANY(%s) AND day >= %s
+                GROUP BY ticker
+            """, (tickers, start))
+            stored_days = dict(cur.fetchall())
+        conn.commit()
+    finally:
+        put_db_connection(conn)
+
+    wanted = {}
+    gap_ends = {}
+    for t in tickers:
+        for rng in _fetch_ranges(coverage.get(t), stored_days.get(t, []), start, today):
+            wanted.setdefault(rng, []).append(t)
+        if t in coverage:
+            gaps = _gaps(stored_days.get(t, []), start, coverage[t][3])
+            if gaps:
+                gap_ends[t] = max(end for _, end in gaps)
+
+    written = 0
+    failed = set()
+    for (range_from, range_to), group in wanted.items():
+        for chunk in _chunks(group, batch_size):
+            frames = _download(chunk, range_from, range_to)
+            if frames is None:
+                failed.update(chunk)
+                continue
+            if not frames:
+                continue
+            conn = get_db_connection()
+            try:
+                with conn.cursor() as cur:
+                    for t, bars in frames.items():
+                        _save_bars(cur, t, bars)
+                        written += len(bars)
+                    execute_values(cur, """
+                        INSERT INTO price_bar_sync (ticker, covered_from, covered_to) VALUES %s
+                        ON CONFLICT (ticker) DO UPDATE
+                        SET covered_from = LEAST(price_bar_sync.covered_from, EXCLUDED.covered_from),
+                            covered_to = GREATEST(price_bar_sync.covered_to, EXCLUDED.covered_to),
+                            synced_at = CURRENT_TIMESTAMP
+                    """, [(t, range_from, range_to) for t in frames])
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                put_db_connection(conn)
+
+    # Gaps that downloaded cleanly are real; don't ask for them again.
+    checked = [(t, end) for t, end in gap_ends.items() if t not in failed]
+    if checked:
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                execute_values(cur, """
+                    UPDATE price_bar_sync AS s
+                    SET gaps_checked_to = GREATEST(s.gaps_checked_to, v.checked_to)
+                    FROM (VALUES %s) AS v(ticker, checked_to)
+                    WHERE s.ticker = v.ticker
+                """, checked, template='(%s, %s::date)')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            put_db_connection(conn)
+    return written
+
+
+def load_closes(ticker, start, end=None):
+    """Stored closes for one ticker as a ``ds``/``y`` frame (None if empty)."""
+    ticker = ticker.strip().upper()
+    closes = close_matrix([ticker], start, end)
+    if closes.empty or closes[ticker].dropna().empty:
+        return None
+    series = closes[ticker].dropna()
+    return pd.DataFrame({'ds': pd.to_datetime(series.index), 'y': series.values})
+
+
+def close_matrix(tickers, start, end=None):
+    """Aligned close prices: one row per day, one column per ticker."""
+    tickers = normalize_tickers(tickers)
+    query = """
+        SELECT day, ticker, close FROM price_bars
+        WHERE ticker = ANY(%s) AND day >= %s
+    """
+    params = [tickers, start]
+    if end is not None:
+        query += " AND day <= %s"
+        params.append(end)
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(query + " ORDER BY day", tuple(params))
+            rows = cur.fetchall()
+        conn.commit()
+    finally:
+        put_db_connection(conn)
+    if not rows:
+        return pd.DataFrame(columns=tickers)
+    frame = pd.DataFrame(rows, columns=['day', 'ticker', 'close'])
+    matrix = frame.pivot(index='day', columns='ticker', values='close')
+    return matrix.reindex(columns=tickers)
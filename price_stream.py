@@ -0,0 +1,171 @@
+"""Live prices for server-sent event streams from one shared poller.
+
+Every stream in the process subscribes its tickers to the same
+``PricePoller``. The poller fetches the union of subscribed tickers in a
+single batched call per interval and appends each result to a bounded
+per-ticker ring buffer; streams read the buffers by sequence number. The
+number of upstream requests is therefore set by the interval, not by how
+many pages are open. The poller thread stops when the last stream goes.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+PRICE_STREAM_INTERVAL = float(os.getenv('PRICE_STREAM_INTERVAL', '30'))
+PRICE_STREAM_BUFFER = int(os.getenv('PRICE_STREAM_BUFFER', '32'))
+# Seconds between keep-alive comments on an idle stream.
+PRICE_STREAM_HEARTBEAT = 15
+# A stream ends after this long; the browser reconnects after the retry hint,
+# so no request holds a worker thread indefinitely.
+PRICE_STREAM_MAX_SECONDS = float(os.getenv('PRICE_STREAM_MAX_SECONDS', '300'))
+
+
+def fetch_quotes(tickers):
+    """Default quote source: batched yfinance closes (shared quote cache)."""
+    from quotes import fetch_last_prices
+    return fetch_last_prices(tickers)[0]
+
+
+class PricePoller:
+    """Shared upstream poller with per-ticker ring buffers.
+
+    ``source(tickers)`` must return a ``{ticker: price}`` dict for the
+    tickers it could price.
+    """
+    def __init__(self, source=fetch_quotes, interval=PRICE_STREAM_INTERVAL, buffer_size=PRICE_STREAM_BUFFER):
+        self.source = source
+        self.interval = interval
+        self.buffer_size = buffer_size
+        self._cond = threading.Condition()
+        self._subscribers = {}
+        self._buffers = {}
+        self._seq = 0
+        self._thread = None
+        self._wake = False
+        self.fetches = 0
+
+    def subscribe(self, tickers):
+        with self._cond:
+            for t in tickers:
+                if t not in self._subscribers:
+                    # Price a newly watched ticker now rather than next interval.
+                    self._wake = True
+                self._subscribers[t] = self._subscribers.get(t, 0) + 1
+                self._buffers.setdefault(t, deque(maxlen=self.buffer_size))
+            self._cond.notify_all()
+            if self._thread is None and self._subscribers:
+                self._thread = threading.Thread(target=self._run, name='price-poller', daemon=True)
+                self._thread.start()
+
+    def unsubscribe(self, tickers):
+        with self._cond:
+            for t in tickers:
+                remaining = self._subscribers.get(t, 0) - 1
+                if remaining > 0:
+                    self._subscribers[t] = remaining
+                else:
+                    self._subscribers.pop(t, None)
+                    self._buffers.pop(t, None)
+            self._cond.notify_all()
+
+    def poll_once(self):
+        """Fetch every subscribed ticker in one call and publish the prices."""
+        with self._cond:
+            tickers = sorted(self._subscribers)
+        if not tickers:
+            return 0
+        try:
+            prices = self.source(tickers)
+        except Exception as e:
+            print(f"Price stream fetch failed for {len(tickers)} tickers: {e}")
+            return 0
+        now = time.time()
+        with self._cond:
+            self.fetches += 1
+            published = 0
+            for t, price in prices.items():
+                buffer = self._buffers.get(t)
+                if buffer is None or price is None:
+                    continue
+                if buffer and buffer[-1][2] == price:
+                    continue
+                self._seq += 1
+                buffer.append((self._seq, now, price))
+                published += 1
+            if published:
+                self._cond.notify_all()
+            return published
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._wake = False
+            self.poll_once()
+            with self._cond:
+                self._cond.wait_for(lambda: self._wake or not self._subscribers, timeout=self.interval)
+                if not self._subscribers:
+                    self._thread = None
+                    return
+
+    def updates(self, tickers, after=0, timeout=None):
+        """Newest update per ticker with a sequence number above ``after``.
+
+        Blocks up to ``timeout`` seconds for one to appear. Returns
+        ``(updates, last_seq)`` where each update is a dict with ``seq``,
+        ``ticker``, ``price`` and ``at``.
+        """
+        def collect():
+            found = []
+            for t in tickers:
+                buffer = self._buffers.get(t)
+                if buffer and buffer[-1][0] > after:
+                    seq, at, price = buffer[-1]
+                    found.append({'seq': seq, 'ticker': t, 'price': price, 'at': at})
+            return found
+
+        with self._cond:
+            found = collect()
+            if not found and timeout:
+                self._cond.wait_for(lambda: bool(collect()), timeout=timeout)
+                found = collect()
+        found.sort(key=lambda u: u['seq'])
+        return found, max([after] + [u['seq'] for u in found])
+
+
+def sse_stream(poller, tickers, heartbeat=PRICE_STREAM_HEARTBEAT, max_seconds=None):
+    """Generator of ``text/event-stream`` chunks for one client.
+
+    Ends after ``max_seconds`` (``PRICE_STREAM_MAX_SECONDS``).
+    """
+    deadline = time.monotonic() + (max_seconds or PRICE_STREAM_MAX_SECONDS)
+    poller.subscribe(tickers)
+    try:
+        yield 'retry: 5000\n\n'
+        last = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            found, last = poller.updates(tickers, last, timeout=min(heartbeat, remaining))
+            if not found:
+                yield ': keep-alive\n\n'
+            for update in found:
+                yield f"id: {update['seq']}\nevent: price\ndata: {json.dumps(update)}\n\n"
+    finally:
+        poller.unsubscribe(tickers)
+
+
+_poller = None
+_poller_lock = threading.Lock()
+
+
+def get_poller():
+    """The process-wide poller, created on first use."""
+    global _poller
+    with _poller_lock:
+        if _poller is None:
+            _poller = PricePoller()
+        return _poller
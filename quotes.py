@@ -0,0 +1,96 @@
+"""Batched market quotes and set-based price write-back for holdings."""
+
+import os
+import pandas as pd
+import yfinance as yf
+from psycopg2.extras import execute_values
+from cache import market_cache, QUOTE_TTL
+
+QUOTE_BATCH_SIZE = int(os.getenv('QUOTE_BATCH_SIZE', '100'))
+
+
+def normalize_tickers(tickers):
+    """Upper-case, strip and de-duplicate tickers, keeping first-seen order."""
+    return list(dict.fromkeys(t for t in ((t or '').strip().upper() for t in tickers) if t))
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _last_closes(df, tickers):
+    if df is None or df.empty:
+        return {}
+    if isinstance(df.columns, pd.MultiIndex):
+        if 'Close' not in df.columns.get_level_values(0):
+            return {}
+        close = df['Close']
+    else:
+        # Single-level frame: only one ticker was requested.
+        if 'Close' not in df.columns:
+            return {}
+        close = df[['Close']].rename(columns={'Close': tickers[0]})
+    if isinstance(close, pd.Series):
+        close = close.to_frame(name=tickers[0])
+
+    prices = {}
+    for t in tickers:
+        if t not in close.columns:
+            continue
+        series = close[t].dropna()
+        if not series.empty:
+            prices[t] = float(series.iloc[-1])
+    return prices
+
+
+def fetch_last_prices(tickers, batch_size=None):
+    """Fetch the latest close for each distinct ticker.
+
+    Tickers are requested in multi-symbol downloads of ``batch_size``
+    (default ``QUOTE_BATCH_SIZE``). Returns ``(prices, failed)`` where
+    ``prices`` maps ticker -> price and ``failed`` lists tickers without a
+    usable quote. Prices fetched within ``QUOTE_TTL`` seconds are served
+    from the shared cache.
+    """
+    tickers = normalize_tickers(tickers)
+    batch_size = batch_size or QUOTE_BATCH_SIZE
+    cached = market_cache.get_many([f'quote:{t}' for t in tickers])
+    prices = {key.split(':', 1)[1]: value for key, value in cached.items()}
+    to_fetch = [t for t in tickers if t not in prices]
+    fetched = {}
+    for chunk in _chunks(to_fetch, batch_size):
+        try:
+            df = yf.download(
+                chunk, period='5d', interval='1d', group_by='column',
+                progress=False, threads=True
+            )
+        except Exception as e:
+            print(f"Quote batch of {len(chunk)} tickers failed: {e}")
+            continue
+        fetched.update(_last_closes(df, chunk))
+    market_cache.set_many({f'quote:{t}': p for t, p in fetched.items()}, QUOTE_TTL)
+    prices.update(fetched)
+    failed = [t for t in tickers if t not in prices]
+    return prices, failed
+
+
+def update_holding_prices(cur, prices, portfolio_id=None):
+    """Set ``last_price`` on every holding whose ticker is in ``prices``.
+
+    Runs as one ``UPDATE ... FROM (VALUES ...)`` statement, optionally
+    restricted to a single portfolio. Returns the number of rows updated.
+    """
+    if not prices:
+        return 0
+    query = """
+        UPDATE holdings AS h
+        SET last_price = v.price, last_price_updated_at = CURRENT_TIMESTAMP
+        FROM (VALUES %s) AS v(ticker, price)
+        WHERE h.ticker = v.ticker
+    """
+    if portfolio_id is not None:
+        query += cur.mogrify(" AND h.portfolio_id = %s", (portfolio_id,)).decode()
+    rows = [(t, float(p)) for t, p in prices.items()]
+    execute_values(cur, query, rows, template="(%s, %s::float8)", page_size=len(rows))
+    return cur.rowcount
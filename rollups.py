@@ -0,0 +1,95 @@
+"""Precomputed holding aggregates for the analytics page.
+
+``portfolio_rollups`` keeps holding count, shares and market value per
+portfolio; ``user_ticker_rollups`` keeps shares and value per (user,
+ticker). Every path that writes holdings or their prices calls
+``refresh_rollups`` in the same transaction, which recomputes only the
+affected portfolios, users and tickers with set-based statements.
+"""
+
+
+def refresh_rollups(cur, portfolio_ids=None, tickers=None):
+    """Recompute rollups touched by a change to ``portfolio_ids``/``tickers``.
+
+    With only ``tickers``, every portfolio holding one of them is refreshed;
+    with neither, everything is.
+    """
+    params = {'portfolio_ids': list(portfolio_ids or []), 'tickers': list(tickers or [])}
+    if portfolio_ids is not None:
+        scope = "SELECT id, user_id FROM portfolios WHERE id = ANY(%(portfolio_ids)s)"
+    elif tickers is not None:
+        scope = """
+            SELECT DISTINCT p.id, p.user_id FROM portfolios p
+            JOIN holdings h ON h.portfolio_id = p.id
+            WHERE h.ticker = ANY(%(tickers)s)
+        """
+    else:
+        scope = "SELECT id, user_id FROM portfolios"
+    ticker_filter = " AND h.ticker = ANY(%(tickers)s)" if tickers is not None else ""
+    ticker_delete_filter = " AND ticker = ANY(%(tickers)s)" if tickers is not None else ""
+
+    cur.execute(f"""
+        WITH scope AS ({scope})
+        INSERT INTO portfolio_rollups
+            (portfolio_id, user_id, holding_count, total_shares, market_value, updated_at)
+        SELECT s.id, s.user_id, COUNT(h.id), COALESCE(SUM(h.shares), 0),
+               COALESCE(SUM(h.shares * COALESCE(h.last_price, 0)), 0), CURRENT_TIMESTAMP
+        FROM scope s
+        LEFT JOIN holdings h ON h.portfolio_id = s.id
+        GROUP BY s.id, s.user_id
+        ON CONFLICT (portfolio_id) DO UPDATE
+        SET user_id = EXCLUDED.user_id,
+            holding_count = EXCLUDED.holding_count,
+            total_shares = EXCLUDED.total_shares,
+            market_value = EXCLUDED.market_value,
+            updated_at = EXCLUDED.updated_at
+    """, params)
+    cur.execute(f"""
+        WITH scope AS ({scope})
+        DELETE FROM user_ticker_rollups
+        WHERE user_id IN (SELECT user_id FROM scope){ticker_delete_filter}
+    """, params)
+    cur.execute(f"""
+        WITH scope AS ({scope})
+        INSERT INTO user_ticker_rollups (user_id, ticker, shares, market_value, last_price, updated_at)
+        SELECT p.user_id, h.ticker, SUM(h.shares),
+               SUM(h.shares * COALESCE(h.last_price, 0)), MAX(h.last_price), CURRENT_TIMESTAMP
+        FROM holdings h
+        JOIN portfolios p ON h.portfolio_id = p.id
+        WHERE p.user_id IN (SELECT user_id FROM scope){ticker_filter}
+        GROUP BY p.user_id, h.ticker
+        ON CONFLICT (user_id, ticker) DO UPDATE
+        SET shares = EXCLUDED.shares,
+            market_value = EXCLUDED.market_value,
+            last_price = EXCLUDED.last_price,
+            updated_at = EXCLUDED.updated_at
+    """, params)
+
+
+def load_user_rollups(cur, user_id):
+    """Portfolio stats, ticker distribution and totals for one user in one query."""
+    cur.execute("""
+        SELECT
+            (SELECT COALESCE(json_agg(json_build_object(
+                        'id', p.id,
+                        'name', p.name,
+                        'holdings', COALESCE(r.holding_count, 0),
+                        'value', ROUND(COALESCE(r.market_value, 0)::numeric, 2)
+                    ) ORDER BY p.id), '[]'::json)
+             FROM portfolios p
+             LEFT JOIN portfolio_rollups r ON r.portfolio_id = p.id
+             WHERE p.user_id = %(user_id)s) AS portfolio_stats,
+            (SELECT COALESCE(json_agg(json_build_object(
+                        'ticker', t.ticker,
+                        'value', t.market_value,
+                        'shares', t.shares,
+                        'price', COALESCE(t.last_price, 0)
+                    ) ORDER BY t.market_value DESC, t.ticker), '[]'::json)
+             FROM user_ticker_rollups t
+             WHERE t.user_id = %(user_id)s) AS ticker_distribution,
+            (SELECT COALESCE(SUM(r.holding_count), 0) FROM portfolio_rollups r
+             WHERE r.user_id = %(user_id)s) AS total_holdings,
+            (SELECT COALESCE(SUM(r.market_value), 0) FROM portfolio_rollups r
+             WHERE r.user_id = %(user_id)s) AS total_value
+    """, {'user_id': user_id})
+    return cur.fetchone()
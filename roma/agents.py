@@ -1,71 +1,199 @@
 import datetime
+import time
 import yfinance as yf
 import pandas as pd
-import requests
-import os
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from cache import market_cache, HISTORY_TTL
+from price_store import SYNC_FRESH_SECONDS, period_start, sync_bars, load_closes
+from .forecast_store import forecast_store
+from .neynar import NeynarClient
+from . import sentiment_store
 
-try:
-    from prophet import Prophet
-    PROPHET_AVAILABLE = True
-except ImportError:
-    PROPHET_AVAILABLE = False
+_prophet = None
+_analyzer = None
 
-analyzer = SentimentIntensityAnalyzer()
+def prophet_available():
+    """Import Prophet on first use; False if it isn't installed."""
+    global _prophet
+    if _prophet is None:
+        try:
+            from prophet import Prophet
+            _prophet = Prophet
+        except ImportError:
+            _prophet = False
+    return _prophet is not False
+
+def get_analyzer():
+    # Building the VADER lexicon is slow; only do it when scoring is needed.
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer
 
 class PriceAgent:
-    """Fetch recent price history for tickers."""
+    """Fetch recent price history for tickers.
+
+    Daily history is served from the local ``price_bars`` store, which only
+    downloads bars it does not already have; other requests (or a missing
+    database) go straight to yfinance.
+    """
+    def __init__(self):
+        # ticker -> (start, monotonic time) of its last successful sync.
+        self._synced = {}
+
+    def _mark_synced(self, tickers, start):
+        now = time.monotonic()
+        for t in tickers:
+            self._synced[t.strip().upper()] = (start, now)
+
+    def _is_current(self, ticker, start):
+        synced = self._synced.get(ticker.strip().upper())
+        return (synced is not None and synced[0] <= start
+                and time.monotonic() - synced[1] < SYNC_FRESH_SECONDS)
+
+    def prefetch(self, tickers, period='180d'):
+        """Sync the price store for many tickers in batched downloads."""
+        start = period_start(period)
+        if start is None:
+            return
+        tickers = list(tickers)
+        try:
+            sync_bars(tickers, start)
+        except Exception as e:
+            print(f"Price store prefetch failed: {e}")
+            return
+        self._mark_synced(tickers, start)
+
     def fetch(self, ticker, period='7d', interval='1d'):
-        df = yf.download(ticker, period=period, interval=interval, progress=False, multi_level_index=False)
-        if df.empty:
+        key = f'history:{ticker}:{period}:{interval}'
+        cached = market_cache.get(key)
+        if cached is not None:
+            return cached.copy()
+        df = self._fetch_stored(ticker, period) if interval == '1d' else False
+        if df is False:
+            df = yf.download(ticker, period=period, interval=interval, progress=False, multi_level_index=False)
+            if df.empty:
+                return None
+            df = df.reset_index()[['Date','Close']].rename(columns={'Date':'ds','Close':'y'})
+        if df is None:
             return None
-        df = df.reset_index()[['Date','Close']].rename(columns={'Date':'ds','Close':'y'})
-        return df
+        market_cache.set(key, df, HISTORY_TTL)
+        return df.copy()
 
-class SentimentAgent:
-    """Search Farcaster casts via Neynar API and score sentiment with VADER."""
-    def scrape(self, query, max_tweets=50):
-        api_key = os.getenv('NEYNAR_API_KEY')
-        if not api_key:
-            return {'count':0, 'avg':0.0, 'scores':[]}
-            
+    def _fetch_stored(self, ticker, period):
+        # Returns False when the store can't answer, so the caller falls back.
+        start = period_start(period)
+        if start is None:
+            return False
         try:
-            url = "https://api.neynar.com/v2/farcaster/cast/search"
-            params = {
-                "q": query,
-                "limit": max_tweets
-            }
-            headers = {
-                "accept": "application/json",
-                "api_key": api_key
-            }
-            response = requests.get(url, params=params, headers=headers, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            texts = [cast.get('text', '') for cast in data.get('result', {}).get('casts', [])]
+            # Skip the per-ticker sync right after a batched prefetch.
+            if not self._is_current(ticker, start):
+                sync_bars([ticker], start)
+                self._mark_synced([ticker], start)
+            return load_closes(ticker, start)
         except Exception as e:
-            print(f"Error fetching from Neynar API: {e}")
-            texts = []
+            print(f"Price store unavailable for {ticker}: {e}")
+            return False
 
-        scores = [analyzer.polarity_scores(t)['compound'] for t in texts if t]
+class SentimentAgent:
+    """Search Farcaster casts via Neynar API and score sentiment with VADER."""
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        # Built lazily so NEYNAR_API_KEY is read after load_dotenv().
+        if self._client is None:
+            self._client = NeynarClient()
+        return self._client
+
+    def _score(self, casts):
+        texts = [cast.get('text', '') for cast in casts]
+        scores = [self._polarity(t) for t in texts if t]
         if not scores:
             return {'count':0, 'avg':0.0, 'scores':[]}
         return {'count':len(scores), 'avg':float(sum(scores)/len(scores)), 'scores':scores}
 
+    def scrape(self, query, max_tweets=50):
+        for _, sentiment in self.scrape_many([query], max_tweets=max_tweets):
+            return sentiment
+
+    def scrape_many(self, queries, max_tweets=50):
+        """Yield ``(query, sentiment)`` for many queries as searches complete.
+
+        With the sentiment store available, only casts newer than each
+        query's cursor are fetched and only unseen casts are scored; the
+        result carries the stored rolling aggregates.
+        """
+        queries = list(queries)
+        if not self.client.api_key:
+            for query in queries:
+                yield query, {'count':0, 'avg':0.0, 'scores':[]}
+            return
+        try:
+            states = sentiment_store.load_states(queries)
+        except Exception as e:
+            print(f"Sentiment store unavailable: {e}")
+            states = None
+        since = {q: st['newest_cast_at'] for q, st in (states or {}).items()}
+        for query, casts in self.client.search_many(queries, limit=max_tweets, since=since):
+            if isinstance(casts, Exception):
+                print(f"Error fetching from Neynar API: {casts}")
+                casts = []
+            if states is None:
+                yield query, self._score(casts)
+                continue
+            try:
+                state = sentiment_store.record(query, casts, self._polarity)
+                yield query, sentiment_store.summary(state)
+            except Exception as e:
+                print(f"Error recording sentiment for {query}: {e}")
+                yield query, self._score(casts)
+
+    @staticmethod
+    def _polarity(text):
+        return get_analyzer().polarity_scores(text)['compound']
+
 class ForecastAgent:
-    """Produce a short-term forecast using Prophet."""
-    def forecast(self, df, periods=3):
-        if not PROPHET_AVAILABLE:
+    """Produce a short-term forecast using Prophet.
+
+    When a ticker is given, fits are reused from the forecast store while the
+    input series is unchanged, and warm-started from the previous fit when a
+    single new bar has been appended.
+    """
+    def __init__(self, model_params=None, store=None):
+        self.model_params = model_params or {}
+        self.store = store if store is not None else forecast_store
+
+    def forecast(self, df, periods=3, ticker=None):
+        if not prophet_available():
             return None
         if df is None or df.empty:
             return None
-        m = Prophet()
-        m.fit(df)
+        init = None
+        if ticker:
+            cached = self.store.get(ticker, df, periods, self.model_params)
+            if cached is not None:
+                return cached
+            init = self.store.warm_start(ticker, df, periods, self.model_params)
+        m = _prophet(**self.model_params)
+        if init:
+            m.fit(df, init=init)
+        else:
+            m.fit(df)
         future = m.make_future_dataframe(periods=periods)
         fcst = m.predict(future)
         # Return only the forecast for the horizon
-        return fcst[['ds','yhat','yhat_lower','yhat_upper']].tail(periods)
+        result = fcst[['ds','yhat','yhat_lower','yhat_upper']].tail(periods)
+        if ticker:
+            self.store.put(ticker, df, periods, self.model_params, result, _stan_init(m))
+        return result
+
+def _stan_init(m):
+    """Fitted Prophet params in the shape ``Prophet.fit(init=...)`` expects."""
+    init = {name: m.params[name][0][0] for name in ['k', 'm', 'sigma_obs']}
+    init.update({name: m.params[name][0] for name in ['delta', 'beta']})
+    return init
 
 class SynthesizerAgent:
     """Meta-agent: combine outputs into a report string and simple risk flags."""
@@ -77,7 +205,11 @@ class SynthesizerAgent:
             lines.append(f"Last close: {last:.2f}")
         if sentiment and sentiment['count']>0:
             lines.append(f"Social sentiment (avg): {sentiment['avg']:.3f} from {sentiment['count']} posts")
-            if sentiment['avg']>0.6:
+            # Stored sentiment carries a recency-weighted score; prefer it for hype.
+            recent = sentiment.get('ewm', sentiment['avg'])
+            if 'ewm' in sentiment:
+                lines.append(f"Recent sentiment (EWM): {recent:.3f}")
+            if recent>0.6:
                 lines.append("Hype risk: HIGH (very positive social buzz)")
         if forecast_df is not None and not forecast_df.empty:
             next_hat = forecast_df.iloc[ -1 ]['yhat']
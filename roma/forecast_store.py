@@ -0,0 +1,155 @@
+"""On-disk store of fitted Prophet forecasts.
+
+Entries are keyed by ticker, the last ``ds`` of the input series, the
+forecast horizon and the Prophet constructor params, and also record a
+digest of the series so a revised history is never served a stale fit.
+Files are JSON, written atomically to a directory private to the current
+user, so every process on the host (including the workflow's process
+pool) can share the store. Entries not rewritten for
+``FORECAST_CACHE_MAX_AGE_DAYS`` are pruned.
+"""
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from cache import private_dir
+
+FORECAST_CACHE_DIR = os.getenv(
+    'FORECAST_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'stock-monitor-forecasts')
+)
+FORECAST_CACHE_MAX_AGE_DAYS = float(os.getenv('FORECAST_CACHE_MAX_AGE_DAYS', '14'))
+# Seconds between prune passes in one process.
+PRUNE_INTERVAL = 3600
+
+
+def series_digest(df):
+    """Stable digest of a ``ds``/``y`` frame."""
+    values = pd.util.hash_pandas_object(df[['ds', 'y']], index=False).values
+    return hashlib.sha1(values.tobytes()).hexdigest()
+
+
+def _params_key(model_params):
+    return json.dumps(model_params or {}, sort_keys=True, default=str)
+
+
+def _write_frame(df):
+    return {'table': df.to_json(orient='table'), 'dtypes': {c: str(t) for c, t in df.dtypes.items()}}
+
+
+def _read_frame(data):
+    # ``table`` JSON reads datetimes back in ns; restore the stored resolution.
+    return pd.read_json(io.StringIO(data['table']), orient='table').astype(data['dtypes'])
+
+
+class ForecastStore:
+    def __init__(self, directory=FORECAST_CACHE_DIR, max_age_days=FORECAST_CACHE_MAX_AGE_DAYS):
+        self.directory = directory
+        self.max_age_days = max_age_days
+        self._pruned_at = 0.0
+        self._checked = False
+
+    def _directory(self):
+        if not self._checked:
+            private_dir(self.directory)
+            self._checked = True
+        return self.directory
+
+    def _path(self, ticker, last_ds, periods, model_params):
+        raw = f"{ticker}|{pd.Timestamp(last_ds).date().isoformat()}|{periods}|{_params_key(model_params)}"
+        return os.path.join(self.directory, hashlib.sha1(raw.encode('utf-8')).hexdigest() + '.json')
+
+    def _load(self, path):
+        try:
+            self._directory()
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+            entry['series'] = _read_frame(entry['series'])
+            entry['forecast'] = _read_frame(entry['forecast'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if entry.get('init'):
+            entry['init'] = {k: np.asarray(v) if isinstance(v, list) else v for k, v in entry['init'].items()}
+        return entry
+
+    def get(self, ticker, df, periods, model_params=None):
+        """Return the stored forecast for exactly this input series, or None."""
+        entry = self._load(self._path(ticker, df['ds'].iloc[-1], periods, model_params))
+        if entry is None or entry['digest'] != series_digest(df):
+            return None
+        return entry['forecast'].copy()
+
+    def warm_start(self, ticker, df, periods, model_params=None):
+        """Fitted params of the previous run when ``df`` only adds one new bar.
+
+        The history is a rolling window, so the previous input may also
+        start earlier; only the bars both series share must match.
+        """
+        if len(df) < 2:
+            return None
+        entry = self._load(self._path(ticker, df['ds'].iloc[-2], periods, model_params))
+        stored = entry.get('series') if entry else None
+        if stored is None or stored.empty:
+            return None
+        shared = df.iloc[:-1]
+        shared = shared[shared['ds'] >= stored['ds'].iloc[0]]
+        overlap = stored[stored['ds'] >= shared['ds'].iloc[0]] if not shared.empty else stored.iloc[:0]
+        if shared.empty or len(shared) != len(overlap):
+            return None
+        if series_digest(shared) != series_digest(overlap):
+            return None
+        return entry.get('init')
+
+    def put(self, ticker, df, periods, model_params, forecast, init=None):
+        try:
+            directory = self._directory()
+        except OSError as e:
+            print(f"Could not store forecast for {ticker}: {e}")
+            return
+        entry = {
+            'digest': series_digest(df),
+            'series': _write_frame(df[['ds', 'y']].reset_index(drop=True)),
+            'forecast': _write_frame(forecast),
+            'init': {k: np.asarray(v).tolist() for k, v in (init or {}).items()} or None,
+        }
+        fd, tmp = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp, self._path(ticker, df['ds'].iloc[-1], periods, model_params))
+        except OSError as e:
+            print(f"Could not store forecast for {ticker}: {e}")
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+        if time.time() - self._pruned_at >= PRUNE_INTERVAL:
+            self.prune()
+
+    def prune(self, max_age_days=None):
+        """Delete entries not written for ``max_age_days``; returns how many."""
+        max_age_days = self.max_age_days if max_age_days is None else max_age_days
+        self._pruned_at = time.time()
+        cutoff = self._pruned_at - max_age_days * 86400
+        removed = 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return 0
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.unlink(path)
+                    removed += 1
+            except OSError:
+                # Another process pruned or replaced it first.
+                continue
+        return removed
+
+
+forecast_store = ForecastStore()
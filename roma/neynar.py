@@ -0,0 +1,131 @@
+"""Pooled, concurrency-bounded client for the Neynar cast search API."""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+NEYNAR_SEARCH_URL = os.getenv('NEYNAR_SEARCH_URL', 'https://api.neynar.com/v2/farcaster/cast/search')
+NEYNAR_CONCURRENCY = int(os.getenv('NEYNAR_CONCURRENCY', '8'))
+
+# Longest we will honour a Retry-After header before giving up on a query.
+MAX_RETRY_AFTER = 60
+
+
+def _retry_after_seconds(value, default):
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class NeynarClient:
+    """Thread-safe cast search over one pooled ``requests.Session``.
+
+    At most ``concurrency`` requests are in flight. A 429 pauses every
+    caller until the server's ``Retry-After`` has passed.
+    """
+    def __init__(self, api_key=None, url=NEYNAR_SEARCH_URL, concurrency=NEYNAR_CONCURRENCY,
+                 timeout=10, max_retries=3):
+        self.api_key = api_key if api_key is not None else os.getenv('NEYNAR_API_KEY')
+        self.url = url
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'accept': 'application/json', 'api_key': self.api_key or ''})
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+
+    def _wait_for_rate_limit(self):
+        with self._lock:
+            delay = self._paused_until - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.time() + seconds)
+
+    def search_page(self, query, limit=50, cursor=None):
+        """Return ``(casts, next_cursor)`` for one page of results."""
+        params = {'q': query, 'limit': limit, 'sort_type': 'desc_chronological'}
+        if cursor:
+            params['cursor'] = cursor
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_rate_limit()
+            with self._slots:
+                response = self.session.get(self.url, params=params, timeout=self.timeout)
+            if response.status_code == 429 or response.status_code >= 500:
+                if attempt == self.max_retries:
+                    response.raise_for_status()
+                delay = _retry_after_seconds(response.headers.get('Retry-After'), 2 ** attempt)
+                if delay > MAX_RETRY_AFTER:
+                    response.raise_for_status()
+                self._pause(delay)
+                continue
+            response.raise_for_status()
+            result = response.json().get('result', {})
+            return result.get('casts', []), (result.get('next') or {}).get('cursor')
+        return [], None
+
+    def search(self, query, limit=50):
+        """Return the list of casts matching ``query``."""
+        return self.search_page(query, limit)[0]
+
+    def search_since(self, query, since=None, limit=50, max_pages=5):
+        """Newest-first casts posted after ``since`` (a datetime).
+
+        Pages back until a cast older than ``since`` shows up. Without
+        ``since`` only the first page is returned.
+        """
+        casts, cursor = [], None
+        for _ in range(max_pages):
+            page, cursor = self.search_page(query, limit, cursor)
+            fresh = [c for c in page if since is None or cast_time(c) > since]
+            casts.extend(fresh)
+            if since is None or len(fresh) < len(page) or not cursor:
+                break
+        return casts
+
+    def search_many(self, queries, limit=50, since=None):
+        """Yield ``(query, casts)`` as each search completes.
+
+        ``since`` optionally maps a query to the datetime of the newest cast
+        already seen. ``casts`` is the exception instead when a search fails.
+        """
+        queries = list(queries)
+        since = since or {}
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='neynar') as pool:
+            futures = {pool.submit(self.search_since, q, since.get(q), limit): q for q in queries}
+            for future in as_completed(futures):
+                query = futures[future]
+                try:
+                    yield query, future.result()
+                except Exception as e:
+                    yield query, e
+
+
+def cast_time(cast):
+    """Timestamp of a cast as an aware datetime (epoch if missing)."""
+    try:
+        at = datetime.fromisoformat(cast.get('timestamp', '').replace('Z', '+00:00'))
+    except ValueError:
+        return datetime.fromtimestamp(0, timezone.utc)
+    # Neynar timestamps are UTC; a missing offset must not yield a naive value.
+    return at if at.tzinfo is not None else at.replace(tzinfo=timezone.utc)
@@ -0,0 +1,157 @@
+"""Parallel per-ticker execution of the ROMA agent pipeline.
+
+Network-bound work (price download, Neynar search) runs on a thread pool,
+Prophet fits run on a process pool, and bounded queues between the stages
+apply backpressure while finished reports stream back to a single writer.
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+
+from .agents import ForecastAgent, prophet_available
+
+WORKFLOW_WORKERS = int(os.getenv('WORKFLOW_WORKERS', '1'))
+
+_DONE = object()
+
+
+def _fit_forecast(ticker, price_df, periods):
+    # Module-level so it can be pickled into the process pool.
+    return ForecastAgent().forecast(price_df, periods=periods, ticker=ticker)
+
+
+def _elapsed_ms(started):
+    return int((time.monotonic() - started) * 1000)
+
+
+def iter_reports_parallel(tickers, fetch, synthesize, workers=None, periods=3, timings=None):
+    """Yield ``(ticker, report)`` pairs in completion order.
+
+    ``fetch(ticker)`` must return ``(price_df, sentiment)``;
+    ``synthesize(ticker, price_df, sentiment, forecast)`` builds the report.
+    A ticker whose stages raise is yielded as ``(ticker, None)``. If given,
+    ``timings[ticker]`` collects ``fetch_ms``, ``forecast_ms``, ``synth_ms``
+    and any ``error``. Anything else that kills a stage stops the pipeline
+    and is re-raised here once the reports already finished are yielded.
+    """
+    tickers = list(tickers)
+    timings = {} if timings is None else timings
+    workers = max(1, workers or WORKFLOW_WORKERS)
+    todo = queue.Queue()
+    for ticker in tickers:
+        todo.put(ticker)
+    fetched = queue.Queue(maxsize=workers * 2)
+    results = queue.Queue(maxsize=workers * 2)
+    stop = threading.Event()
+    consumer_gone = threading.Event()
+    errors = []
+
+    def put(q, item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def fetch_stage():
+        while not stop.is_set():
+            try:
+                ticker = todo.get_nowait()
+            except queue.Empty:
+                return
+            timing = timings.setdefault(ticker, {})
+            started = time.monotonic()
+            try:
+                price_df, sentiment = fetch(ticker)
+            except Exception as e:
+                print(f"Workflow fetch failed for {ticker}: {e}")
+                timing['error'] = f"fetch: {e}"
+                put(results, (ticker, None))
+                continue
+            finally:
+                timing['fetch_ms'] = _elapsed_ms(started)
+            put(fetched, (ticker, price_df, sentiment))
+
+    def forecast_stage(fit_pool):
+        while not stop.is_set():
+            try:
+                item = fetched.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                return
+            ticker, price_df, sentiment = item
+            timing = timings.setdefault(ticker, {})
+            try:
+                forecast = None
+                started = time.monotonic()
+                if fit_pool is not None and price_df is not None and not price_df.empty:
+                    forecast = fit_pool.submit(_fit_forecast, ticker, price_df, periods).result()
+                timing['forecast_ms'] = _elapsed_ms(started)
+                started = time.monotonic()
+                report = synthesize(ticker, price_df, sentiment, forecast)
+                timing['synth_ms'] = _elapsed_ms(started)
+                put(results, (ticker, report))
+            except Exception as e:
+                print(f"Workflow forecast failed for {ticker}: {e}")
+                timing['error'] = str(e)
+                put(results, (ticker, None))
+
+    def guarded(stage, *args):
+        try:
+            stage(*args)
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+
+    # Spawn rather than fork: this process already runs the scheduler,
+    # poller and pool threads, and a forked child can inherit their locks held.
+    fit_context = (
+        ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        if prophet_available() else nullcontext()
+    )
+    with fit_context as fit_pool, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix='roma-fetch') as fetch_pool, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix='roma-forecast') as forecast_pool:
+        fetchers = [fetch_pool.submit(guarded, fetch_stage) for _ in range(workers)]
+        forecasters = [forecast_pool.submit(guarded, forecast_stage, fit_pool) for _ in range(workers)]
+
+        def close_stages():
+            try:
+                for f in fetchers:
+                    f.result()
+                for _ in forecasters:
+                    put(fetched, _DONE)
+                for f in forecasters:
+                    f.result()
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                # Always end the results, or the consumer would wait forever.
+                while not consumer_gone.is_set():
+                    try:
+                        results.put(_DONE, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+
+        closer = threading.Thread(target=close_stages, daemon=True)
+        closer.start()
+        try:
+            while True:
+                item = results.get()
+                if item is _DONE:
+                    break
+                yield item
+            if errors:
+                raise errors[0]
+        finally:
+            consumer_gone.set()
+            stop.set()
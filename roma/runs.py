@@ -0,0 +1,140 @@
+"""Checkpointed workflow runs.
+
+Each local workflow run has a row in ``workflow_runs`` and one
+``workflow_items`` row per ticker. A run is named by its key, by default
+the scope and day (``all:2026-10-14`` or ``7:2026-10-14``). The workflow
+commits an item's status in the same transaction as its alerts, so a run
+restarted under the same key skips the tickers already done and retries
+the failed or unfinished ones. ``workflow_run_summary`` shows per-stage
+times for each run.
+"""
+
+from datetime import date
+
+from psycopg2.extras import RealDictCursor, execute_values
+
+
+def run_key(portfolio_id=None, day=None):
+    """Default key: one resumable run per scope per day."""
+    return f"{portfolio_id or 'all'}:{(day or date.today()).isoformat()}"
+
+
+def start_run(cur, key, portfolio_id, tickers):
+    """Open (or reopen) a run and its items; returns ``(run_id, done_tickers)``.
+
+    An existing run is only reopened when some of ``tickers`` are not done
+    yet; a finished run with nothing left keeps its status and times.
+    """
+    cur.execute("""
+        INSERT INTO workflow_runs (run_key, portfolio_id) VALUES (%s, %s)
+        ON CONFLICT (run_key) DO NOTHING
+        RETURNING id
+    """, (key, portfolio_id))
+    row = cur.fetchone()
+    created = row is not None
+    if not created:
+        cur.execute("SELECT id FROM workflow_runs WHERE run_key = %s", (key,))
+        row = cur.fetchone()
+    run_id = row[0]
+    if tickers:
+        execute_values(cur, """
+            INSERT INTO workflow_items (run_id, ticker) VALUES %s
+            ON CONFLICT (run_id, ticker) DO NOTHING
+        """, [(run_id, t) for t in tickers], page_size=len(tickers))
+    cur.execute("SELECT ticker FROM workflow_items WHERE run_id = %s AND status = 'done'", (run_id,))
+    done = {row[0] for row in cur.fetchall()}
+    if not created and set(tickers) - done:
+        cur.execute("""
+            UPDATE workflow_runs
+            SET status = 'running', attempts = attempts + 1,
+                started_at = CURRENT_TIMESTAMP, finished_at = NULL, error = NULL
+            WHERE id = %s
+        """, (run_id,))
+    return run_id, done
+
+
+def record_items(cur, run_id, items):
+    """Store the outcome of finished items in the caller's transaction.
+
+    Each item is a dict with ``ticker``, ``status`` ('done' or 'failed'),
+    ``alerts`` and optional ``fetch_ms``, ``forecast_ms``, ``synth_ms`` and
+    ``error``.
+    """
+    if not items:
+        return
+    execute_values(cur, """
+        UPDATE workflow_items AS i
+        SET status = v.status, attempts = i.attempts + 1, alerts = v.alerts,
+            fetch_ms = v.fetch_ms, forecast_ms = v.forecast_ms, synth_ms = v.synth_ms,
+            error = v.error, finished_at = CURRENT_TIMESTAMP
+        FROM (VALUES %s) AS v(run_id, ticker, status, alerts, fetch_ms, forecast_ms, synth_ms, error)
+        WHERE i.run_id = v.run_id AND i.ticker = v.ticker
+    """, [
+        (run_id, item['ticker'], item['status'], item.get('alerts', 0), item.get('fetch_ms'),
+         item.get('forecast_ms'), item.get('synth_ms'), item.get('error'))
+        for item in items
+    ], template='(%s, %s, %s, %s, %s::int, %s::int, %s::int, %s)', page_size=len(items))
+
+
+def finish_run(cur, run_id, stats, error=None):
+    """Close a run: 'done' when every item is done, otherwise 'failed'."""
+    cur.execute("""
+        UPDATE workflow_runs
+        SET status = CASE WHEN %(error)s IS NULL AND NOT EXISTS (
+                SELECT 1 FROM workflow_items WHERE run_id = %(run_id)s AND status <> 'done'
+            ) THEN 'done' ELSE 'failed' END,
+            finished_at = CURRENT_TIMESTAMP,
+            tickers = %(tickers)s, skipped = %(skipped)s,
+            alerts = (SELECT COALESCE(SUM(alerts), 0) FROM workflow_items WHERE run_id = %(run_id)s),
+            prefetch_ms = %(prefetch_ms)s, sentiment_ms = %(sentiment_ms)s,
+            write_ms = %(write_ms)s, duration_ms = %(duration_ms)s, error = %(error)s
+        WHERE id = %(run_id)s
+    """, {
+        'run_id': run_id, 'error': error,
+        'tickers': stats.get('tickers', 0), 'skipped': stats.get('skipped', 0),
+        'prefetch_ms': stats.get('prefetch_ms'), 'sentiment_ms': stats.get('sentiment_ms'),
+        'write_ms': stats.get('write_ms'), 'duration_ms': stats.get('duration_ms'),
+    })
+
+
+def close_if_finished(cur, run_id):
+    """Close a queued run once none of its items is pending; True if closed.
+
+    The run row is locked first, so when two jobs finish the last items at
+    the same time the second waits, sees both items and closes the run.
+    """
+    cur.execute("""
+        SELECT (EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - started_at) * 1000)::int
+        FROM workflow_runs WHERE id = %s FOR UPDATE
+    """, (run_id,))
+    row = cur.fetchone()
+    if row is None:
+        return False
+    cur.execute("""
+        SELECT COUNT(*), COUNT(*) FILTER (WHERE status = 'pending')
+        FROM workflow_items WHERE run_id = %s
+    """, (run_id,))
+    tickers, pending = cur.fetchone()
+    if pending:
+        return False
+    finish_run(cur, run_id, {'tickers': tickers, 'duration_ms': row[0]})
+    return True
+
+
+def recent_runs(conn, limit=10):
+    """Newest rows of ``workflow_run_summary`` plus each run's failed items."""
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("SELECT * FROM workflow_run_summary ORDER BY started_at DESC LIMIT %s", (limit,))
+        runs = cur.fetchall()
+        if runs:
+            cur.execute("""
+                SELECT run_id, ticker, attempts, error FROM workflow_items
+                WHERE run_id = ANY(%s) AND status = 'failed'
+                ORDER BY run_id, ticker
+            """, ([r['id'] for r in runs],))
+            failed = {}
+            for row in cur.fetchall():
+                failed.setdefault(row.pop('run_id'), []).append(row)
+            for r in runs:
+                r['failed_items'] = failed.get(r['id'], [])
+    return runs
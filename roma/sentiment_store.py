@@ -0,0 +1,139 @@
+"""Incremental sentiment ingestion.
+
+Scored casts are remembered per query in ``sentiment_casts`` and each
+query keeps a cursor (newest cast seen) plus rolling aggregates in
+``sentiment_state``. A run only fetches casts newer than the cursor, only
+scores casts it has not seen, and folds them into an exponentially
+weighted mean. Count and mean cover the casts of the last
+``SENTIMENT_WINDOW_DAYS``; older casts are pruned.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+
+from psycopg2.extras import execute_values
+
+from db import get_db_connection, put_db_connection
+from .neynar import cast_time
+
+SENTIMENT_EWM_ALPHA = float(os.getenv('SENTIMENT_EWM_ALPHA', '0.1'))
+SENTIMENT_WINDOW_DAYS = int(os.getenv('SENTIMENT_WINDOW_DAYS', '7'))
+
+
+def summary(state):
+    """Sentiment dict in the shape SynthesizerAgent expects."""
+    if not state or not state['cast_count']:
+        return {'count': 0, 'avg': 0.0, 'ewm': 0.0, 'new': 0}
+    return {
+        'count': state['cast_count'],
+        'avg': state['score_sum'] / state['cast_count'],
+        'ewm': state['ewm_score'],
+        'new': state.get('new', 0),
+    }
+
+
+def load_states(queries):
+    """Current cursor and aggregates for each query that has any."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT query, newest_cast_at, cast_count, score_sum, ewm_score
+                FROM sentiment_state WHERE query = ANY(%s)
+            """, (list(queries),))
+            rows = cur.fetchall()
+        conn.commit()
+    finally:
+        put_db_connection(conn)
+    return {
+        q: {'newest_cast_at': at, 'cast_count': n, 'score_sum': total, 'ewm_score': ewm}
+        for q, at, n, total, ewm in rows
+    }
+
+
+def apply_scores(state, scored, alpha=SENTIMENT_EWM_ALPHA):
+    """Fold ``[(cast_at, score), ...]`` into ``state``, oldest first."""
+    state = dict(state or {'newest_cast_at': None, 'cast_count': 0, 'score_sum': 0.0, 'ewm_score': None})
+    for cast_at, score in sorted(scored, key=lambda item: item[0]):
+        state['cast_count'] += 1
+        state['score_sum'] += score
+        ewm = state['ewm_score']
+        state['ewm_score'] = score if ewm is None else alpha * score + (1 - alpha) * ewm
+        if state['newest_cast_at'] is None or cast_at > state['newest_cast_at']:
+            state['newest_cast_at'] = cast_at
+    state['new'] = len(scored)
+    return state
+
+
+def record(query, casts, score, window_days=None):
+    """Score the unseen ``casts`` for ``query`` and persist the new state.
+
+    ``score(text)`` is only called for casts not already stored. The state
+    row is locked for the update, so concurrent runs never double-count.
+    Casts older than ``window_days`` are dropped and count and mean are
+    recomputed over the rest.
+    """
+    window_days = window_days or SENTIMENT_WINDOW_DAYS
+    # Casts already outside the window would be pruned below and then look
+    # unseen next run; never score them or fold them into the EWM.
+    cutoff = datetime.now(timezone.utc) - timedelta(days=window_days)
+    by_hash = {
+        c['hash']: c for c in casts
+        if c.get('hash') and c.get('text') and cast_time(c) >= cutoff
+    }
+    newest_seen = max((cast_time(c) for c in casts), default=None)
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO sentiment_state (query) VALUES (%s) ON CONFLICT DO NOTHING", (query,)
+            )
+            cur.execute("""
+                SELECT newest_cast_at, cast_count, score_sum, ewm_score
+                FROM sentiment_state WHERE query = %s FOR UPDATE
+            """, (query,))
+            at, n, total, ewm = cur.fetchone()
+            state = {'newest_cast_at': at, 'cast_count': n, 'score_sum': total, 'ewm_score': ewm}
+            if by_hash:
+                cur.execute("""
+                    SELECT cast_hash FROM sentiment_casts
+                    WHERE query = %s AND cast_hash = ANY(%s)
+                """, (query, list(by_hash)))
+                for (seen,) in cur.fetchall():
+                    by_hash.pop(seen, None)
+            scored = {h: (cast_time(c), score(c['text'])) for h, c in by_hash.items()}
+            inserted = []
+            if scored:
+                inserted = execute_values(cur, """
+                    INSERT INTO sentiment_casts (query, cast_hash, cast_at, score) VALUES %s
+                    ON CONFLICT DO NOTHING
+                    RETURNING cast_hash
+                """, [(query, h, at, sc) for h, (at, sc) in scored.items()], fetch=True)
+            state = apply_scores(state, [scored[h] for (h,) in inserted])
+            # Advance the cursor past out-of-window casts too, so they are not fetched again.
+            cursor = state['newest_cast_at']
+            if newest_seen is not None and (cursor is None or newest_seen > cursor):
+                state['newest_cast_at'] = newest_seen
+            cur.execute("""
+                DELETE FROM sentiment_casts
+                WHERE query = %s AND cast_at < CURRENT_TIMESTAMP - make_interval(days => %s)
+            """, (query, window_days))
+            cur.execute(
+                "SELECT COUNT(*), COALESCE(SUM(score), 0) FROM sentiment_casts WHERE query = %s",
+                (query,)
+            )
+            state['cast_count'], state['score_sum'] = cur.fetchone()
+            cur.execute("""
+                UPDATE sentiment_state
+                SET newest_cast_at = %s, cast_count = %s, score_sum = %s,
+                    ewm_score = %s, updated_at = CURRENT_TIMESTAMP
+                WHERE query = %s
+            """, (state['newest_cast_at'], state['cast_count'], state['score_sum'],
+                  state['ewm_score'], query))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        put_db_connection(conn)
+    return state
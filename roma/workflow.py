@@ -1,9 +1,13 @@
 from .agents import PriceAgent, SentimentAgent, ForecastAgent, SynthesizerAgent
+from .pipeline import iter_reports_parallel, WORKFLOW_WORKERS
 from db import get_db_connection, put_db_connection
 import os
+import time
+from contextlib import contextmanager
 from dotenv import load_dotenv
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 from . import ROMA_AVAILABLE, roma_framework
+from .runs import close_if_finished, finish_run, record_items, run_key, start_run
 
 load_dotenv()
 
@@ -12,10 +16,114 @@ sent_agent = SentimentAgent()
 forecast_agent = ForecastAgent()
 synth = SynthesizerAgent()
 
-def run_root_workflow(portfolio_id=None):
+# Alerts written per INSERT statement and transaction.
+ALERT_BATCH_SIZE = int(os.getenv('ALERT_BATCH_SIZE', '500'))
+# Finished tickers per checkpoint; at most this many are redone after a crash.
+WORKFLOW_CHECKPOINT_ITEMS = int(os.getenv('WORKFLOW_CHECKPOINT_ITEMS', '25'))
+
+# Counters from the most recent local run (run_id, tickers, skipped, alerts,
+# failed, seconds, lease_seconds and per-stage *_ms).
+last_run = {}
+
+def _elapsed_ms(started):
+    return int((time.monotonic() - started) * 1000)
+
+@contextmanager
+def _leased_connection(stats):
+    """Check out a pooled connection, adding the lease time to ``stats``."""
+    conn = get_db_connection()
+    leased_at = time.monotonic()
+    try:
+        yield conn
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        stats['lease_seconds'] += time.monotonic() - leased_at
+        put_db_connection(conn)
+
+def write_alerts(conn, rows, batch_size=None):
+    """Insert ``(portfolio_id, message)`` rows, committing every batch."""
+    batch_size = batch_size or ALERT_BATCH_SIZE
+    with conn.cursor() as cur:
+        for i in range(0, len(rows), batch_size):
+            execute_values(
+                cur, "INSERT INTO alerts (portfolio_id, message) VALUES %s",
+                rows[i:i + batch_size], page_size=batch_size
+            )
+            conn.commit()
+    return len(rows)
+
+def select_holdings(cur, portfolio_id=None):
+    """``ticker``/``portfolio_id`` rows for one portfolio, or all of them."""
+    if portfolio_id:
+        cur.execute(
+            "SELECT ticker, portfolio_id FROM holdings WHERE portfolio_id = %s ORDER BY ticker",
+            (portfolio_id,)
+        )
+    else:
+        cur.execute("SELECT ticker, portfolio_id FROM holdings ORDER BY ticker, portfolio_id")
+    return cur.fetchall()
+
+def group_holdings_by_ticker(holdings):
+    """Map each ticker to the distinct portfolio ids holding it, in first-seen order."""
+    groups = {}
+    for h in holdings:
+        groups.setdefault(h['ticker'], {})[h['portfolio_id']] = None
+    return {ticker: list(portfolio_ids) for ticker, portfolio_ids in groups.items()}
+
+def fetch_inputs(ticker, sentiment=None):
+    """Network-bound part of the pipeline: price history and social sentiment."""
+    price_df = price_agent.fetch(ticker, period='180d')
+    if sentiment is None:
+        sentiment = sent_agent.scrape(ticker)  # searches for the ticker symbol/term
+    return price_df, sentiment
+
+def analyze_ticker(ticker, sentiment=None, timings=None):
+    """Run the agent pipeline for one ticker and return the report text.
+
+    Stage times (``fetch_ms``, ``forecast_ms``, ``synth_ms``) are stored in
+    ``timings`` if given.
+    """
+    timings = {} if timings is None else timings
+    started = time.monotonic()
+    price_df, sentiment = fetch_inputs(ticker, sentiment)
+    timings['fetch_ms'] = _elapsed_ms(started)
+    started = time.monotonic()
+    forecast = forecast_agent.forecast(price_df, periods=3, ticker=ticker)
+    timings['forecast_ms'] = _elapsed_ms(started)
+    started = time.monotonic()
+    report = synth.synthesize(ticker, price_df, sentiment, forecast)
+    timings['synth_ms'] = _elapsed_ms(started)
+    return report
+
+def _write_alerts(cur, run_id, items, rows):
+    for i in range(0, len(rows), ALERT_BATCH_SIZE):
+        execute_values(
+            cur, "INSERT INTO alerts (portfolio_id, message) VALUES %s",
+            rows[i:i + ALERT_BATCH_SIZE], page_size=ALERT_BATCH_SIZE
+        )
+    record_items(cur, run_id, items)
+
+def _checkpoint(conn, run_id, items, rows):
+    """Write alerts and the items that produced them in one transaction."""
+    with conn.cursor() as cur:
+        _write_alerts(cur, run_id, items, rows)
+    conn.commit()
+
+def run_root_workflow(portfolio_id=None, workers=None, key=None):
     """Root runner: if an external ROMA framework is installed and exposes a
     `run_workflow` callable, delegate the work to it. Otherwise, run the
     local/fallback implementation (the previous behavior).
+
+    With more than one worker (``WORKFLOW_WORKERS`` by default) the local
+    pipeline runs tickers in parallel; reports are still written by this
+    thread alone.
+
+    The local run is checkpointed under ``key`` (default: scope and day, see
+    roma/runs.py). Running again with the same key skips tickers whose
+    alerts were already written and retries the rest. Errors are recorded
+    on the run and re-raised.
     """
     # If a ROMA framework is installed and exposes a run_workflow entrypoint,
     # delegate to it. This avoids hardcoding ROMA internals here and keeps the
@@ -27,34 +135,217 @@ def run_root_workflow(portfolio_id=None):
             except Exception as e:
                 print('ROMA run_workflow failed; falling back to local workflow:', e)
 
-    # Local fallback implementation
-    conn = get_db_connection()
+    # Local fallback implementation. The pooled connection is only held
+    # while reading holdings and while writing checkpoints, never across
+    # the downloads, searches and fits in between.
+    stats = {
+        'run_id': None, 'tickers': 0, 'skipped': 0, 'alerts': 0, 'failed': 0, 'lease_seconds': 0.0,
+        'prefetch_ms': 0, 'sentiment_ms': 0, 'write_ms': 0,
+    }
+    started = time.monotonic()
+    failure = None
+    close = True
     try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            if portfolio_id:
-                cur.execute("SELECT * FROM holdings WHERE portfolio_id = %s", (portfolio_id,))
+        with _leased_connection(stats) as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                holdings = select_holdings(cur, portfolio_id)
+            # Analyse each distinct ticker once, then fan the report out to
+            # every portfolio that holds it.
+            groups = group_holdings_by_ticker(holdings)
+            with conn.cursor() as cur:
+                stats['run_id'], done = start_run(cur, key or run_key(portfolio_id), portfolio_id, list(groups))
+            conn.commit()
+
+        todo = [ticker for ticker in groups if ticker not in done]
+        # A run with nothing left was finished earlier; keep its record.
+        close = bool(todo) or not groups
+        stats['tickers'] = len(groups)
+        stats['skipped'] = len(groups) - len(todo)
+        timings = {}
+        if todo:
+            stage = time.monotonic()
+            price_agent.prefetch(todo, period='180d')
+            stats['prefetch_ms'] = _elapsed_ms(stage)
+        workers = WORKFLOW_WORKERS if workers is None else workers
+        if not todo:
+            reports = iter(())
+        elif workers > 1:
+            reports = iter_reports_parallel(todo, fetch_inputs, synth.synthesize, workers, timings=timings)
+        else:
+            # Searches are I/O bound, so run them concurrently up front.
+            stage = time.monotonic()
+            sentiments = dict(sent_agent.scrape_many(todo))
+            stats['sentiment_ms'] = _elapsed_ms(stage)
+
+            def analyze(ticker):
+                timing = timings.setdefault(ticker, {})
+                try:
+                    return analyze_ticker(ticker, sentiments.get(ticker), timing)
+                except Exception as e:
+                    print(f"Workflow failed for {ticker}: {e}")
+                    timing['error'] = str(e)
+                    return None
+
+            reports = ((ticker, analyze(ticker)) for ticker in todo)
+
+        items, rows = [], []
+
+        def flush():
+            stage = time.monotonic()
+            with _leased_connection(stats) as conn:
+                _checkpoint(conn, stats['run_id'], items, rows)
+            stats['write_ms'] += _elapsed_ms(stage)
+            stats['alerts'] += len(rows)
+            items.clear()
+            rows.clear()
+
+        for ticker, report in reports:
+            item = {'ticker': ticker, 'status': 'done', **timings.pop(ticker, {})}
+            if report is None:
+                stats['failed'] += 1
+                item.update(status='failed', error=item.get('error') or 'no report')
             else:
-                cur.execute("SELECT * FROM holdings")
-            holdings = cur.fetchall()
-
-            for h in holdings:
-                ticker = h['ticker']
-                price_df = price_agent.fetch(ticker, period='180d')
-                sentiment = sent_agent.scrape(ticker)  # searches for the ticker symbol/term
-                forecast = forecast_agent.forecast(price_df, periods=3)
-                report = synth.synthesize(ticker, price_df, sentiment, forecast)
-                
-                # store alert
-                cur.execute(
-                    "INSERT INTO alerts (portfolio_id, message) VALUES (%s, %s)",
-                    (h['portfolio_id'], report)
-                )
+                item['alerts'] = len(groups[ticker])
+                rows.extend((pid, report) for pid in groups[ticker])
+            items.append(item)
+            if len(items) >= WORKFLOW_CHECKPOINT_ITEMS or len(rows) >= ALERT_BATCH_SIZE:
+                flush()
+        if items:
+            flush()
+    except Exception as e:
+        failure = e
+        print(f"Workflow error: {e}")
+
+    stats['seconds'] = time.monotonic() - started
+    stats['duration_ms'] = int(stats['seconds'] * 1000)
+    if stats['run_id'] is not None and close:
+        try:
+            with _leased_connection(stats) as conn:
+                with conn.cursor() as cur:
+                    finish_run(cur, stats['run_id'], stats, None if failure is None else str(failure))
                 conn.commit()
-                
+        except Exception as e:
+            print(f"Could not record workflow run {stats['run_id']}: {e}")
+    last_run.clear()
+    last_run.update(stats)
+    print(
+        f"[Workflow] run {stats['run_id']}: {stats['tickers']} tickers ({stats['skipped']} already done, "
+        f"{stats['failed']} failed), {stats['alerts']} alerts in {stats['seconds']:.1f}s; "
+        f"connection leased {stats['lease_seconds']:.2f}s"
+    )
+    if failure is not None:
+        raise failure
+    return True
+
+
+# Queue job kind handled by ``run_ticker_job`` (see worker.py).
+WORKFLOW_JOB = 'workflow_ticker'
+
+def enqueue_workflow(portfolio_id=None):
+    """Queue one job per distinct held ticker and return the new job ids.
+
+    The jobs belong to the day's checkpointed run (roma/runs.py): tickers
+    already done in it are not queued, and a ticker that already has an
+    unfinished job for the same scope is not queued twice. The last job to
+    finish its item closes the run.
+    """
+    from jobs import enqueue_many
+
+    scope = portfolio_id or 'all'
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            groups = group_holdings_by_ticker(select_holdings(cur, portfolio_id))
+        with conn.cursor() as cur:
+            run_id, done = start_run(cur, run_key(portfolio_id), portfolio_id, list(groups))
+            todo = [ticker for ticker in groups if ticker not in done]
+            job_ids = enqueue_many(
+                cur, WORKFLOW_JOB,
+                [{'ticker': ticker, 'portfolio_id': portfolio_id, 'run_id': run_id} for ticker in todo],
+                [f'{WORKFLOW_JOB}:{scope}:{ticker}' for ticker in todo],
+            )
+            if not groups:
+                close_if_finished(cur, run_id)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        put_db_connection(conn)
+    return job_ids
+
+def _item_done(cur, run_id, ticker, lock=False):
+    cur.execute(
+        "SELECT status FROM workflow_items WHERE run_id = %s AND ticker = %s" + (" FOR UPDATE" if lock else ""),
+        (run_id, ticker)
+    )
+    row = cur.fetchone()
+    return row is not None and row[0] == 'done'
+
+def _record_failure(run_id, ticker, error):
+    """Mark the item failed (unless a duplicate delivery finished it) and maybe close the run."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            if not _item_done(cur, run_id, ticker, lock=True):
+                record_items(cur, run_id, [{'ticker': ticker, 'status': 'failed', 'error': str(error)}])
+                close_if_finished(cur, run_id)
+        conn.commit()
     except Exception as e:
         conn.rollback()
-        print(f"Workflow error: {e}")
+        print(f"Could not record failed item {ticker} of run {run_id}: {e}")
     finally:
         put_db_connection(conn)
 
-    return True
+def run_ticker_job(payload):
+    """Queue handler: analyse one ticker and alert the portfolios holding it.
+
+    Holders are looked up when the job runs, not when it was queued, and no
+    connection is held during the analysis. The alerts are committed with
+    the ticker's ``workflow_items`` row, so a retried or reclaimed job whose
+    alerts were already written does nothing. A failure is recorded on the
+    item and re-raised for the queue to retry; whichever job leaves no item
+    pending closes the run. Returns the alerts written.
+    """
+    ticker, run_id = payload['ticker'], payload['run_id']
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            done = _item_done(cur, run_id, ticker)
+        conn.commit()
+    finally:
+        put_db_connection(conn)
+    if done:
+        return 0
+
+    timings = {}
+    try:
+        report = analyze_ticker(ticker, timings=timings)
+    except Exception as e:
+        _record_failure(run_id, ticker, e)
+        raise
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            # Row lock: a duplicate delivery waits here, then sees 'done'.
+            if _item_done(cur, run_id, ticker, lock=True):
+                conn.commit()
+                return 0
+            query = "SELECT DISTINCT portfolio_id FROM holdings WHERE ticker = %s"
+            params = [ticker]
+            if payload.get('portfolio_id'):
+                query += " AND portfolio_id = %s"
+                params.append(payload['portfolio_id'])
+            cur.execute(query + " ORDER BY portfolio_id", tuple(params))
+            portfolio_ids = [row[0] for row in cur.fetchall()]
+            rows = [(pid, report) for pid in portfolio_ids]
+            _write_alerts(cur, run_id, [{'ticker': ticker, 'status': 'done', 'alerts': len(rows), **timings}], rows)
+            close_if_finished(cur, run_id)
+        conn.commit()
+        return len(rows)
+    except Exception as e:
+        conn.rollback()
+        _record_failure(run_id, ticker, e)
+        raise
+    finally:
+        put_db_connection(conn)
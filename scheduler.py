@@ -1,35 +1,117 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
-from datetime import datetime
+from datetime import datetime, time
+import atexit
 import os
 from dotenv import load_dotenv
-from roma.workflow import run_root_workflow
 
 load_dotenv()
 
 MARKET_HOUR = int(os.getenv('MARKET_CLOSE_HOUR', '16'))
 MARKET_MIN = int(os.getenv('MARKET_CLOSE_MINUTE', '30'))
+MARKET_OPEN_HOUR = int(os.getenv('MARKET_OPEN_HOUR', '9'))
+MARKET_OPEN_MIN = int(os.getenv('MARKET_OPEN_MINUTE', '30'))
+# Minutes between intraday holdings price refreshes (0 disables the job).
+INTRADAY_REFRESH_MINUTES = int(os.getenv('INTRADAY_REFRESH_MINUTES', '15'))
 
 _scheduler = None
+_elector = None
 
 def _job():
     # This runs at market close and triggers the ROMA workflow
     print(f"[Scheduler] Running ROMA workflow at {datetime.now()}")
+    from roma.workflow import run_root_workflow
+    from price_matrix import sync_matrix
+    from valuations import sync_portfolio_values
     try:
         run_root_workflow()
     except Exception as e:
         print('Error running workflow:', e)
+    try:
+        sync_matrix()
+    except Exception as e:
+        print('Error syncing price matrix:', e)
+    try:
+        sync_portfolio_values()
+    except Exception as e:
+        print('Error updating portfolio values:', e)
+
+
+def in_market_hours(now):
+    """True on weekdays between the configured open and close times."""
+    if now.weekday() >= 5:
+        return False
+    return time(MARKET_OPEN_HOUR, MARKET_OPEN_MIN) <= now.time() <= time(MARKET_HOUR, MARKET_MIN)
+
+
+def _intraday_job():
+    # The cron trigger fires on whole hours; trim to the trading session.
+    if not in_market_hours(datetime.now()):
+        return
+    from price_refresh import refresh_all_prices
+    try:
+        refresh_all_prices()
+    except Exception as e:
+        print('Error refreshing prices:', e)
+
+
+def _daily_slot(now):
+    return now.replace(hour=MARKET_HOUR, minute=MARKET_MIN, second=0, microsecond=0)
+
+
+def intraday_step(minutes):
+    """Largest spacing up to ``minutes`` that divides the hour evenly (0 = off)."""
+    if minutes <= 0:
+        return 0
+    return max(d for d in (1, 2, 3, 4, 5, 6, 10, 12, 15, 20, 30, 60) if d <= minutes)
+
+
+def _intraday_slot(now):
+    step = intraday_step(INTRADAY_REFRESH_MINUTES)
+    return now.replace(minute=now.minute - now.minute % step, second=0, microsecond=0)
+
+
+def _leader_only(job_id, fn, slot):
+    # Every process schedules the jobs; only the lease holder runs a firing,
+    # and only once (see leader.py).
+    def run():
+        # Name the firing by its cron slot, not the start time, so a late or
+        # misfired start still dedupes against the same scheduled_runs row.
+        scheduled_for = slot(datetime.now().astimezone())
+        try:
+            _elector.run_once(job_id, scheduled_for, fn)
+        except Exception as e:
+            print(f"[Scheduler] {job_id} failed: {e}")
+    return run
 
 
 def start_scheduler(app=None):
-    global _scheduler
+    global _scheduler, _elector
     if _scheduler is not None:
         return _scheduler
+    from leader import LeaderElector
+    _elector = LeaderElector().start()
+    atexit.register(_elector.stop)
     scheduler = BackgroundScheduler()
     # Run every weekday at configured market close time
     trigger = CronTrigger(day_of_week='mon-fri', hour=MARKET_HOUR, minute=MARKET_MIN)
-    scheduler.add_job(_job, trigger, id='daily_roma')
+    scheduler.add_job(_leader_only('daily_roma', _job, _daily_slot), trigger, id='daily_roma')
+    step = intraday_step(INTRADAY_REFRESH_MINUTES)
+    if step != INTRADAY_REFRESH_MINUTES:
+        print(f"INTRADAY_REFRESH_MINUTES={INTRADAY_REFRESH_MINUTES} does not divide the hour; using {step}")
+    if step > 0:
+        intraday = CronTrigger(
+            day_of_week='mon-fri', hour=f'{MARKET_OPEN_HOUR}-{MARKET_HOUR}',
+            minute=','.join(str(m) for m in range(0, 60, step))
+        )
+        # A slow run is skipped over rather than stacked.
+        scheduler.add_job(
+            _leader_only('intraday_prices', _intraday_job, _intraday_slot), intraday,
+            id='intraday_prices', max_instances=1, coalesce=True
+        )
     scheduler.start()
     _scheduler = scheduler
-    print(f"Scheduler started: daily ROMA job at {MARKET_HOUR}:{MARKET_MIN}")
+    print(f"Scheduler started: daily ROMA job at {MARKET_HOUR}:{MARKET_MIN} (runs in the lease holder only)")
+    if step > 0:
+        print(f"Scheduler started: intraday price refresh every {step} min in market hours")
     return scheduler
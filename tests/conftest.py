@@ -0,0 +1,88 @@
+"""Shared test doubles: an in-memory stand-in for a psycopg2 connection."""
+
+import pytest
+
+
+class FakeCursor:
+    """Records each statement and answers it from its connection.
+
+    ``query`` is the last statement with whitespace collapsed, for asserting
+    on SQL text.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.result = []
+        self.rowcount = 0
+        self.query = self.params = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.conn.executed.append((query, params))
+        self.query, self.params = ' '.join(query.split()), params
+        if self.conn.error is not None:
+            raise self.conn.error
+        result = self.conn.respond(query, params) if self.conn.respond else self.conn.rows
+        self.result = list(result or [])
+        self.rowcount = len(self.result)
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+
+class FakeConn:
+    """Answers every query with ``rows``, or with ``respond(query, params)`` if given.
+
+    Setting ``error`` makes every ``execute`` raise it. ``inserted`` is where
+    tests that replace ``execute_values`` collect the rows.
+    """
+
+    autocommit = False
+
+    def __init__(self, rows=(), respond=None):
+        self.rows = list(rows)
+        self.respond = respond
+        self.error = None
+        self.executed = []
+        self.inserted = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.closed = 0
+
+    @property
+    def queries(self):
+        return [query for query, _ in self.executed]
+
+    def cursor(self, cursor_factory=None):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture
+def fake_conn():
+    """``fake_conn(rows)`` or ``fake_conn(respond=fn)`` builds a FakeConn."""
+    return FakeConn
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Route ``module``'s get/put_db_connection to one FakeConn and return it."""
+    def use(module, rows=(), respond=None):
+        conn = FakeConn(rows, respond)
+        monkeypatch.setattr(module, 'get_db_connection', lambda: conn)
+        monkeypatch.setattr(module, 'put_db_connection', lambda c: None)
+        return conn
+    return use
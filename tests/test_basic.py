@@ -2,7 +2,7 @@ from roma.agents import PriceAgent
 import pandas as pd
 
 def test_price_fetch(monkeypatch):
-    def fake_download(ticker, period, interval, progress):
+    def fake_download(ticker, period, interval, progress, **kwargs):
         return pd.DataFrame({
             'Date': pd.to_datetime(['2026-05-28', '2026-05-29']),
             'Close': [100.0, 101.5],
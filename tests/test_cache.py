@@ -0,0 +1,50 @@
+from cache import TTLCache, FileBackend
+
+
+def test_ttl_and_lru_eviction(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('cache.time.time', lambda: now[0])
+    c = TTLCache(max_entries=2, max_bytes=10_000)
+    c.set('a', 1, ttl=10)
+    c.set('b', 2, ttl=100)
+    assert c.get('a') == 1          # 'a' becomes most recently used
+    c.set('c', 3, ttl=100)          # evicts 'b'
+    assert c.get('b') is None
+    now[0] += 50                    # 'a' expires
+    assert c.get('a') is None
+    assert c.get('c') == 3
+    stats = c.stats()
+    assert stats['evictions'] == 1
+    assert stats['hits'] == 2 and stats['misses'] == 2
+
+
+def test_file_backend_shared_between_caches(tmp_path):
+    first = TTLCache(backend=FileBackend(str(tmp_path)))
+    second = TTLCache(backend=FileBackend(str(tmp_path)))
+    first.set('quote:AAPL', 190.5, ttl=60)
+    assert second.get('quote:AAPL') == 190.5
+    assert second.stats()['backend_hits'] == 1
+
+
+def test_file_backend_round_trips_frames_without_pickle(tmp_path):
+    import pandas as pd
+
+    df = pd.DataFrame({'ds': pd.to_datetime(['2026-10-01', '2026-10-02']), 'y': [1.5, 2.5]})
+    TTLCache(backend=FileBackend(str(tmp_path))).set('history:AAPL:7d:1d', df, ttl=60)
+    stored = TTLCache(backend=FileBackend(str(tmp_path))).get('history:AAPL:7d:1d')
+    assert list(stored['ds']) == list(df['ds']) and list(stored['y']) == [1.5, 2.5]
+    assert all(not open(p, 'rb').read().startswith(b'\x80') for p in tmp_path.iterdir())
+
+
+def test_file_backend_only_uses_a_private_directory(tmp_path, monkeypatch):
+    import os
+    import pytest
+
+    shared = tmp_path / 'shared'
+    shared.mkdir()
+    os.chmod(shared, 0o777)
+    assert os.stat(FileBackend(str(shared)).directory).st_mode & 0o777 == 0o700
+
+    monkeypatch.setattr(os, 'getuid', lambda: os.stat(shared).st_uid + 1)
+    with pytest.raises(PermissionError):
+        FileBackend(str(shared))
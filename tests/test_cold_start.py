@@ -0,0 +1,12 @@
+import subprocess
+import sys
+
+
+def test_importing_app_skips_heavy_dependencies():
+    code = (
+        "import sys, app; "
+        "print(','.join(m for m in ('yfinance', 'pandas', 'prophet', 'vaderSentiment', 'apscheduler') "
+        "if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ''
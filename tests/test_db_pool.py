@@ -0,0 +1,71 @@
+import threading
+import time
+
+import psycopg2
+import pytest
+
+import db
+
+
+class FakeThreadedPool:
+    connect = None  # set to the fake_conn factory by make_pool
+
+    def __init__(self, minconn, maxconn, dsn, **kwargs):
+        self._pool = []
+        self.opened = []
+
+    def getconn(self):
+        if self._pool:
+            return self._pool.pop()
+        conn = self.connect()
+        self.opened.append(conn)
+        return conn
+
+    def putconn(self, conn, close=False):
+        if close:
+            conn.closed = 1
+        else:
+            self._pool.append(conn)
+
+
+@pytest.fixture
+def make_pool(monkeypatch, fake_conn):
+    monkeypatch.setattr(FakeThreadedPool, 'connect', staticmethod(fake_conn))
+    monkeypatch.setattr(db.pool, 'ThreadedConnectionPool', FakeThreadedPool)
+    return lambda **kw: db.ConnectionPool(1, kw.pop('maxconn', 2), 'postgresql://x/y', **kw)
+
+
+def test_exhausted_pool_times_out(make_pool):
+    p = make_pool(maxconn=1, timeout=0.05)
+    p.getconn()
+    with pytest.raises(db.PoolTimeout):
+        p.getconn()
+    stats = p.stats()
+    assert stats['in_use'] == 1 and stats['timeouts'] == 1 and stats['failures'] == 1
+
+
+def test_waiter_gets_released_connection(make_pool):
+    p = make_pool(maxconn=1, timeout=2)
+    conn = p.getconn()
+    threading.Timer(0.05, p.putconn, (conn,)).start()
+    assert p.getconn() is conn
+    assert p.stats()['max_wait_seconds'] > 0
+
+
+def test_idle_dead_connection_is_replaced(make_pool):
+    p = make_pool(ping_after=0)
+    conn = p.getconn()
+    p.putconn(conn)
+    conn.error = psycopg2.OperationalError("server closed the connection")
+    fresh = p.getconn()
+    assert fresh is not conn and conn.closed
+    assert p.stats()['discarded'] == 1
+
+
+def test_old_connection_is_recycled_on_return(make_pool):
+    p = make_pool(max_age=0.01)
+    conn = p.getconn()
+    time.sleep(0.02)
+    p.putconn(conn)
+    assert conn.closed
+    assert p.stats()['in_use'] == 0
@@ -0,0 +1,81 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+import exports
+
+CREATED = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def export_db(monkeypatch, fake_conn):
+    """Serve ``rows`` in keyset pages like the real query would (no date filters)."""
+    def use(rows):
+        def respond(query, params):
+            page = [r for r in rows if r[0] > params[1]] if 'r.created_at, r.id) >' in query else rows
+            return page[:params[-1]]
+
+        conn = fake_conn(respond=respond)
+        conn.leased = 0
+        released = []
+
+        def lease():
+            conn.leased += 1
+            return conn
+
+        def release(c):
+            conn.leased -= 1
+            released.append(c)
+
+        monkeypatch.setattr(exports, 'get_db_connection', lease)
+        monkeypatch.setattr(exports, 'put_db_connection', release)
+        return conn, released
+    return use
+
+
+def test_csv_streams_in_keyset_pages(export_db):
+    rows = [(i, 1, 'Main', f'report {i}', False, CREATED) for i in range(5)]
+    conn, released = export_db(rows)
+
+    chunks = []
+    for chunk in exports.stream_export('alerts', 'csv', 42, itersize=2, portfolio_id=1):
+        # No connection is held while the client consumes a chunk.
+        assert conn.leased == 0
+        chunks.append(chunk)
+
+    assert [params for _, params in conn.executed] == [
+        (2, 42, 1, 2), (CREATED, 1, 2, 42, 1, 2), (CREATED, 3, 2, 42, 1, 2),
+    ]
+    assert chunks[0] == 'id,portfolio_id,portfolio_name,message,is_read,created_at\r\n'
+    assert len(chunks) == 4
+    assert chunks[1].splitlines()[0] == '0,1,Main,report 0,False,2026-03-01T12:00:00+00:00'
+    assert chunks[3].splitlines() == ['4,1,Main,report 4,False,2026-03-01T12:00:00+00:00']
+    assert len(released) == 3
+
+
+def test_ndjson_rows_are_objects(export_db):
+    row = (7, 3, 1, 'Main', 'AAPL', 'add', 2.0, 5.0, 100.0, 300.0, 500.0, CREATED)
+    export_db([row])
+    lines = ''.join(exports.stream_export('snapshots', 'ndjson', 42)).splitlines()
+    assert json.loads(lines[0])['ticker'] == 'AAPL'
+    assert json.loads(lines[0])['created_at'] == '2026-03-01T12:00:00+00:00'
+
+
+def test_abandoned_stream_holds_no_connection(export_db):
+    conn, released = export_db([(i, 1, 'Main', 'r', False, CREATED) for i in range(10)])
+    stream = exports.stream_export('alerts', 'csv', 42, itersize=2)
+    next(stream)
+    next(stream)
+    stream.close()
+    assert conn.leased == 0 and len(released) == 1
+
+
+def test_each_portfolio_is_paged_along_its_index():
+    _, query, params = exports.build_query(
+        'snapshots', 42, created_from=CREATED, after=(CREATED, 9), limit=100
+    )
+    inner = query[query.index('CROSS JOIN LATERAL'):query.index(') r\n')]
+    assert 'r.portfolio_id = p.id AND r.created_at >= %s AND (r.created_at, r.id) > (%s, %s)' in inner
+    assert inner.rstrip().endswith('ORDER BY r.created_at, r.id LIMIT %s')
+    assert params == (CREATED, CREATED, 9, 100, 42, 100)
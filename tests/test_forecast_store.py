@@ -0,0 +1,76 @@
+import pandas as pd
+from roma.forecast_store import ForecastStore
+
+
+def _series(n):
+    return pd.DataFrame({
+        'ds': pd.date_range('2026-01-01', periods=n, freq='D'),
+        'y': [100.0 + i for i in range(n)],
+    })
+
+
+def test_forecast_reused_until_series_changes(tmp_path):
+    store = ForecastStore(str(tmp_path))
+    df = _series(30)
+    fcst = pd.DataFrame({'ds': pd.date_range('2026-01-31', periods=3), 'yhat': [1.0, 2.0, 3.0]})
+    store.put('AAPL', df, 3, {}, fcst, init={'k': 0.1})
+
+    assert store.get('AAPL', df, 3, {}).equals(fcst)
+    assert store.get('AAPL', df, 5, {}) is None
+    assert store.get('AAPL', df, 3, {'weekly_seasonality': False}) is None
+
+    revised = df.copy()
+    revised.loc[10, 'y'] = 0.0
+    assert store.get('AAPL', revised, 3, {}) is None
+
+
+def test_warm_start_only_after_one_new_bar(tmp_path):
+    store = ForecastStore(str(tmp_path))
+    df = _series(30)
+    store.put('AAPL', df, 3, {}, pd.DataFrame(), init={'k': 0.1})
+
+    assert store.warm_start('AAPL', _series(31), 3, {}) == {'k': 0.1}
+    assert store.warm_start('AAPL', _series(32), 3, {}) is None
+
+
+def test_warm_start_follows_a_rolling_window(tmp_path):
+    store = ForecastStore(str(tmp_path))
+    full = _series(31)
+    store.put('AAPL', full.iloc[:30], 3, {}, pd.DataFrame(), init={'k': 0.1})
+
+    # Next day: one bar appended at the tail, the oldest dropped from the head.
+    assert store.warm_start('AAPL', full.iloc[1:], 3, {}) == {'k': 0.1}
+    revised = full.iloc[1:].copy()
+    revised.loc[5, 'y'] = 0.0
+    assert store.warm_start('AAPL', revised, 3, {}) is None
+
+
+def test_prune_removes_old_entries(tmp_path):
+    import os
+
+    store = ForecastStore(str(tmp_path), max_age_days=1)
+    store.put('AAPL', _series(30), 3, {}, pd.DataFrame())
+    store.put('MSFT', _series(20), 3, {}, pd.DataFrame())
+    old = store._path('AAPL', _series(30)['ds'].iloc[-1], 3, {})
+    os.utime(old, (0, 0))
+
+    assert store.prune() == 1
+    assert not os.path.exists(old)
+    assert store.get('MSFT', _series(20), 3, {}) is not None
+
+
+def test_entries_are_json_in_a_private_directory(tmp_path):
+    import json
+    import os
+
+    import numpy as np
+
+    store = ForecastStore(str(tmp_path / 'forecasts'))
+    store.put('AAPL', _series(30), 3, {}, pd.DataFrame(), init={'k': np.float64(0.1), 'delta': np.array([0.5, 0.25])})
+
+    assert os.stat(store.directory).st_mode & 0o777 == 0o700
+    [name] = os.listdir(store.directory)
+    with open(os.path.join(store.directory, name)) as f:
+        json.load(f)
+    init = store.warm_start('AAPL', _series(31), 3, {})
+    assert init['k'] == 0.1 and list(init['delta']) == [0.5, 0.25]
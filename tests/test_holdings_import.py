@@ -0,0 +1,54 @@
+import io
+
+import pytest
+
+import holdings_import as hi
+
+
+def rows(text):
+    return list(hi.parse_rows(io.StringIO(text)))
+
+
+def test_parse_accepts_broker_headers_and_flags_bad_rows():
+    result = rows("Symbol,Description,Quantity\n"
+                  "aapl,Apple,\"1,200\"\n"
+                  ",,\n"
+                  "MSFT,Microsoft,-3\n"
+                  "BAD TICKER,x,5\n"
+                  "NVDA,Nvidia,abc\n")
+    assert [(r['line'], r['ticker'], r['shares'], r['status']) for r in result] == [
+        (2, 'AAPL', 1200.0, 'ok'),
+        (4, 'MSFT', None, 'invalid'),
+        (5, 'BAD TICKER', None, 'invalid'),
+        (6, 'NVDA', None, 'invalid'),
+    ]
+
+
+def test_parse_requires_ticker_and_shares_columns():
+    with pytest.raises(hi.CSVImportError):
+        rows("name,amount\nAAPL,3\n")
+
+
+def test_import_prices_once_and_merges_repeated_tickers(monkeypatch, fake_db):
+    conn = fake_db(hi)
+    fetched, written = [], []
+
+    def write(cur, portfolio_id, deltas, prices):
+        written.append((portfolio_id, deltas))
+        return {t: (i + 1, shares) for i, (t, shares) in enumerate(deltas.items())}
+
+    monkeypatch.setattr(hi, 'write_holdings', write)
+
+    def fetch(tickers):
+        fetched.append(tickers)
+        return {'AAPL': 10.0}, ['TSLA']
+
+    result = hi.import_holdings(9, io.StringIO("ticker,shares\nAAPL,1\nTSLA,2\naapl,3\nX Y,1\n"),
+                                fetch_prices=fetch)
+
+    assert fetched == [['AAPL', 'TSLA']]
+    assert written == [(9, {'AAPL': 4.0, 'TSLA': 2.0})]
+    assert conn.commits == 1
+    assert [r['status'] for r in result] == ['imported', 'imported', 'imported', 'invalid']
+    assert result[1]['price'] is None and result[1]['message']
+    assert hi.summarize(result) == {'imported': 3, 'invalid': 1}
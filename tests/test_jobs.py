@@ -0,0 +1,155 @@
+import pytest
+
+import roma.runs as runs
+import roma.workflow as wf
+import worker
+
+
+def make_worker(monkeypatch, claimed, handlers):
+    calls = []
+
+    def in_transaction(fn, *args):
+        calls.append((fn.__name__,) + args)
+        if fn is worker.claim:
+            return claimed.pop(0) if claimed else []
+        if fn is worker.fail:
+            return 'queued'
+        return True
+
+    monkeypatch.setattr(worker, '_in_transaction', in_transaction)
+    return worker.Worker(handlers, concurrency=1, visibility_timeout=60, worker_id='w'), calls
+
+
+def test_run_one_completes_a_successful_job(monkeypatch):
+    seen = []
+    w, calls = make_worker(monkeypatch, [[(7, 'echo', {'x': 1}, 1)]], {'echo': seen.append})
+    assert w.run_one('w/0') is True
+    assert seen == [{'x': 1}]
+    assert calls == [('claim', 'w/0', 1, 60), ('complete', 7, 'w/0')]
+
+
+def test_run_one_records_failures_and_unknown_kinds(monkeypatch):
+    def boom(payload):
+        raise RuntimeError('upstream down')
+
+    w, calls = make_worker(monkeypatch, [[(1, 'boom', {}, 2)], [(2, 'nope', {}, 1)]], {'boom': boom})
+    assert w.run_one('w/0') and w.run_one('w/0')
+    failed = [c for c in calls if c[0] == 'fail']
+    assert [(c[1], str(c[3])) for c in failed] == [(1, 'upstream down'), (2, "No handler for job kind 'nope'")]
+    assert not any(c[0] == 'complete' for c in calls)
+
+
+def test_drain_stops_when_the_queue_is_empty(monkeypatch):
+    seen = []
+    jobs = [[(i, 'echo', {'n': i}, 1)] for i in range(3)]
+    w, _ = make_worker(monkeypatch, jobs, {'echo': seen.append})
+    w.run(drain=True)
+    assert seen == [{'n': 0}, {'n': 1}, {'n': 2}]
+
+
+def ticker_job_db(fake_db, rows, status=None):
+    """FakeConn answering the ticker job's workflow_items / workflow_runs / holdings queries."""
+    status = {'AAPL': 'pending'} if status is None else status
+
+    def respond(query, params):
+        if 'SELECT status FROM workflow_items' in query:
+            return [(status[params[1]],)] if params[1] in status else []
+        if 'FROM workflow_runs' in query:
+            return [(0,)]
+        if 'COUNT(*)' in query:
+            return [(len(status), sum(s == 'pending' for s in status.values()))]
+        return rows
+
+    conn = fake_db(wf, respond=respond)
+    conn.status, conn.items, conn.closed = status, [], []
+    return conn
+
+
+def test_enqueue_workflow_queues_one_job_per_pending_ticker(monkeypatch, fake_db):
+    import jobs
+
+    fake_db(wf, [
+        {'ticker': 'AAPL', 'portfolio_id': 1},
+        {'ticker': 'AAPL', 'portfolio_id': 2},
+        {'ticker': 'MSFT', 'portfolio_id': 1},
+        {'ticker': 'TSLA', 'portfolio_id': 2},
+    ])
+    queued = []
+    monkeypatch.setattr(wf, 'start_run', lambda cur, key, pid, tickers: (9, {'TSLA'}))
+    monkeypatch.setattr(jobs, 'enqueue_many', lambda cur, kind, payloads, keys: queued.append((kind, payloads, keys)) or [1, 2])
+
+    assert wf.enqueue_workflow() == [1, 2]
+    assert queued == [(
+        wf.WORKFLOW_JOB,
+        [{'ticker': 'AAPL', 'portfolio_id': None, 'run_id': 9}, {'ticker': 'MSFT', 'portfolio_id': None, 'run_id': 9}],
+        ['workflow_ticker:all:AAPL', 'workflow_ticker:all:MSFT'],
+    )]
+
+
+def _patch_ticker_job(monkeypatch, conn, analysed):
+    monkeypatch.setattr(wf, 'analyze_ticker', lambda t, timings=None: analysed.append(t) or f'report {t}')
+    monkeypatch.setattr(wf, 'execute_values', lambda cur, query, rows, page_size=None: cur.conn.inserted.extend(rows))
+
+    def record_items(cur, run_id, items):
+        cur.conn.items.extend(items)
+        cur.conn.status.update((i['ticker'], i['status']) for i in items)
+
+    monkeypatch.setattr(wf, 'record_items', record_items)
+    monkeypatch.setattr(runs, 'finish_run', lambda cur, run_id, stats, error=None: cur.conn.closed.append(stats))
+
+
+def test_ticker_job_alerts_current_holders_with_its_checkpoint(monkeypatch, fake_db):
+    conn, analysed = ticker_job_db(fake_db, [(1,), (3,)]), []
+    _patch_ticker_job(monkeypatch, conn, analysed)
+
+    assert wf.run_ticker_job({'ticker': 'AAPL', 'portfolio_id': None, 'run_id': 9}) == 2
+    assert conn.inserted == [(1, 'report AAPL'), (3, 'report AAPL')]
+    assert [(i['ticker'], i['status'], i['alerts']) for i in conn.items] == [('AAPL', 'done', 2)]
+
+
+def test_redelivered_ticker_job_writes_nothing(monkeypatch, fake_db):
+    conn, analysed = ticker_job_db(fake_db, [(1,)], {'AAPL': 'done'}), []
+    _patch_ticker_job(monkeypatch, conn, analysed)
+
+    assert wf.run_ticker_job({'ticker': 'AAPL', 'portfolio_id': None, 'run_id': 9}) == 0
+    assert analysed == [] and conn.inserted == [] and conn.items == []
+
+
+def test_the_job_that_finishes_the_last_item_closes_the_run(monkeypatch, fake_db):
+    conn, analysed = ticker_job_db(fake_db, [(1,)], {'AAPL': 'pending', 'MSFT': 'pending'}), []
+    _patch_ticker_job(monkeypatch, conn, analysed)
+
+    wf.run_ticker_job({'ticker': 'AAPL', 'portfolio_id': None, 'run_id': 9})
+    assert conn.closed == []
+    wf.run_ticker_job({'ticker': 'MSFT', 'portfolio_id': None, 'run_id': 9})
+    assert conn.closed == [{'tickers': 2, 'duration_ms': 0}]
+
+
+def test_failed_ticker_job_is_recorded_on_its_item(monkeypatch, fake_db):
+    conn, analysed = ticker_job_db(fake_db, [(1,)], {'AAPL': 'pending', 'MSFT': 'done'}), []
+    _patch_ticker_job(monkeypatch, conn, analysed)
+
+    def boom(ticker, timings=None):
+        raise RuntimeError('no prices')
+
+    monkeypatch.setattr(wf, 'analyze_ticker', boom)
+    with pytest.raises(RuntimeError):
+        wf.run_ticker_job({'ticker': 'AAPL', 'portfolio_id': None, 'run_id': 9})
+    assert conn.items == [{'ticker': 'AAPL', 'status': 'failed', 'error': 'no prices'}]
+    assert conn.closed == [{'tickers': 2, 'duration_ms': 0}]
+
+
+@pytest.mark.parametrize('done, reopened', [({'AAPL', 'MSFT'}, False), ({'AAPL'}, True)])
+def test_start_run_only_reopens_a_run_with_work_left(monkeypatch, fake_conn, done, reopened):
+    def respond(query, params):
+        if 'RETURNING id' in query:
+            return []  # the run already exists
+        if 'SELECT id FROM workflow_runs' in query:
+            return [(5,)]
+        return [(t,) for t in done]
+
+    monkeypatch.setattr(runs, 'execute_values', lambda cur, query, rows, page_size=None: None)
+    conn = fake_conn(respond=respond)
+
+    assert runs.start_run(conn.cursor(), 'all:2026-10-14', None, ['AAPL', 'MSFT']) == (5, done)
+    assert any(q.split()[0] == 'UPDATE' for q in conn.queries) is reopened
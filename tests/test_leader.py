@@ -0,0 +1,124 @@
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+
+import leader
+
+
+@pytest.fixture
+def db(monkeypatch, fake_conn):
+    """In-memory stand-in for the lease and scheduled_runs tables."""
+    state = {'lease': None, 'runs': {}}
+
+    @contextmanager
+    def db_connection():
+        yield fake_conn()
+
+    def acquire(cur, name, holder, ttl=None):
+        if state['lease'] in (None, holder):
+            state['lease'] = holder
+        return state['lease'] == holder
+
+    def claim_run(cur, job_id, scheduled_for, holder, ttl=None):
+        return state['runs'].setdefault((job_id, scheduled_for), holder) == holder
+
+    def finish_run(cur, job_id, scheduled_for, holder, error=None):
+        state.setdefault('finished', []).append((job_id, error))
+
+    monkeypatch.setattr(leader, 'db_connection', db_connection)
+    monkeypatch.setattr(leader, 'acquire', acquire)
+    monkeypatch.setattr(leader, 'claim_run', claim_run)
+    monkeypatch.setattr(leader, 'finish_run', finish_run)
+    monkeypatch.setattr(leader, 'release', lambda cur, name, holder: state.update(lease=None))
+    return state
+
+
+def test_only_the_leader_runs_a_firing(db):
+    a, b = leader.LeaderElector(holder='a'), leader.LeaderElector(holder='b')
+    ran = []
+    at = datetime(2026, 10, 14, 16, 30)
+    assert a.run_once('daily_roma', at, lambda: ran.append('a'))
+    assert not b.run_once('daily_roma', at, lambda: ran.append('b'))
+    assert ran == ['a'] and db['finished'] == [('daily_roma', None)]
+
+
+def test_firing_is_not_repeated_after_hand_over(db):
+    a, b = leader.LeaderElector(holder='a'), leader.LeaderElector(holder='b')
+    ran = []
+    at = datetime(2026, 10, 14, 16, 30)
+    a.run_once('daily_roma', at, lambda: ran.append('a'))
+    a.stop()
+    assert not a.is_leader
+    # b takes over but the firing a already ran is claimed.
+    assert not b.run_once('daily_roma', at, lambda: ran.append('b'))
+    assert b.is_leader
+    assert b.run_once('daily_roma', datetime(2026, 10, 15, 16, 30), lambda: ran.append('b'))
+    assert ran == ['a', 'b']
+
+
+def test_failed_renewal_gives_up_leadership(db, monkeypatch):
+    a = leader.LeaderElector(holder='a')
+    assert a.renew()
+    monkeypatch.setattr(leader, 'acquire', lambda *args: (_ for _ in ()).throw(RuntimeError('db down')))
+    assert not a.renew() and not a.is_leader
+
+
+def test_errors_are_recorded_on_the_run(db):
+    a = leader.LeaderElector(holder='a')
+
+    def boom():
+        raise RuntimeError('workflow crashed')
+
+    with pytest.raises(RuntimeError):
+        a.run_once('daily_roma', datetime(2026, 10, 14, 16, 30), boom)
+    assert db['finished'] == [('daily_roma', 'workflow crashed')]
+
+
+def test_acquire_takes_only_own_or_expired_leases(fake_conn):
+    cur = fake_conn([('a',)]).cursor()
+    assert leader.acquire(cur, 'scheduler', 'a', ttl=60)
+    assert cur.params == ('scheduler', 'a', 60)
+    assert 'ON CONFLICT (name) DO UPDATE' in cur.query
+    assert ('WHERE scheduler_leases.holder = EXCLUDED.holder '
+            'OR scheduler_leases.expires_at < CURRENT_TIMESTAMP') in cur.query
+    assert cur.query.endswith('RETURNING holder')
+    # A live lease held by someone else updates no row.
+    assert not leader.acquire(fake_conn().cursor(), 'scheduler', 'b', ttl=60)
+
+
+def test_unfinished_claims_of_dead_leaders_are_taken_over(fake_conn):
+    cur = fake_conn([('daily_roma',)]).cursor()
+    at = datetime(2026, 10, 14, 16, 30)
+    assert leader.claim_run(cur, 'daily_roma', at, 'b', ttl=60)
+    assert cur.params == ('daily_roma', at, 'b', 60)
+    assert 'ON CONFLICT (job_id, scheduled_for) DO UPDATE' in cur.query
+    assert 'WHERE scheduled_runs.finished_at IS NULL' in cur.query
+    assert 'scheduled_runs.started_at < CURRENT_TIMESTAMP - make_interval(secs => %s)' in cur.query
+    assert ('NOT EXISTS ( SELECT 1 FROM scheduler_leases l WHERE l.holder = scheduled_runs.holder '
+            'AND l.expires_at > CURRENT_TIMESTAMP )') in cur.query
+    # A finished run, or a live claimant's, updates no row.
+    assert not leader.claim_run(fake_conn().cursor(), 'daily_roma', at, 'b', ttl=60)
+
+    leader.finish_run(cur, 'daily_roma', at, 'a')
+    assert cur.query.endswith('AND holder = %s') and cur.params == (None, 'daily_roma', at, 'a')
+
+
+def test_late_firings_keep_their_scheduled_slot(monkeypatch):
+    import scheduler
+
+    monkeypatch.setattr(scheduler, 'MARKET_HOUR', 16)
+    monkeypatch.setattr(scheduler, 'MARKET_MIN', 30)
+    monkeypatch.setattr(scheduler, 'INTRADAY_REFRESH_MINUTES', 15)
+    assert scheduler._daily_slot(datetime(2026, 10, 14, 16, 32, 7)) == datetime(2026, 10, 14, 16, 30)
+    assert scheduler._intraday_slot(datetime(2026, 10, 14, 10, 47, 30)) == datetime(2026, 10, 14, 10, 45)
+
+    claimed = []
+
+    class Elector:
+        def run_once(self, job_id, scheduled_for, fn):
+            claimed.append((job_id, scheduled_for))
+
+    monkeypatch.setattr(scheduler, '_elector', Elector())
+    scheduler._leader_only('daily_roma', lambda: None, scheduler._daily_slot)()
+    assert claimed[0][1].time().isoformat() == '16:30:00'
@@ -0,0 +1,33 @@
+import migrations
+
+
+def schema_at(fake_conn, version):
+    def respond(query, params):
+        if 'LIMIT 1' in query:
+            return [(version,)]
+        if query.startswith('SELECT version'):
+            return [(v,) for v, _, _ in migrations.available_migrations()]
+        return []
+    return fake_conn(respond=respond)
+
+
+def test_migrations_are_numbered_uniquely():
+    versions = [v for v, _, _ in migrations.available_migrations()]
+    assert versions == sorted(set(versions))
+    assert versions[0] == 1 and versions[-1] == migrations.LATEST_VERSION
+
+
+def test_current_schema_costs_one_query(monkeypatch, fake_conn):
+    conn = schema_at(fake_conn, migrations.LATEST_VERSION)
+    monkeypatch.setattr(migrations, 'migrate', lambda c: (_ for _ in ()).throw(AssertionError))
+    assert migrations.ensure_schema(conn) == []
+    assert len(conn.queries) == 1
+    assert conn.autocommit is False
+
+
+def test_lock_wait_is_not_subject_to_statement_timeout(fake_conn):
+    conn = schema_at(fake_conn, migrations.LATEST_VERSION)
+    assert migrations.migrate(conn) == []
+    timeout = next(i for i, q in enumerate(conn.queries) if 'statement_timeout' in q)
+    lock = next(i for i, q in enumerate(conn.queries) if 'pg_advisory_xact_lock' in q)
+    assert timeout < lock
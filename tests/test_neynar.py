@@ -0,0 +1,55 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from roma.neynar import NeynarClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    throttled = set()
+
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)['q'][0]
+        if query == 'SLOW' and query not in self.throttled:
+            self.throttled.add(query)
+            self.send_response(429)
+            self.send_header('Retry-After', '0')
+            self.end_headers()
+            return
+        body = json.dumps({'result': {'casts': [{'text': f'{query} to the moon'}]}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_search_many_against_stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = NeynarClient(api_key='test', url=f'http://127.0.0.1:{server.server_port}/search', concurrency=4)
+        results = dict(client.search_many(['AAPL', 'MSFT', 'SLOW', 'NVDA']))
+    finally:
+        server.shutdown()
+    assert sorted(results) == ['AAPL', 'MSFT', 'NVDA', 'SLOW']
+    assert results['SLOW'] == [{'text': 'SLOW to the moon'}]
+    assert 'SLOW' in StubHandler.throttled
+
+
+def test_search_since_handles_timestamps_without_offset(monkeypatch):
+    from datetime import datetime, timezone
+
+    from roma.neynar import cast_time
+
+    assert cast_time({'timestamp': '2026-06-02T10:00:00'}) == datetime(2026, 6, 2, 10, tzinfo=timezone.utc)
+
+    client = NeynarClient(api_key='test')
+    page = [{'timestamp': '2026-06-03T00:00:00'}, {'timestamp': '2026-05-30T00:00:00Z'}]
+    monkeypatch.setattr(client, 'search_page', lambda query, limit, cursor=None: (page, 'next'))
+    since = datetime(2026, 6, 1, tzinfo=timezone.utc)
+    assert client.search_since('AAPL', since) == page[:1]
@@ -0,0 +1,72 @@
+import numpy as np
+import price_matrix as pm
+
+
+def test_write_append_and_zero_copy_reads(tmp_path):
+    d = str(tmp_path)
+    days = np.array(['2026-06-01', '2026-06-02'], dtype='datetime64[D]')
+    pm.write_matrix(days, ['AAPL', 'MSFT', 'NVDA'], [[1, 2, 3], [4, 5, 6]], d)
+
+    before = pm.open_matrix(d)
+    pm.append_rows(np.array(['2026-06-03'], dtype='datetime64[D]'), [[7, 8, 9]], d)
+    after = pm.open_matrix(d)
+
+    assert len(before) == 2 and len(after) == 3
+    days_view, aapl = after.series('AAPL')
+    assert list(aapl) == [1, 4, 7]
+    assert isinstance(aapl.base, np.memmap) or isinstance(aapl, np.memmap)
+
+    _, block = after.slice(['MSFT', 'NVDA'], start='2026-06-02')
+    assert block.tolist() == [[5, 6], [8, 9]]
+    assert np.shares_memory(block, after.closes)
+
+    _, gathered = after.slice(['NVDA', 'AAPL'], end='2026-06-01')
+    assert gathered.tolist() == [[3, 1]]
+
+
+def test_torn_append_is_discarded(tmp_path):
+    d = str(tmp_path)
+    pm.write_matrix(np.array(['2026-06-01'], dtype='datetime64[D]'), ['AAPL'], [[1.0]], d)
+    meta = pm._read_meta(d)
+    with open(tmp_path / meta['data'], 'ab') as f:
+        f.write(b'\x00\x01\x02')  # half-written row from a crashed writer
+    assert len(pm.open_matrix(d)) == 1
+
+    pm.append_rows(np.array(['2026-06-02'], dtype='datetime64[D]'), [[2.0]], d)
+    assert list(pm.open_matrix(d).series('AAPL')[1]) == [1.0, 2.0]
+
+
+def _store(monkeypatch, bars):
+    """``close_matrix`` over an in-memory ``{(day, ticker): close}`` store."""
+    from datetime import date
+
+    import pandas as pd
+    import price_store
+
+    def close_matrix(tickers, start, end=None):
+        rows = [(d, t, c) for (d, t), c in bars.items() if d >= start and t in tickers]
+        frame = pd.DataFrame(rows, columns=['day', 'ticker', 'close'])
+        return frame.pivot(index='day', columns='ticker', values='close').sort_index().reindex(columns=tickers)
+
+    monkeypatch.setattr(price_store, 'close_matrix', close_matrix)
+    monkeypatch.setattr(price_store, 'period_start', lambda period: date(2026, 6, 1))
+
+
+def test_sync_appends_new_days_and_rebuilds_on_revisions(tmp_path, monkeypatch):
+    from datetime import date
+
+    d = str(tmp_path)
+    bars = {(date(2026, 6, day), t): float(day) for day in (1, 2) for t in ('AAPL', 'MSFT')}
+    _store(monkeypatch, bars)
+    assert pm.sync_matrix(['AAPL', 'MSFT'], d) == 2
+    generation = pm._read_meta(d)['generation']
+
+    bars[(date(2026, 6, 3), 'AAPL')] = bars[(date(2026, 6, 3), 'MSFT')] = 3.0
+    assert pm.sync_matrix(['AAPL'], d) == 1
+    assert pm._read_meta(d)['generation'] == generation
+    assert list(pm.open_matrix(d).series('MSFT')[1]) == [1.0, 2.0, 3.0]
+
+    bars[(date(2026, 6, 3), 'AAPL')] = 3.5  # today's bar re-downloaded
+    assert pm.sync_matrix(['AAPL'], d) == 3
+    assert pm._read_meta(d)['generation'] == generation + 1
+    assert list(pm.open_matrix(d).series('AAPL')[1]) == [1.0, 2.0, 3.5]
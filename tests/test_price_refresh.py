@@ -0,0 +1,49 @@
+from datetime import datetime
+
+import price_refresh
+import scheduler
+
+
+def test_refresh_updates_each_batch_and_records_the_run(monkeypatch):
+    fetched, written, recorded = [], [], []
+    monkeypatch.setattr(price_refresh, '_distinct_tickers', lambda: ['A', 'B', 'C', 'D', 'E'])
+
+    def fetch(batch, batch_size):
+        fetched.append(list(batch))
+        return {t: 1.0 for t in batch if t != 'C'}, [t for t in batch if t == 'C']
+
+    monkeypatch.setattr(price_refresh, 'fetch_last_prices', fetch)
+    monkeypatch.setattr(price_refresh, '_write_batch', lambda prices: written.append(prices) or 2 * len(prices))
+    monkeypatch.setattr(price_refresh, '_record_run', recorded.append)
+
+    stats = price_refresh.refresh_all_prices(batch_size=2)
+
+    assert fetched == [['A', 'B'], ['C', 'D'], ['E']]
+    assert [sorted(p) for p in written] == [['A', 'B'], ['D'], ['E']]
+    assert stats['batches'] == 3 and stats['priced'] == 4 and stats['rows_updated'] == 8
+    assert stats['failed'] == ['C'] and stats['error'] is None
+    assert recorded == [stats] and stats['duration_ms'] >= 0
+
+
+def test_failed_run_is_still_recorded(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(price_refresh, '_distinct_tickers', lambda: (_ for _ in ()).throw(RuntimeError('db down')))
+    monkeypatch.setattr(price_refresh, '_record_run', recorded.append)
+    assert price_refresh.refresh_all_prices()['error'] == 'db down'
+    assert len(recorded) == 1
+
+
+def test_market_hours_window():
+    assert scheduler.in_market_hours(datetime(2026, 10, 14, 10, 0))       # Wednesday
+    assert not scheduler.in_market_hours(datetime(2026, 10, 14, 9, 15))   # before open
+    assert not scheduler.in_market_hours(datetime(2026, 10, 14, 16, 45))  # after close
+    assert not scheduler.in_market_hours(datetime(2026, 10, 17, 11, 0))   # Saturday
+
+
+def test_intraday_spacing_divides_the_hour():
+    from apscheduler.triggers.cron import CronTrigger
+
+    assert [scheduler.intraday_step(m) for m in (0, 1, 7, 15, 25, 45, 60, 90)] == [0, 1, 6, 15, 20, 30, 60, 60]
+    for minutes in (7, 60, 90):
+        step = scheduler.intraday_step(minutes)
+        CronTrigger(minute=','.join(str(m) for m in range(0, 60, step)))  # accepted by APScheduler
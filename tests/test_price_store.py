@@ -0,0 +1,53 @@
+from datetime import date
+from price_store import _fetch_ranges, period_start
+
+TODAY = date(2026, 6, 10)
+
+
+def test_period_start():
+    assert period_start('180d', TODAY) == date(2025, 12, 12)
+    assert period_start('max', TODAY) is None
+
+
+def test_new_ticker_downloads_whole_window():
+    assert _fetch_ranges(None, [], date(2026, 1, 1), TODAY) == [(date(2026, 1, 1), TODAY)]
+
+
+def test_only_tail_and_gaps_are_fetched():
+    days = [date(2026, 6, 1), date(2026, 6, 2), date(2026, 6, 8), date(2026, 6, 9)]
+    coverage = (date(2026, 6, 1), date(2026, 6, 9), 86400.0, None)
+    assert _fetch_ranges(coverage, days, date(2026, 6, 1), TODAY) == [
+        (date(2026, 6, 9), TODAY),
+        (date(2026, 6, 2), date(2026, 6, 8)),
+    ]
+
+
+def test_recent_sync_skips_tail_but_backfills_head():
+    coverage = (date(2026, 6, 9), TODAY, 30.0, None)
+    assert _fetch_ranges(coverage, [date(2026, 6, 9), TODAY], date(2026, 5, 1), TODAY) == [
+        (date(2026, 5, 1), date(2026, 6, 9)),
+    ]
+
+
+def test_gaps_already_checked_are_not_refetched():
+    days = [date(2026, 5, 1), date(2026, 5, 20), date(2026, 6, 1), date(2026, 6, 8), date(2026, 6, 9)]
+    coverage = (date(2026, 5, 1), date(2026, 6, 9), 30.0, date(2026, 5, 20))
+    assert _fetch_ranges(coverage, days, date(2026, 5, 1), TODAY) == [
+        (date(2026, 6, 9), TODAY),
+        (date(2026, 5, 20), date(2026, 6, 1)),
+        (date(2026, 6, 1), date(2026, 6, 8)),
+    ]
+
+
+def test_fetch_skips_sync_right_after_prefetch(monkeypatch):
+    import roma.agents as agents
+
+    synced = []
+    monkeypatch.setattr(agents, 'sync_bars', lambda tickers, start: synced.append(list(tickers)))
+    monkeypatch.setattr(agents, 'load_closes', lambda ticker, start: None)
+    agent = agents.PriceAgent()
+    agent.prefetch(['AAPL', 'MSFT'], period='180d')
+    agent._fetch_stored('AAPL', '180d')
+    agent._fetch_stored('NVDA', '180d')
+    agent._fetch_stored('AAPL', '1y')  # wider window than was synced
+    assert synced == [['AAPL', 'MSFT'], ['NVDA'], ['AAPL']]
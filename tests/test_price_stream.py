@@ -0,0 +1,105 @@
+import json
+import threading
+
+import app as web
+import price_stream
+from price_stream import PricePoller, sse_stream
+
+
+class FakeQuotes:
+    """Local quote source: records each upstream call."""
+    def __init__(self, prices):
+        self.prices = prices
+        self.calls = []
+        self.called = threading.Event()
+
+    def __call__(self, tickers):
+        self.calls.append(list(tickers))
+        self.called.set()
+        return {t: self.prices[t] for t in tickers if t in self.prices}
+
+
+def test_one_fetch_serves_every_subscriber():
+    quotes = FakeQuotes({'AAPL': 190.0, 'MSFT': 410.0})
+    poller = PricePoller(quotes, interval=3600)
+    poller._thread = object()  # drive polls by hand
+    poller.subscribe(['AAPL', 'MSFT'])
+    poller.subscribe(['AAPL'])
+
+    assert poller.poll_once() == 2
+    assert quotes.calls == [['AAPL', 'MSFT']]
+    first, seq = poller.updates(['AAPL', 'MSFT'])
+    assert [(u['ticker'], u['price']) for u in first] == [('AAPL', 190.0), ('MSFT', 410.0)]
+    second, _ = poller.updates(['AAPL'])
+    assert second[0]['price'] == 190.0
+
+    # Unchanged prices are not republished; changed ones are.
+    assert poller.poll_once() == 0
+    quotes.prices['AAPL'] = 191.0
+    poller.poll_once()
+    newer, _ = poller.updates(['AAPL', 'MSFT'], after=seq)
+    assert [(u['ticker'], u['price']) for u in newer] == [('AAPL', 191.0)]
+
+
+def test_ring_buffer_is_bounded_and_dropped_with_last_subscriber():
+    poller = PricePoller(lambda tickers: {}, buffer_size=3)
+    poller._thread = object()
+    poller.subscribe(['AAPL'])
+    for price in range(10):
+        poller.source = lambda tickers, p=price: {'AAPL': float(p)}
+        poller.poll_once()
+    assert [p for _, _, p in poller._buffers['AAPL']] == [7.0, 8.0, 9.0]
+    poller.unsubscribe(['AAPL'])
+    assert poller._buffers == {} and poller._subscribers == {}
+
+
+def test_sse_stream_emits_events_and_unsubscribes():
+    quotes = FakeQuotes({'AAPL': 190.0})
+    poller = PricePoller(quotes, interval=3600)
+    stream = sse_stream(poller, ['AAPL'], heartbeat=2)
+    assert next(stream) == 'retry: 5000\n\n'
+    event = next(stream)
+    assert event.startswith('id: 1\nevent: price\n')
+    assert json.loads(event.split('data: ', 1)[1])['price'] == 190.0
+    stream.close()
+    assert poller._subscribers == {}
+
+
+def test_sse_stream_ends_after_max_seconds():
+    poller = PricePoller(FakeQuotes({}), interval=3600)
+    poller._thread = object()
+    chunks = list(sse_stream(poller, ['AAPL'], heartbeat=0.05, max_seconds=0.2))
+    assert chunks[0] == 'retry: 5000\n\n'
+    assert set(chunks[1:]) == {': keep-alive\n\n'}
+    assert poller._subscribers == {}
+
+
+def portfolio_tickers(query, params):
+    if 'FROM users' in query:
+        return [{'id': 1, 'username': 'u', 'email': 'u@example.com', 'created_at': None}]
+    return [('AAPL',), ('MSFT',)]
+
+
+def test_endpoint_streams_from_shared_poller(monkeypatch, fake_db):
+    quotes = FakeQuotes({'AAPL': 190.0, 'MSFT': 410.0})
+    poller = PricePoller(quotes, interval=3600)
+    monkeypatch.setattr(price_stream, '_poller', poller)
+    monkeypatch.setattr(web, 'initialize_app', lambda: None)
+    fake_db(web, respond=portfolio_tickers)
+
+    responses = []
+    for _ in range(3):
+        client = web.app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = '1'
+        response = client.get('/portfolio/1/prices/stream', buffered=False)
+        assert response.mimetype == 'text/event-stream'
+        chunks = iter(response.response)
+        assert next(chunks).startswith(b'retry')
+        assert b'event: price' in next(chunks)
+        responses.append(response)
+
+    assert quotes.calls == [['AAPL', 'MSFT']]
+    for response in responses:
+        response.close()
+    assert poller._subscribers == {}
@@ -0,0 +1,48 @@
+import pandas as pd
+import quotes
+
+
+def _multi_frame(tickers, closes):
+    cols = pd.MultiIndex.from_product([['Close', 'Open'], tickers], names=['Price', 'Ticker'])
+    data = [[*row, *row] for row in closes]
+    return pd.DataFrame(data, columns=cols, index=pd.to_datetime(['2026-05-28', '2026-05-29']))
+
+
+def test_fetch_last_prices_batches(monkeypatch):
+    calls = []
+
+    def fake_download(tickers, **kwargs):
+        calls.append(list(tickers))
+        closes = [[100.0 + i for i in range(len(tickers))], [110.0 + i for i in range(len(tickers))]]
+        if 'ZZZZ' in tickers:
+            closes[0][tickers.index('ZZZZ')] = float('nan')
+            closes[1][tickers.index('ZZZZ')] = float('nan')
+        return _multi_frame(tickers, closes)
+
+    monkeypatch.setattr('quotes.yf.download', fake_download)
+    quotes.market_cache.clear()
+    prices, failed = quotes.fetch_last_prices(['aapl', 'MSFT', 'AAPL', 'ZZZZ', 'NVDA'], batch_size=2)
+    assert calls == [['AAPL', 'MSFT'], ['ZZZZ', 'NVDA']]
+    assert prices == {'AAPL': 110.0, 'MSFT': 111.0, 'NVDA': 111.0}
+    assert failed == ['ZZZZ']
+
+
+def test_fetch_last_prices_uses_cache(monkeypatch):
+    calls = []
+
+    def fake_download(tickers, **kwargs):
+        calls.append(list(tickers))
+        return _multi_frame(tickers, [[1.0] * len(tickers), [2.0] * len(tickers)])
+
+    monkeypatch.setattr('quotes.yf.download', fake_download)
+    quotes.market_cache.clear()
+    quotes.fetch_last_prices(['AAPL'])
+    prices, failed = quotes.fetch_last_prices(['AAPL', 'MSFT'])
+    assert calls == [['AAPL'], ['MSFT']]
+    assert prices == {'AAPL': 2.0, 'MSFT': 2.0} and failed == []
+
+
+def test_normalize_tickers_dedupes_in_first_seen_order():
+    from quotes import normalize_tickers
+
+    assert normalize_tickers([' aapl', 'MSFT', None, '', 'AAPL ', 'msft', 'NVDA']) == ['AAPL', 'MSFT', 'NVDA']
@@ -0,0 +1,30 @@
+from rollups import refresh_rollups
+
+
+def statements(cur):
+    return [(' '.join(query.split()), params) for query, params in cur.conn.executed]
+
+
+def test_refresh_scopes_to_portfolio_and_tickers(fake_conn):
+    cur = fake_conn().cursor()
+    refresh_rollups(cur, portfolio_ids=[7], tickers=['AAPL'])
+
+    assert len(statements(cur)) == 3
+    for query, params in statements(cur):
+        assert 'WHERE id = ANY(%(portfolio_ids)s)' in query
+        assert params == {'portfolio_ids': [7], 'tickers': ['AAPL']}
+    assert 'ticker = ANY(%(tickers)s)' in statements(cur)[1][0]
+    assert 'h.ticker = ANY(%(tickers)s)' in statements(cur)[2][0]
+
+
+def test_refresh_by_ticker_covers_every_portfolio_holding_it(fake_conn):
+    cur = fake_conn().cursor()
+    refresh_rollups(cur, tickers=['MSFT'])
+    query = statements(cur)[0][0]
+    assert 'JOIN holdings h ON h.portfolio_id = p.id WHERE h.ticker = ANY(%(tickers)s)' in query
+
+
+def test_full_refresh_has_no_filters(fake_conn):
+    cur = fake_conn().cursor()
+    refresh_rollups(cur)
+    assert all('ANY(' not in query for query, _ in statements(cur))
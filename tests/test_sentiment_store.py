@@ -0,0 +1,51 @@
+from datetime import datetime, timezone
+from roma.sentiment_store import apply_scores, summary
+
+
+def _at(day):
+    return datetime(2026, 6, day, tzinfo=timezone.utc)
+
+
+def test_rolling_aggregates_fold_in_chronological_order():
+    state = apply_scores(None, [(_at(2), 1.0), (_at(1), 0.0)], alpha=0.5)
+    assert state['cast_count'] == 2
+    assert state['ewm_score'] == 0.5          # 0.0 first, then 1.0
+    assert state['newest_cast_at'] == _at(2)
+
+    state = apply_scores(state, [(_at(3), 1.0)], alpha=0.5)
+    result = summary(state)
+    assert result['count'] == 3 and result['new'] == 1
+    assert abs(result['avg'] - 2 / 3) < 1e-9
+    assert result['ewm'] == 0.75
+
+
+def test_casts_older_than_the_window_are_never_scored(monkeypatch, fake_db):
+    import roma.sentiment_store as store
+
+    fields = ('newest_cast_at', 'cast_count', 'score_sum', 'ewm_score')
+    state, casts = dict.fromkeys(fields), {}
+    state.update(cast_count=0, score_sum=0.0)
+
+    def respond(query, params):
+        """Just enough of sentiment_state / sentiment_casts for record()."""
+        if 'FROM sentiment_state' in query:
+            return [tuple(state[k] for k in fields)]
+        if 'SELECT cast_hash' in query:
+            return [(h,) for h in params[1] if h in casts]
+        if 'SELECT COUNT' in query:
+            return [(len(casts), sum(casts.values()))]
+        if query.lstrip().startswith('UPDATE sentiment_state'):
+            state.update(zip(fields, params[:4]))
+        return []
+
+    fake_db(store, respond=respond)
+    monkeypatch.setattr(store, 'execute_values', lambda cur, query, rows, fetch=False: [])
+    scored = []
+    old = {'hash': '0xold', 'text': 'to the moon', 'timestamp': '2020-01-01T00:00:00Z'}
+
+    first = store.record('AAPL', [old], lambda text: scored.append(text) or 1.0, window_days=7)
+    second = store.record('AAPL', [old], lambda text: scored.append(text) or 1.0, window_days=7)
+
+    assert scored == []
+    assert first['ewm_score'] is None and second['ewm_score'] is None
+    assert second['newest_cast_at'] == datetime(2020, 1, 1, tzinfo=timezone.utc)
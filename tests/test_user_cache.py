@@ -0,0 +1,16 @@
+import app as web
+
+
+def test_load_user_hits_db_once_until_invalidated(fake_db):
+    conn = fake_db(web, [{'id': 7, 'username': 'ann', 'email': 'ann@example.com', 'created_at': None,
+                          'password_hash': 'secret'}])
+    web.user_cache.clear()
+
+    assert web.load_user('7').username == 'ann'
+    assert web.load_user('7').email == 'ann@example.com'
+    assert len(conn.executed) == 1
+    assert 'password_hash' not in web.user_cache.get('user:7')
+
+    web.invalidate_user(7)
+    web.load_user('7')
+    assert len(conn.executed) == 2
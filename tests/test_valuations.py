@@ -0,0 +1,38 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from valuations import value_matrix
+
+D = [date(2026, 6, d) for d in (1, 2, 3, 4)]
+
+
+def test_value_matrix_follows_share_timeline():
+    events = pd.DataFrame([
+        (1, 'AAPL', date(2026, 5, 29), 10.0),
+        (1, 'AAPL', date(2026, 6, 3), 15.0),
+        (2, 'MSFT', date(2026, 6, 2), 2.0),
+        (1, 'MSFT', date(2026, 6, 3), 1.0),
+    ], columns=['portfolio_id', 'ticker', 'day', 'shares_total'])
+    closes = pd.DataFrame(
+        {'AAPL': [100.0, 101.0, np.nan, 103.0], 'MSFT': [200.0, 201.0, 202.0, 203.0]},
+        index=D,
+    )
+
+    values = value_matrix(events, closes)
+
+    assert list(values.columns) == [1, 2]
+    # A missing close carries the previous one forward.
+    assert values[1].tolist() == [1000.0, 1010.0, 15 * 101.0 + 202.0, 15 * 103.0 + 203.0]
+    assert np.isnan(values.loc[D[0], 2])
+    assert values[2].tolist()[1:] == [402.0, 404.0, 406.0]
+
+
+def test_later_event_on_same_day_wins():
+    events = pd.DataFrame([
+        (1, 'AAPL', D[0], 5.0),
+        (1, 'AAPL', D[0], 8.0),
+    ], columns=['portfolio_id', 'ticker', 'day', 'shares_total'])
+    closes = pd.DataFrame({'AAPL': [10.0, 10.0, 10.0, 10.0]}, index=D)
+    assert value_matrix(events, closes)[1].tolist() == [80.0] * 4
@@ -0,0 +1,165 @@
+import pytest
+
+import roma.workflow as wf
+
+
+@pytest.fixture(autouse=True)
+def fake_execute_values(monkeypatch):
+    monkeypatch.setattr(wf, 'execute_values', lambda cur, query, rows, page_size=None: cur.conn.inserted.extend(rows))
+
+
+@pytest.fixture(autouse=True)
+def offline_agents(monkeypatch):
+    """Keep the real price sync (yfinance + price_store) and Neynar search out of every test."""
+    monkeypatch.setattr(wf.price_agent, 'prefetch', lambda tickers, period=None: None)
+    monkeypatch.setattr(wf.sent_agent, 'scrape_many', lambda queries: [])
+
+
+@pytest.fixture(autouse=True)
+def runs(monkeypatch):
+    """In-memory workflow_runs/workflow_items: tickers in ``done`` are skipped."""
+    state = {'done': set(), 'items': [], 'finished': []}
+    monkeypatch.setattr(wf, 'start_run', lambda cur, key, pid, tickers: (1, set(state['done'])))
+    monkeypatch.setattr(wf, 'record_items', lambda cur, run_id, items: state['items'].extend(dict(i) for i in items))
+    monkeypatch.setattr(wf, 'finish_run', lambda cur, run_id, stats, error=None: state['finished'].append(error))
+    return state
+
+
+def test_workflow_analyses_each_ticker_once(monkeypatch, fake_db):
+    holdings = [
+        {'ticker': 'AAPL', 'portfolio_id': 1},
+        {'ticker': 'AAPL', 'portfolio_id': 2},
+        {'ticker': 'AAPL', 'portfolio_id': 2},
+        {'ticker': 'MSFT', 'portfolio_id': 1},
+    ]
+    conn = fake_db(wf, holdings)
+    analysed = []
+    monkeypatch.setattr(wf, 'analyze_ticker', lambda t, sentiment=None, timings=None: analysed.append(t) or f'report {t}')
+
+    assert wf.run_root_workflow() is True
+    assert analysed == ['AAPL', 'MSFT']
+    assert conn.inserted == [(1, 'report AAPL'), (2, 'report AAPL'), (1, 'report MSFT')]
+
+
+def test_parallel_workflow_writes_every_ticker(monkeypatch, fake_db):
+    holdings = [{'ticker': t, 'portfolio_id': i % 3} for i, t in enumerate(['A', 'B', 'C', 'D', 'E', 'B'])]
+    conn = fake_db(wf, holdings)
+    monkeypatch.setattr(wf, 'fetch_inputs', lambda t, sentiment=None: (None, {'count': 0}))
+    monkeypatch.setattr(wf.synth, 'synthesize', lambda t, p, s, f: f'report {t}')
+
+    wf.run_root_workflow(workers=3)
+    assert sorted(conn.inserted) == sorted([
+        (0, 'report A'), (1, 'report B'), (2, 'report C'),
+        (0, 'report D'), (1, 'report E'), (2, 'report B'),
+    ])
+
+
+def test_alerts_are_written_in_committed_batches(fake_conn):
+    conn = fake_conn([])
+    rows = [(1, f'report {i}') for i in range(5)]
+    assert wf.write_alerts(conn, rows, batch_size=2) == 5
+    assert conn.inserted == rows
+    assert conn.commits == 3
+
+
+def test_connection_is_released_before_analysis(monkeypatch, fake_conn):
+    conn = fake_conn([{'ticker': 'AAPL', 'portfolio_id': 1}])
+    leased = []
+    monkeypatch.setattr(wf, 'get_db_connection', lambda: leased.append(conn) or conn)
+    monkeypatch.setattr(wf, 'put_db_connection', lambda c: leased.remove(c))
+    monkeypatch.setattr(wf.sent_agent, 'scrape_many', lambda queries: [])
+
+    def analyze(ticker, sentiment=None, timings=None):
+        assert leased == []
+        return f'report {ticker}'
+
+    monkeypatch.setattr(wf, 'analyze_ticker', analyze)
+    wf.run_root_workflow()
+    assert conn.inserted == [(1, 'report AAPL')]
+    assert wf.last_run['alerts'] == 1
+    assert wf.last_run['lease_seconds'] >= 0
+
+
+def test_rerun_skips_done_tickers_and_records_failures(monkeypatch, runs, fake_db):
+    holdings = [{'ticker': t, 'portfolio_id': 1} for t in ['AAPL', 'MSFT', 'TSLA']]
+    conn = fake_db(wf, holdings)
+    runs['done'] = {'AAPL'}
+    monkeypatch.setattr(wf.sent_agent, 'scrape_many', lambda queries: [])
+    monkeypatch.setattr(wf.price_agent, 'prefetch', lambda tickers, period=None: None)
+    monkeypatch.setattr(wf, 'fetch_inputs', lambda t, sentiment=None: (None, {'count': 0}))
+    monkeypatch.setattr(wf.forecast_agent, 'forecast', lambda df, periods=3, ticker=None: None)
+
+    def synthesize(ticker, price_df, sentiment, forecast):
+        if ticker == 'TSLA':
+            raise ValueError('bad data')
+        return f'report {ticker}'
+
+    monkeypatch.setattr(wf.synth, 'synthesize', synthesize)
+    wf.run_root_workflow()
+
+    assert conn.inserted == [(1, 'report MSFT')]
+    assert [(i['ticker'], i['status'], i.get('error')) for i in runs['items']] == [
+        ('MSFT', 'done', None), ('TSLA', 'failed', 'bad data'),
+    ]
+    assert {'fetch_ms', 'forecast_ms', 'synth_ms'} <= set(runs['items'][0])
+    assert runs['finished'] == [None]
+    assert wf.last_run['skipped'] == 1 and wf.last_run['failed'] == 1
+
+
+def test_items_are_checkpointed_with_their_alerts(monkeypatch, runs, fake_db):
+    holdings = [{'ticker': t, 'portfolio_id': 1} for t in ['A', 'B', 'C']]
+    conn = fake_db(wf, holdings)
+    monkeypatch.setattr(wf, 'WORKFLOW_CHECKPOINT_ITEMS', 2)
+    monkeypatch.setattr(wf.sent_agent, 'scrape_many', lambda queries: [])
+    monkeypatch.setattr(wf, 'analyze_ticker', lambda t, sentiment=None, timings=None: f'report {t}')
+
+    wf.run_root_workflow()
+    # Start, two checkpoints (2 + 1 tickers) and the finish each commit once.
+    assert conn.commits == 4
+    assert [i['ticker'] for i in runs['items']] == ['A', 'B', 'C']
+
+
+def test_run_error_is_recorded_and_raised(monkeypatch, runs, fake_db):
+    fake_db(wf, [{'ticker': 'AAPL', 'portfolio_id': 1}])
+    monkeypatch.setattr(wf.sent_agent, 'scrape_many', lambda queries: (_ for _ in ()).throw(RuntimeError('neynar down')))
+
+    with pytest.raises(RuntimeError):
+        wf.run_root_workflow()
+    assert runs['finished'] == ['neynar down']
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_one_failing_ticker_keeps_the_other_alerts(monkeypatch, workers, fake_db):
+    holdings = [{'ticker': t, 'portfolio_id': 1} for t in ['BAD', 'A', 'B']]
+    conn = fake_db(wf, holdings)
+    monkeypatch.setattr(wf.sent_agent, 'scrape_many', lambda queries: [])
+    monkeypatch.setattr(wf.price_agent, 'prefetch', lambda tickers, period=None: None)
+
+    def fetch(ticker, sentiment=None):
+        if ticker == 'BAD':
+            raise RuntimeError('no data')
+        return None, {'count': 0}
+
+    monkeypatch.setattr(wf, 'fetch_inputs', fetch)
+    monkeypatch.setattr(wf.forecast_agent, 'forecast', lambda df, periods=3, ticker=None: None)
+    monkeypatch.setattr(wf.synth, 'synthesize', lambda t, p, s, f: f'report {t}')
+
+    assert wf.run_root_workflow(workers=workers) is True
+    assert sorted(conn.inserted) == [(1, 'report A'), (1, 'report B')]
+
+
+def test_parallel_pipeline_reraises_a_dead_stage(monkeypatch):
+    import roma.pipeline as pipeline
+
+    class Fatal(BaseException):
+        pass
+
+    def fetch(ticker):
+        if ticker == 'B':
+            raise Fatal('fetch thread died')
+        return None, {}
+
+    monkeypatch.setattr(pipeline, 'prophet_available', lambda: False)
+    reports = pipeline.iter_reports_parallel(['A', 'B', 'C'], fetch, lambda t, p, s, f: f'report {t}', workers=1)
+    with pytest.raises(Fatal):
+        list(reports)
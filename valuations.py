@@ -0,0 +1,133 @@
+"""Daily market value per portfolio in the ``portfolio_values`` table.
+
+The share timeline comes from ``holding_snapshots`` (holdings that predate
+snapshots count from their ``created_at``) and is valued against stored
+daily closes in one vectorized pass. Each run only computes days from the
+newest stored day onwards; that day is recomputed so a partial intraday
+close is replaced.
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+
+from db import get_db_connection, put_db_connection
+from price_store import MAX_CLOSED_DAYS, close_matrix, period_start, sync_bars
+from quotes import normalize_tickers
+
+VALUE_HISTORY_PERIOD = '1y'
+
+# Closes loaded before the first computed day so it can carry the last
+# known price forward over a market closure.
+_PRICE_LOOKBACK = timedelta(days=MAX_CLOSED_DAYS * 2)
+
+_EVENTS_SQL = """
+    WITH events AS (
+        SELECT portfolio_id, ticker, created_at, id AS seq, shares_total
+        FROM holding_snapshots
+        UNION ALL
+        SELECT h.portfolio_id, h.ticker, h.created_at, 0, h.shares
+        FROM holdings h
+        WHERE NOT EXISTS (SELECT 1 FROM holding_snapshots s WHERE s.holding_id = h.id)
+    )
+    (SELECT DISTINCT ON (portfolio_id, ticker)
+            portfolio_id, ticker, created_at, seq, shares_total
+     FROM events
+     WHERE created_at::date < %(start)s
+     ORDER BY portfolio_id, ticker, created_at DESC, seq DESC)
+    UNION ALL
+    (SELECT portfolio_id, ticker, created_at, seq, shares_total
+     FROM events
+     WHERE created_at::date >= %(start)s)
+"""
+
+
+def value_matrix(events, closes):
+    """Market value per day (rows) and portfolio (columns).
+
+    ``events`` has ``portfolio_id``, ``ticker``, ``day`` and ``shares_total``
+    columns in the order the events happened; ``closes`` is a day-indexed
+    close matrix with one column per ticker. Days before a portfolio's first
+    event are NaN.
+    """
+    if events.empty or closes.empty:
+        return pd.DataFrame(index=closes.index, dtype=float)
+    shares = (
+        events.groupby(['day', 'portfolio_id', 'ticker'], sort=True)['shares_total'].last()
+        .unstack(['portfolio_id', 'ticker'])
+    )
+    shares = shares.reindex(shares.index.union(closes.index)).ffill().reindex(closes.index)
+    prices = closes.ffill().reindex(columns=shares.columns.get_level_values('ticker'))
+
+    values = np.nan_to_num(shares.to_numpy(dtype=float)) * np.nan_to_num(prices.to_numpy(dtype=float))
+    values = pd.DataFrame(values, index=closes.index, columns=shares.columns)
+    totals = values.T.groupby(level='portfolio_id').sum().T
+    started = shares.notna().T.groupby(level='portfolio_id').any().T
+    return totals.where(started)
+
+
+def _load_events(start):
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(_EVENTS_SQL, {'start': start})
+            rows = cur.fetchall()
+        conn.commit()
+    finally:
+        put_db_connection(conn)
+    events = pd.DataFrame(rows, columns=['portfolio_id', 'ticker', 'created_at', 'seq', 'shares_total'])
+    if events.empty:
+        return events
+    events = events.sort_values(['created_at', 'seq'], kind='stable')
+    # Positions held before the window all take effect on the day before it.
+    events['day'] = [max(ts.date(), start - timedelta(days=1)) for ts in events['created_at']]
+    return events
+
+
+def sync_portfolio_values(today=None):
+    """Append (and refresh the newest) daily values. Returns rows written."""
+    today = today or date.today()
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT MAX(day) FROM portfolio_values")
+            last_day = cur.fetchone()[0]
+        conn.commit()
+    finally:
+        put_db_connection(conn)
+    start = last_day or period_start(VALUE_HISTORY_PERIOD, today)
+
+    events = _load_events(start)
+    if events.empty:
+        return 0
+    tickers = normalize_tickers(events['ticker'])
+    sync_bars(tickers, start - _PRICE_LOOKBACK, today)
+    closes = close_matrix(tickers, start - _PRICE_LOOKBACK, today)
+
+    values = value_matrix(events, closes)
+    values = values[[d >= start for d in values.index]]
+    matrix = values.to_numpy(dtype=float)
+    day_idx, col_idx = np.nonzero(~np.isnan(matrix))
+    rows = [
+        (int(values.columns[c]), values.index[d], float(matrix[d, c]))
+        for d, c in zip(day_idx, col_idx)
+    ]
+    if not rows:
+        return 0
+
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            execute_values(cur, """
+                INSERT INTO portfolio_values (portfolio_id, day, market_value) VALUES %s
+                ON CONFLICT (portfolio_id, day) DO UPDATE SET market_value = EXCLUDED.market_value
+            """, rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        put_db_connection(conn)
+    return len(rows)
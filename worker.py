@@ -0,0 +1,137 @@
+"""Drain the Postgres job queue (jobs.py).
+
+    python worker.py                          run until SIGTERM / Ctrl-C
+    python worker.py --concurrency 4          four jobs at a time
+    python worker.py --drain                  exit once no job is ready
+    python worker.py --status                 job counts by kind and status
+
+Any number of workers may run, on any number of hosts. While a job runs
+its visibility timeout is extended periodically; if the worker dies the
+job is picked up again once the timeout lapses.
+"""
+
+import argparse
+import os
+import signal
+import socket
+import threading
+import uuid
+
+from dotenv import load_dotenv
+
+from db import get_db_connection, init_db, put_db_connection
+from jobs import JOB_VISIBILITY_TIMEOUT, claim, complete, extend, fail, queue_stats
+
+WORKER_CONCURRENCY = int(os.getenv('WORKER_CONCURRENCY', '2'))
+WORKER_POLL_INTERVAL = float(os.getenv('WORKER_POLL_INTERVAL', '2'))
+
+
+def default_handlers():
+    from roma.workflow import WORKFLOW_JOB, run_ticker_job
+    return {WORKFLOW_JOB: run_ticker_job}
+
+
+def _in_transaction(fn, *args):
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            result = fn(cur, *args)
+        conn.commit()
+        return result
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        put_db_connection(conn)
+
+
+class Worker:
+    def __init__(self, handlers, concurrency=WORKER_CONCURRENCY, visibility_timeout=JOB_VISIBILITY_TIMEOUT,
+                 poll_interval=WORKER_POLL_INTERVAL, worker_id=None):
+        self.handlers = handlers
+        self.concurrency = max(1, concurrency)
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}'
+        self.stop = threading.Event()
+
+    def _heartbeat(self, job_id, slot, done):
+        while not done.wait(self.visibility_timeout / 3):
+            try:
+                _in_transaction(extend, job_id, slot, self.visibility_timeout)
+            except Exception as e:
+                print(f"[Worker {slot}] heartbeat for job {job_id} failed: {e}")
+
+    def run_one(self, slot):
+        """Claim and run one job; False if none was ready."""
+        claimed = _in_transaction(claim, slot, 1, self.visibility_timeout)
+        if not claimed:
+            return False
+        job_id, kind, payload, attempts = claimed[0]
+        done = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(job_id, slot, done), daemon=True).start()
+        try:
+            handler = self.handlers.get(kind)
+            if handler is None:
+                raise LookupError(f"No handler for job kind {kind!r}")
+            handler(payload)
+        except Exception as e:
+            status = _in_transaction(fail, job_id, slot, e)
+            print(f"[Worker {slot}] job {job_id} ({kind}) attempt {attempts} failed, now {status}: {e}")
+        else:
+            _in_transaction(complete, job_id, slot)
+        finally:
+            done.set()
+        return True
+
+    def _loop(self, slot, drain):
+        while not self.stop.is_set():
+            try:
+                worked = self.run_one(slot)
+            except Exception as e:
+                print(f"[Worker {slot}] queue error: {e}")
+                worked = False
+            if not worked:
+                if drain:
+                    return
+                self.stop.wait(self.poll_interval)
+
+    def run(self, drain=False):
+        slots = [
+            threading.Thread(target=self._loop, args=(f'{self.worker_id}/{i}', drain), name=f'worker-{i}')
+            for i in range(self.concurrency)
+        ]
+        for t in slots:
+            t.start()
+        for t in slots:
+            t.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run jobs from the Stock Sentinel job queue.")
+    parser.add_argument('--concurrency', type=int, default=WORKER_CONCURRENCY)
+    parser.add_argument('--visibility-timeout', type=int, default=JOB_VISIBILITY_TIMEOUT,
+                        help="seconds a claimed job stays hidden from other workers")
+    parser.add_argument('--poll-interval', type=float, default=WORKER_POLL_INTERVAL)
+    parser.add_argument('--drain', action='store_true', help="exit when no job is ready")
+    parser.add_argument('--status', action='store_true', help="show queue counts and exit")
+    parser.add_argument('--database-url', help="defaults to NEON_DATABASE_URL / DATABASE_URL")
+    args = parser.parse_args()
+
+    load_dotenv()
+    init_db(args.database_url or os.getenv('NEON_DATABASE_URL') or os.getenv('DATABASE_URL'))
+    if args.status:
+        for kind, counts in _in_transaction(queue_stats).items():
+            print(f"{kind}: " + ', '.join(f"{n} {status}" for status, n in counts.items()))
+        return
+
+    worker = Worker(default_handlers(), args.concurrency, args.visibility_timeout, args.poll_interval)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: worker.stop.set())
+    print(f"[Worker {worker.worker_id}] {worker.concurrency} slots, "
+          f"visibility timeout {worker.visibility_timeout}s")
+    worker.run(drain=args.drain)
+
+
+if __name__ == '__main__':
+    main()